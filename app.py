@@ -5,15 +5,24 @@
 # ********************** #
 
 
+import os
 from dash import html, dcc, _dash_renderer
 from dash.dependencies import Input, Output
 from dash_extensions.enrich import DashProxy, ServersideOutputTransform
 from dash_iconify import DashIconify
 import dash_mantine_components as dmc
+from flask import abort, jsonify, make_response, request, send_file
 
 _dash_renderer._set_react_version("18.2.0")
 
 
+from src import config
+from src.data.store import store
+from src.data.facets import FACET_LEVELS
+from src.data.geometry import geometry
+from src.utils.serverside import serverside_backend
+from src.utils.utils import filter_cache, render_stats
+from src.utils.render_cache import render_cache
 from src.components.banner import banner
 from src.components.footer import footer
 from src.pages.home import home_page
@@ -32,7 +41,7 @@ app = DashProxy(
         "https://cdnjs.cloudflare.com/ajax/libs/animate.css/4.1.1/animate.min.css",  # Animation CSS
     ],
     external_scripts=['https://cdn.jsdelivr.net/npm/apexcharts'],
-    transforms=[ServersideOutputTransform()],
+    transforms=[ServersideOutputTransform(backends=[serverside_backend])],
     suppress_callback_exceptions=True,
 )
 
@@ -94,7 +103,8 @@ app.clientside_callback(
     [Input("url", "pathname")],
 )
 def display_page(pathname):
-    # Return the corresponding page or the 404 page if not found
+    # Return the corresponding page or the 404 page if not found. Pages listing the data
+    # are functions, built on each visit from the tables currently loaded.
     page_routes = {
         "/": home_page,
         "/data-explorer": data_explorer_page,
@@ -102,10 +112,115 @@ def display_page(pathname):
         "/development-economics-and-trade": development_economics_and_trade,
         "/educational-research-and-innovation": education,
     }
-    return page_routes.get(pathname, not_found_page)
+    page = page_routes.get(pathname, not_found_page)
+    return page() if callable(page) else page
 
 server = app.server
 
+# Load the tables and parse the map boundaries once, before gunicorn (--preload) forks the
+# workers; the Arrow snapshot of data.db is exported first if it is missing or stale. With
+# FILTER_ENGINE=sql the tables stay in SQLite: reports, dropdowns and the explorer query it.
+if config.FILTER_ENGINE != "sql":
+    store.ensure_snapshot()
+    store.load_all()
+# Vector tiles of the boundary maps are cut here too when missing or stale
+geometry.ensure_tiles()
+geometry.load_all()
+
+# Reload data.db in the background when it changes. The watcher thread is started by the
+# first request each worker serves, never in the gunicorn --preload master.
+store.watch(config.DATA_RELOAD_INTERVAL)
+server.before_request(store.ensure_watcher)
+
+
+# Options and default value of every dependent dropdown of a table in one request, e.g.
+# /api/facets/agriculture_data?Series Name=Rice Production&Province=Kandal
+@server.route("/api/facets/<table>")
+def facet_options(table):
+    if table not in FACET_LEVELS:
+        abort(404)
+    return jsonify(version=store.version, dropdowns=store.facets(table).cascade(request.args.to_dict()))
+
+
+# The whole facet tree of a table for the clientside dropdowns (assets/facets.js). Built once
+# per data version; browsers revalidate with the ETag and get a 304 until the data changes.
+@server.route("/api/facets/<table>.json")
+def facet_tree(table):
+    if table not in FACET_LEVELS:
+        abort(404)
+    response = server.response_class(store.facets(table).to_json(), mimetype="application/json")
+    response.add_etag()  # content hash, so it stays valid across workers and restarts
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+# Hit rates and sizes of this worker's caches, and how often and how fast it rendered each
+# report (with DIAGNOSTICS only)
+@server.route("/api/cache-stats")
+def cache_stats():
+    if not config.DIAGNOSTICS:
+        abort(404)
+    return jsonify(
+        serverside=serverside_backend.stats(), filter_data=filter_cache.stats(), renders=render_cache.stats(),
+        **render_stats(),
+    )
+
+
+# Boundary files of the report maps. The URL (geometry.url) changes with the file's content,
+# so browsers keep it for a year and map updates only carry the values to draw.
+@server.route("/api/geometry/<name>.json")
+def boundary_file(name):
+    if name not in geometry.files:
+        abort(404)
+    response = send_file(os.path.abspath(geometry.files[name]), mimetype="application/json", max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
+
+# Simplified TopoJSON levels of the boundary files (GeometryRegistry.levels), cached like them
+@server.route("/api/geometry/<name>-<int:level>.topo.json")
+def boundary_level(name, level):
+    path = geometry.level_path(f"{name}-{level}.topo.json")
+    if path is None:
+        abort(404)
+    response = send_file(os.path.abspath(path), mimetype="application/json", max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
+
+# Vector tiles of the province and world-market maps (GeometryRegistry.tiles); the TileJSON
+# URL carries the version of the cut, which is baked into the tile URLs it lists
+@server.route("/api/tiles/<name>.json")
+def tile_set(name):
+    if geometry.tile_set(name) is None:
+        abort(404)
+    path = os.path.join(geometry.tile_dir, name, "tilejson.json")
+    response = send_file(os.path.abspath(path), mimetype="application/json", max_age=365 * 24 * 3600)
+    response.cache_control.immutable = True
+    return response
+
+@server.route("/api/tiles/<name>/<int:z>/<int:x>/<int:y>.mvt")
+def vector_tile(name, z, x, y):
+    entry = geometry.tile_set(name)
+    if entry is None or z > entry["max_zoom"] or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        abort(404)
+    path = os.path.join(geometry.tile_dir, name, str(z), str(x), f"{y}.mvt")
+    if os.path.exists(path):
+        response = send_file(os.path.abspath(path), mimetype="application/vnd.mapbox-vector-tile", max_age=365 * 24 * 3600)
+    else:
+        # No boundary crosses this tile
+        response = make_response("", 204)
+        response.cache_control.max_age = 365 * 24 * 3600
+        response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+# Data names the report maps could not place on a boundary (see GeometryRegistry.join),
+# with DIAGNOSTICS only
+@server.route("/api/geometry/unmatched")
+def unmatched_names():
+    if not config.DIAGNOSTICS:
+        abort(404)
+    return jsonify({name: sorted(names) for name, names in geometry.unmatched.items()})
+
 # Run the server
 if __name__ == "__main__":
     app.run_server(debug=True, port=8050, processes=1, threaded=True)
\ No newline at end of file
@@ -5,9 +5,13 @@ window.dashExtensions = Object.assign({}, window.dashExtensions, {
                 classes,
                 colorscale,
                 style,
-                colorProp
+                colorProp,
+                values,
+                nameProp
             } = context.hideout; // get props from hideout
-            const value = feature.properties[colorProp]; // get value that determines the color
+            // get value that determines the color: from the {name: value} map sent with each update,
+            // as the boundaries themselves are a static file (GeometryRegistry.url)
+            const value = values ? values[feature.properties[nameProp]] : feature.properties[colorProp];
 
             if (value === null || value === undefined) {
                 // If the value is None (null or undefined), set no color (transparent)
@@ -24,6 +28,9 @@ window.dashExtensions = Object.assign({}, window.dashExtensions, {
                 }
             }
             return style;
+        },
+        function1: function(e, context) {
+            vectorTiles.mount(e.target, context);
         }
     }
 });
\ No newline at end of file
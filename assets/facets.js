@@ -0,0 +1,210 @@
+// Cascading dropdowns of the sector pages, resolved in the browser.
+// The facet tree of each table (FacetTree.to_json) is fetched once from
+// /api/facets/<table>.json; the server answers 304 while the data version is unchanged.
+var facetTrees = {};
+
+function loadFacets(table) {
+    if (!facetTrees[table]) {
+        facetTrees[table] = fetch("/api/facets/" + table + ".json")
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error("facets for " + table + ": HTTP " + response.status);
+                }
+                return response.json();
+            })
+            .catch(function (error) {
+                delete facetTrees[table];  // retry on the next change
+                throw error;
+            });
+    }
+    return facetTrees[table];
+}
+
+// Distinct values of `column` under a selection of the levels above it, in order of
+// first appearance. Unset or 'All' selections match every value (see FacetTree.options).
+function facetOptions(tree, column, selection) {
+    var depth = tree.levels.indexOf(column);
+    if (depth < 0) {
+        return [];
+    }
+    var filters = [];
+    for (var i = 0; i < depth; i++) {
+        var level = tree.levels[i];
+        var selected = selection[level];
+        if (selected === null || selected === undefined || selected === "All") {
+            continue;
+        }
+        var code = tree.values[level].findIndex(function (value) { return String(value) === String(selected); });
+        if (code < 0) {
+            return [];
+        }
+        filters.push([tree.codes[level], code]);
+    }
+    var codes = tree.codes[column];
+    var seen = {};
+    var options = [];
+    for (var row = 0; row < codes.length; row++) {
+        var matches = codes[row] >= 0 && !seen[codes[row]] && filters.every(function (filter) {
+            return filter[0][row] === filter[1];
+        });
+        if (matches) {
+            seen[codes[row]] = true;
+            options.push(tree.values[column][codes[row]]);
+        }
+    }
+    return options;
+}
+
+// Same order as Python's sorted(): numbers numerically, strings by code unit
+function sortedValues(values) {
+    return values.slice().sort(function (a, b) {
+        return a < b ? -1 : a > b ? 1 : 0;
+    });
+}
+
+function toOptions(values) {
+    return values.map(function (value) { return {label: String(value), value: String(value)}; });
+}
+
+function shown(visible) {
+    return visible ? {display: "block"} : {display: "none"};
+}
+
+function isPaddy(seriesName) {
+    return (seriesName || "").toLowerCase() === "paddy rice price";
+}
+
+function indicatorChoice(tree, selection, firstSorted) {
+    var indicators = facetOptions(tree, "Indicator", selection);
+    if (!indicators.length) {
+        return [[], null];
+    }
+    var sorted = sortedValues(indicators);
+    return [toOptions(sorted), firstSorted ? sorted[0] : indicators[0]];
+}
+
+function yearChoice(tree, selection, visible, visibleWhenEmpty) {
+    var years = facetOptions(tree, "Year", selection);
+    if (!years.length) {
+        return [[], null, shown(visibleWhenEmpty)];
+    }
+    var sorted = sortedValues(years);
+    return [toOptions(sorted), String(sorted[sorted.length - 1]), shown(visible)];
+}
+
+// The dropdown values a callback was called with, by component id. The last step of each
+// cascade (the years) returns them for the page's "facets-resolved" Store, which tells
+// assets/settle.js that the dropdowns it reads have caught up. Call it before any promise:
+// Dash clears the context once the function has returned.
+function calledWith() {
+    var context = window.dash_clientside.callback_context;
+    var values = {};
+    context.inputs_list.concat(context.states_list || []).forEach(function (input) {
+        values[input.id] = input.value;
+    });
+    return values;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    facets: {
+        // Agriculture and rural development
+        agricultureSubsector2: function (seriesName) {
+            if (!isPaddy(seriesName)) {
+                return [[], null, {display: "none"}];
+            }
+            return loadFacets("agriculture_data").then(function (tree) {
+                var options = facetOptions(tree, "Sub-Sector (2)", {"Series Name": seriesName});
+                return [toOptions(sortedValues(options)), "Fragrant Rice", shown(options.length)];
+            });
+        },
+        agricultureProvince: function (seriesName) {
+            if (isPaddy(seriesName)) {
+                return [[], null, {display: "none"}];
+            }
+            return loadFacets("agriculture_data").then(function (tree) {
+                var options = facetOptions(tree, "Province", {"Series Name": seriesName});
+                return [toOptions(["All"].concat(sortedValues(options))), "All", shown(options.length)];
+            });
+        },
+        agricultureIndicators: function (seriesName, province) {
+            return loadFacets("agriculture_data").then(function (tree) {
+                return indicatorChoice(tree, {"Series Name": seriesName, "Province": province}, false);
+            });
+        },
+        agricultureYears: function (seriesName, province, indicator, activeTab) {
+            var resolved = calledWith();
+            if (isPaddy(seriesName)) {
+                return [[], null, {display: "none"}, resolved];
+            }
+            return loadFacets("agriculture_data").then(function (tree) {
+                var selection = {"Series Name": seriesName, "Province": province, "Indicator": indicator};
+                return yearChoice(tree, selection, activeTab === "map", activeTab === "map").concat([resolved]);
+            });
+        },
+
+        // Educational research and innovation
+        educationGradeLevel: function (seriesName) {
+            if (seriesName === "Student Flow Rates") {
+                return [{visibility: "visible", position: "relative"}, "Level"];
+            }
+            return [{visibility: "hidden", position: "absolute"}, null];
+        },
+        educationGrade: function (seriesName, gradeOrLevel) {
+            return loadFacets("education_data").then(function (tree) {
+                var options;
+                if (seriesName === "Student Flow Rates") {
+                    options = gradeOrLevel ? facetOptions(tree, "Grade", {"Series Name": seriesName, "Sub-Sector (1)": gradeOrLevel}) : [];
+                } else {
+                    options = facetOptions(tree, "Grade", {"Series Name": seriesName});
+                }
+                var label = gradeOrLevel === "Level" ? "Select Level" : "Select Grade";
+                return [toOptions(["All"].concat(options)), options.length ? "All" : null, shown(options.length), label];
+            });
+        },
+        educationProvince: function (seriesName) {
+            return loadFacets("education_data").then(function (tree) {
+                var options = facetOptions(tree, "Province", {"Series Name": seriesName});
+                return [toOptions(sortedValues(options)), options.length ? "Cambodia" : null, shown(options.length)];
+            });
+        },
+        educationIndicators: function (seriesName, grade, province) {
+            return loadFacets("education_data").then(function (tree) {
+                return indicatorChoice(tree, {"Series Name": seriesName, "Grade": grade, "Province": province}, true);
+            });
+        },
+        educationYears: function (seriesName, indicator, grade, province, activeTab) {
+            var resolved = calledWith();
+            return loadFacets("education_data").then(function (tree) {
+                var selection = {"Series Name": seriesName, "Grade": grade, "Province": province, "Indicator": indicator};
+                var visible = activeTab === "map" || (activeTab === "graph" && seriesName === "Occupations of School Dropouts");
+                return yearChoice(tree, selection, visible, activeTab === "map").concat([resolved]);
+            });
+        },
+
+        // Development economics and trade
+        economicProducts: function (seriesName) {
+            return loadFacets("economic_data").then(function (tree) {
+                var options = facetOptions(tree, "Products", {"Series Name": seriesName});
+                return [toOptions(sortedValues(options)), options.length ? options[0] : null, shown(options.length)];
+            });
+        },
+        economicMarkets: function (seriesName) {
+            return loadFacets("economic_data").then(function (tree) {
+                var options = facetOptions(tree, "Markets", {"Series Name": seriesName});
+                return [toOptions(["All"].concat(sortedValues(options))), "All", shown(options.length)];
+            });
+        },
+        economicIndicators: function (seriesName, market) {
+            return loadFacets("economic_data").then(function (tree) {
+                return indicatorChoice(tree, {"Series Name": seriesName, "Markets": market}, false);
+            });
+        },
+        economicYears: function (seriesName, indicator, market, product, activeTab) {
+            var resolved = calledWith();
+            return loadFacets("economic_data").then(function (tree) {
+                var selection = {"Series Name": seriesName, "Products": product, "Markets": market, "Indicator": indicator};
+                return yearChoice(tree, selection, activeTab === "map", activeTab === "map").concat([resolved]);
+            });
+        },
+    },
+});
@@ -0,0 +1,43 @@
+// Map hover panel, the browser-side twin of get_info() in src/utils/utils.py.
+// The header context (series, indicator, unit, year) travels in the GeoJSON hideout
+// under "info", next to the {name: value} map of the boundaries ("values", keyed on the
+// "nameProp" property), so hovering needs no request.
+function htmlElement(type, children) {
+    return {namespace: "dash_html_components", type: type, props: {children: children === undefined ? null : children}};
+}
+
+// Python's f"{value:,.0f}"
+function formatThousands(value) {
+    return Number(value).toLocaleString("en-US", {minimumFractionDigits: 0, maximumFractionDigits: 0});
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    mapInfo: {
+        hover: function (feature, hideout) {
+            var info = (hideout && hideout.info) || {};
+            var yearText = info.year ? " in " + info.year : "";
+            var header = [htmlElement("H4", "")];
+            if (info.series_name !== null && info.series_name !== undefined) {
+                header = [htmlElement("H4", "Cambodia " + info.series_name + " " + yearText)];
+            }
+
+            if (!feature) {
+                return header.concat([htmlElement("P", "Hover over a location")]);
+            }
+            var properties = feature.properties || {};
+            var featureName = properties.name || properties.shapeName;
+            if (!featureName) {
+                return header.concat([htmlElement("P", "No valid name available for this feature")]);
+            }
+            var value = hideout.values ? hideout.values[properties[hideout.nameProp]] : properties[info.indicator];
+            if (value === null || value === undefined) {
+                return header.concat([htmlElement("B", featureName), htmlElement("Br"), "No data available"]);
+            }
+            var unit = info.indicator_unit === null || info.indicator_unit === undefined ? "" : info.indicator_unit;
+            return header.concat([
+                htmlElement("B", featureName), htmlElement("Br"),
+                info.indicator + ": " + formatThousands(value) + " " + unit, htmlElement("Br"),
+            ]);
+        },
+    },
+});
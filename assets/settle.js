@@ -0,0 +1,43 @@
+// Settled filters of the sector reports.
+// Changing one dropdown makes the dependent dropdowns (assets/facets.js) update one after
+// another, and each step used to reach update_report. The report now listens to a single
+// Store that is written here only once the cascade has resolved, and only when the filters
+// differ from what was last rendered: one render per user action.
+//
+// The last step of each cascade (the years) writes the dropdown values it ran for to the
+// page's "facets-resolved" Store, an Input here. Until they match the values now shown, a
+// step that reads them is still to run, and its outputs would change the filters again.
+
+// Per Store: filter changes seen ("changes") against renders requested ("settled").
+// Inspect window.reportSettleStats in the browser console.
+window.reportSettleStats = {};
+
+function cascadeResolved(inputs, resolved) {
+    return Boolean(resolved) && inputs.every(function (input) {
+        return !(input.id in resolved) || JSON.stringify(resolved[input.id]) === JSON.stringify(input.value);
+    });
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    reports: {
+        settle: function () {
+            var context = window.dash_clientside.callback_context;
+            var args = Array.prototype.slice.call(arguments);
+            var current = args.pop();  // State: the Store itself
+            var resolved = args.pop();  // Input: the page's facets-resolved Store
+            var filters = args;
+            var storeId = context.outputs_list.id;
+            var stats = window.reportSettleStats[storeId] = window.reportSettleStats[storeId] || {changes: 0, settled: 0};
+            stats.changes += 1;
+
+            if (!cascadeResolved(context.inputs_list, resolved)) {
+                return window.dash_clientside.no_update;
+            }
+            if (current && JSON.stringify(current) === JSON.stringify(filters)) {
+                return window.dash_clientside.no_update;
+            }
+            stats.settled += 1;
+            return filters;
+        },
+    },
+});
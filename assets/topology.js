@@ -0,0 +1,117 @@
+// Boundaries of the report maps at the detail the current zoom needs.
+// The GeoJSON hideout lists the levels of a boundary file under "levels", coarsest first
+// (GeometryRegistry.levels): TopoJSON simplified by src/data/topology.py, each with the
+// largest error it allows in degrees. On every zoom the map loads the first level whose
+// error is below one screen pixel, so zoomed out it draws a few KB instead of the full
+// outlines. Levels are fetched and decoded once per page and shared by all maps. Maps whose
+// hideout lists vector tiles draw those instead (assets/vectortiles.js).
+var TILE_SIZE = 256;
+var boundaryLevels = {};  // url -> Promise of the decoded FeatureCollection
+var boundaryRequests = {};  // GeoJSON id -> latest request, so a slow level never replaces a newer one
+var boundaryZooms = {};  // GeoJSON id -> last zoom reported by its map
+
+function decodeArcs(topology) {
+    var scale = topology.transform.scale, translate = topology.transform.translate;
+    return topology.arcs.map(function (arc) {
+        var x = 0, y = 0;
+        return arc.map(function (delta) {
+            x += delta[0];
+            y += delta[1];
+            return [x * scale[0] + translate[0], y * scale[1] + translate[1]];
+        });
+    });
+}
+
+// Joins the arcs of a ring; ~i is arc i reversed, and each arc starts where the last ended
+function ring(arcRefs, arcs) {
+    var points = [];
+    arcRefs.forEach(function (ref, i) {
+        var arc = ref < 0 ? arcs[~ref].slice().reverse() : arcs[ref];
+        points = points.concat(i ? arc.slice(1) : arc);
+    });
+    return points;
+}
+
+function polygon(rings, arcs) {
+    return rings.map(function (arcRefs) { return ring(arcRefs, arcs); });
+}
+
+function topologyFeatures(topology) {
+    var arcs = decodeArcs(topology);
+    var object = topology.objects[Object.keys(topology.objects)[0]];
+    return {
+        type: "FeatureCollection",
+        features: object.geometries.map(function (geometry) {
+            var feature = {type: "Feature", properties: geometry.properties || {}, geometry: null};
+            if (geometry.id !== undefined) {
+                feature.id = geometry.id;
+            }
+            if (geometry.type === "Polygon") {
+                feature.geometry = {type: "Polygon", coordinates: polygon(geometry.arcs, arcs)};
+            } else if (geometry.type === "MultiPolygon") {
+                feature.geometry = {type: "MultiPolygon", coordinates: geometry.arcs.map(function (rings) { return polygon(rings, arcs); })};
+            }
+            return feature;
+        }),
+    };
+}
+
+function loadLevel(url) {
+    if (!boundaryLevels[url]) {
+        boundaryLevels[url] = fetch(url).then(function (response) {
+            if (!response.ok) {
+                throw new Error(response.status + " " + url);
+            }
+            return response.json();
+        }).then(function (data) {
+            var collection = data.type === "Topology" ? topologyFeatures(data) : data;
+            collection.source = url;  // lets the next zoom see which level is drawn
+            return collection;
+        });
+        boundaryLevels[url].catch(function () { delete boundaryLevels[url]; });
+    }
+    return boundaryLevels[url];
+}
+
+// The coarsest level that is exact to a pixel: a pixel spans 360 / (256 * 2^zoom) degrees
+function pickLevel(levels, zoom) {
+    var pixel = 360 / (TILE_SIZE * Math.pow(2, zoom));
+    for (var i = 0; i < levels.length; i++) {
+        if (levels[i].tolerance <= pixel) {
+            return levels[i];
+        }
+    }
+    return levels[levels.length - 1];
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    topology: {
+        boundaries: function (zoom, hideout, data) {
+            var no_update = window.dash_clientside.no_update;
+            var geojsonId = window.dash_clientside.callback_context.outputs_list.id;
+            // A report update sends the map again without zoom or data; Leaflet keeps the
+            // map on screen, so the boundaries are reloaded at the zoom it last reported
+            if (zoom === null || zoom === undefined) {
+                zoom = boundaryZooms[geojsonId];
+            } else {
+                boundaryZooms[geojsonId] = zoom;
+            }
+            var levels = hideout && hideout.levels;
+            if (!levels || !levels.length || hideout.tiles || zoom === undefined) {
+                return no_update;
+            }
+            var url = pickLevel(levels, zoom).url;
+            if (data && data.source === url) {
+                return no_update;
+            }
+            var request = (boundaryRequests[geojsonId] || 0) + 1;
+            boundaryRequests[geojsonId] = request;
+            return loadLevel(url).then(function (collection) {
+                return boundaryRequests[geojsonId] === request ? collection : no_update;
+            }, function (error) {
+                console.error("Failed to load map boundaries: " + error);
+                return no_update;
+            });
+        },
+    },
+});
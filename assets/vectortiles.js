@@ -0,0 +1,448 @@
+// Vector tiles of the province and world-market maps (src/data/tiles.py, /api/tiles in app.py).
+// These maps draw no GeoJSON data. An empty LayerGroup "<GeoJSON id>-tiles" hands over its
+// map when Leaflet adds it (tiles_handle in src/utils/utils.py), and a canvas layer in it
+// fetches only the tiles in view and paints them with the choropleth in the GeoJSON's
+// hideout, the browser-side twin of style_handle. Each report update repaints the loaded
+// tiles from the new hideout (restyle). Hovering or clicking a boundary behaves as on the
+// GeoJSON: hoverData feeds the info panel and a click zooms to the boundary.
+var MAX_CACHED_TILES = 512;
+var tileSets = {};  // GeoJSON id -> {group, hideout, hoverStyle, zoomToBoundsOnClick, layer}
+var tileJsons = {};  // TileJSON url -> Promise
+var decodedTiles = new Map();  // tile url -> Promise of the decoded layer, oldest first
+var VectorTileLayer = null;
+
+// --- Mapbox Vector Tile decoding (protobuf wire format) ---
+
+function PbfReader(buffer) {
+    this.buf = new Uint8Array(buffer);
+    this.view = new DataView(this.buf.buffer, this.buf.byteOffset, this.buf.byteLength);
+    this.pos = 0;
+}
+
+PbfReader.prototype.varint = function () {
+    var result = 0, shift = 1, byte;
+    do {
+        byte = this.buf[this.pos++];
+        result += (byte & 0x7f) * shift;
+        shift *= 128;
+    } while (byte & 0x80);
+    return result;
+};
+
+PbfReader.prototype.string = function () {
+    var end = this.varint() + this.pos;
+    var value = new TextDecoder().decode(this.buf.subarray(this.pos, end));
+    this.pos = end;
+    return value;
+};
+
+PbfReader.prototype.packed = function () {
+    var end = this.varint() + this.pos, values = [];
+    while (this.pos < end) {
+        values.push(this.varint());
+    }
+    return values;
+};
+
+PbfReader.prototype.skip = function (type) {
+    if (type === 0) this.varint();
+    else if (type === 1) this.pos += 8;
+    else if (type === 2) this.pos += this.varint();
+    else if (type === 5) this.pos += 4;
+};
+
+// Calls read(field, type) for each field up to `end`; fields it does not consume are skipped
+PbfReader.prototype.fields = function (end, read) {
+    while (this.pos < end) {
+        var key = this.varint(), start = this.pos;
+        read(key >> 3, key & 7);
+        if (this.pos === start) {
+            this.skip(key & 7);
+        }
+    }
+};
+
+function zigzag(n) {
+    return n % 2 ? -(n + 1) / 2 : n / 2;
+}
+
+function decodeValue(pbf, end) {
+    var value = null;
+    pbf.fields(end, function (field) {
+        if (field === 1) value = pbf.string();
+        else if (field === 2) { value = pbf.view.getFloat32(pbf.pos, true); pbf.pos += 4; }
+        else if (field === 3) { value = pbf.view.getFloat64(pbf.pos, true); pbf.pos += 8; }
+        else if (field === 4 || field === 5) value = pbf.varint();
+        else if (field === 6) value = zigzag(pbf.varint());
+        else if (field === 7) value = Boolean(pbf.varint());
+    });
+    return value;
+}
+
+// Rings of a polygon feature in tile units, from its MoveTo / LineTo / ClosePath commands
+function decodeRings(geometry) {
+    var rings = [], ring = null, x = 0, y = 0, i = 0;
+    while (i < geometry.length) {
+        var command = geometry[i++], id = command & 7, count = command >> 3;
+        if (id === 1 || id === 2) {
+            for (var n = 0; n < count; n++) {
+                x += zigzag(geometry[i++]);
+                y += zigzag(geometry[i++]);
+                if (id === 1) {
+                    ring = [[x, y]];
+                    rings.push(ring);
+                } else {
+                    ring.push([x, y]);
+                }
+            }
+        }
+    }
+    return rings;
+}
+
+function decodeLayer(pbf, end) {
+    var layer = {name: "", extent: 4096, features: []}, keys = [], values = [], features = [];
+    pbf.fields(end, function (field, type) {
+        if (field === 1) layer.name = pbf.string();
+        else if (field === 2) { var length = pbf.varint(); features.push([pbf.pos, pbf.pos + length]); pbf.pos += length; }
+        else if (field === 3) keys.push(pbf.string());
+        else if (field === 4) { var valueEnd = pbf.varint() + pbf.pos; values.push(decodeValue(pbf, valueEnd)); }
+        else if (field === 5) layer.extent = pbf.varint();
+    });
+    layer.features = features.map(function (range) {
+        var feature = {id: null, properties: {}, rings: []};
+        pbf.pos = range[0];
+        pbf.fields(range[1], function (field) {
+            if (field === 1) feature.id = pbf.varint();
+            else if (field === 2) {
+                var tags = pbf.packed();
+                for (var i = 0; i + 1 < tags.length; i += 2) {
+                    feature.properties[keys[tags[i]]] = values[tags[i + 1]];
+                }
+            } else if (field === 4) feature.rings = decodeRings(pbf.packed());
+        });
+        return feature;
+    });
+    return layer;
+}
+
+// The layer `name` of a tile, or null for an empty tile
+function decodeTile(buffer, name) {
+    var pbf = new PbfReader(buffer), found = null;
+    pbf.fields(pbf.buf.length, function (field) {
+        if (field === 3) {
+            var end = pbf.varint() + pbf.pos;
+            var layer = decodeLayer(pbf, end);
+            pbf.pos = end;
+            if (layer.name === name) {
+                found = layer;
+            }
+        }
+    });
+    return found;
+}
+
+function fetchOk(url) {
+    return fetch(url).then(function (response) {
+        if (!response.ok) {
+            throw new Error(response.status + " " + url);
+        }
+        return response;
+    });
+}
+
+function loadTileJson(url) {
+    if (!tileJsons[url]) {
+        tileJsons[url] = fetchOk(url).then(function (response) { return response.json(); });
+        tileJsons[url].catch(function () { delete tileJsons[url]; });
+    }
+    return tileJsons[url];
+}
+
+// Decoded tiles are kept for the overzoomed tiles that share them and for panning back
+function loadVectorTile(url, name) {
+    var tile = decodedTiles.get(url);
+    if (tile) {
+        decodedTiles.delete(url);
+    } else {
+        tile = fetchOk(url).then(function (response) {
+            return response.arrayBuffer();
+        }).then(function (buffer) {
+            return decodeTile(buffer, name);
+        });
+        tile.catch(function () { decodedTiles.delete(url); });
+    }
+    decodedTiles.set(url, tile);
+    if (decodedTiles.size > MAX_CACHED_TILES) {
+        decodedTiles.delete(decodedTiles.keys().next().value);
+    }
+    return tile;
+}
+
+// --- Painting ---
+
+// Browser-side twin of style_handle (src/utils/utils.py)
+function featureStyle(properties, hideout) {
+    var style = Object.assign({}, hideout.style);
+    var value = hideout.values ? hideout.values[properties[hideout.nameProp]] : properties[hideout.colorProp];
+    if (value === null || value === undefined) {
+        style.fillColor = null;
+    } else if (value === 0) {
+        style.fillColor = "#ffffff";
+    } else {
+        for (var i = 0; i < hideout.classes.length; ++i) {
+            if (value > hideout.classes[i]) {
+                style.fillColor = hideout.colorscale[i];
+            }
+        }
+    }
+    return style;
+}
+
+// Leaflet's path defaults, for the options a style leaves out
+function pathOption(style, name, fallback) {
+    return style[name] === undefined || style[name] === null ? fallback : style[name];
+}
+
+function createLayerClass() {
+    return L.GridLayer.extend({
+        initialize: function (tileJson, set, options) {
+            L.GridLayer.prototype.initialize.call(this, options);
+            this.url = set.hideout.tiles;
+            this._tileJson = tileJson;
+            this._set = set;
+            this._hovered = null;
+        },
+
+        onAdd: function (map) {
+            L.GridLayer.prototype.onAdd.call(this, map);
+            map.on("mousemove", this._onMouseMove, this);
+            map.on("mouseout", this._onMouseOut, this);
+            map.on("click", this._onClick, this);
+        },
+
+        onRemove: function (map) {
+            map.off("mousemove", this._onMouseMove, this);
+            map.off("mouseout", this._onMouseOut, this);
+            map.off("click", this._onClick, this);
+            map.getContainer().style.cursor = "";
+            L.GridLayer.prototype.onRemove.call(this, map);
+        },
+
+        createTile: function (coords, done) {
+            var tile = L.DomUtil.create("canvas", "leaflet-tile");
+            var size = this.getTileSize(), ratio = window.devicePixelRatio || 1;
+            tile.width = size.x * ratio;
+            tile.height = size.y * ratio;
+
+            // Past the deepest zoom cut, draw the part of its tile that covers this one
+            var scale = Math.pow(2, Math.max(0, coords.z - this._tileJson.maxzoom));
+            var source = {x: Math.floor(coords.x / scale), y: Math.floor(coords.y / scale), z: coords.z - Math.log2(scale)};
+            var url = this._tileJson.tiles[0].replace("{z}", source.z).replace("{x}", source.x).replace("{y}", source.y);
+            var self = this;
+            loadVectorTile(url, this._tileJson.name).then(function (layer) {
+                var extent = layer ? layer.extent : 4096;
+                tile._vector = {
+                    features: layer ? layer.features : [],
+                    k: size.x * scale / extent,
+                    dx: (coords.x - source.x * scale) * size.x,
+                    dy: (coords.y - source.y * scale) * size.y,
+                };
+                self._paint(tile);
+                done(null, tile);
+            }, function (error) {
+                console.error("Failed to load map tile: " + error);
+                done(error, tile);
+            });
+            return tile;
+        },
+
+        _path: function (context, vector, feature) {
+            context.beginPath();
+            feature.rings.forEach(function (ring) {
+                ring.forEach(function (point, i) {
+                    var x = point[0] * vector.k - vector.dx, y = point[1] * vector.k - vector.dy;
+                    if (i) context.lineTo(x, y); else context.moveTo(x, y);
+                });
+                context.closePath();
+            });
+        },
+
+        _paint: function (tile) {
+            var vector = tile._vector, hideout = this._set.hideout;
+            var size = this.getTileSize(), ratio = window.devicePixelRatio || 1;
+            var context = tile.getContext("2d");
+            context.setTransform(ratio, 0, 0, ratio, 0, 0);
+            context.clearRect(0, 0, size.x, size.y);
+            var nameProp = hideout.nameProp, hovered = this._hovered, hoverStyle = this._set.hoverStyle;
+            // The hovered boundary last, so its outline is on top
+            var features = vector.features.slice().sort(function (a, b) {
+                return (a.properties[nameProp] === hovered) - (b.properties[nameProp] === hovered);
+            });
+            features.forEach(function (feature) {
+                var style = featureStyle(feature.properties, hideout);
+                if (hovered !== null && feature.properties[nameProp] === hovered && hoverStyle) {
+                    style = Object.assign(style, hoverStyle);
+                }
+                var color = pathOption(style, "color", "#3388ff");
+                this._path(context, vector, feature);
+                if (pathOption(style, "fill", true)) {
+                    context.globalAlpha = pathOption(style, "fillOpacity", 0.2);
+                    context.fillStyle = style.fillColor || color;
+                    context.fill("evenodd");
+                }
+                if (pathOption(style, "stroke", true)) {
+                    context.globalAlpha = pathOption(style, "opacity", 1);
+                    context.strokeStyle = color;
+                    context.lineWidth = pathOption(style, "weight", 3);
+                    context.lineJoin = context.lineCap = "round";
+                    context.setLineDash(style.dashArray ? String(style.dashArray).split(/[ ,]+/).map(Number) : []);
+                    context.stroke();
+                }
+            }, this);
+            context.globalAlpha = 1;
+        },
+
+        repaint: function () {
+            for (var key in this._tiles) {
+                if (this._tiles[key].el._vector) {
+                    this._paint(this._tiles[key].el);
+                }
+            }
+        },
+
+        // The feature under a point of the map, from the tile drawn there
+        _featureAt: function (latlng) {
+            if (this._tileZoom === undefined) {
+                return null;
+            }
+            var size = this.getTileSize(), point = this._map.project(latlng, this._tileZoom);
+            var coords = L.point(Math.floor(point.x / size.x), Math.floor(point.y / size.y));
+            coords.z = this._tileZoom;
+            var tile = this._tiles[this._tileCoordsToKey(coords)];
+            if (!tile || !tile.el._vector) {
+                return null;
+            }
+            var vector = tile.el._vector;
+            var x = (point.x - coords.x * size.x + vector.dx) / vector.k, y = (point.y - coords.y * size.y + vector.dy) / vector.k;
+            for (var f = vector.features.length - 1; f >= 0; f--) {
+                var inside = false;
+                vector.features[f].rings.forEach(function (ring) {
+                    for (var i = 0, j = ring.length - 1; i < ring.length; j = i++) {
+                        var a = ring[i], b = ring[j];
+                        if ((a[1] > y) !== (b[1] > y) && x < (b[0] - a[0]) * (y - a[1]) / (b[1] - a[1]) + a[0]) {
+                            inside = !inside;
+                        }
+                    }
+                });
+                if (inside) {
+                    return vector.features[f];
+                }
+            }
+            return null;
+        },
+
+        _asFeature: function (feature) {
+            return {type: "Feature", id: feature.id, properties: feature.properties, geometry: null};
+        },
+
+        _onMouseMove: function (e) {
+            var feature = this._featureAt(e.latlng);
+            var name = feature ? feature.properties[this._set.hideout.nameProp] : null;
+            this._map.getContainer().style.cursor = feature ? "pointer" : "";
+            if (name === this._hovered) {
+                return;
+            }
+            this._hovered = name;
+            this.repaint();
+            if (feature) {
+                window.dash_clientside.set_props(this._set.id, {hoverData: this._asFeature(feature)});
+            }
+        },
+
+        _onMouseOut: function () {
+            if (this._hovered !== null) {
+                this._hovered = null;
+                this.repaint();
+            }
+        },
+
+        _onClick: function (e) {
+            var feature = this._featureAt(e.latlng);
+            if (!feature) {
+                return;
+            }
+            window.dash_clientside.set_props(this._set.id, {clickData: this._asFeature(feature)});
+            var bounds = this._tileJson.feature_bounds[feature.properties[this._tileJson.name_property]];
+            if (this._set.zoomToBoundsOnClick && bounds) {
+                this._map.fitBounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]]);
+            }
+        },
+    });
+}
+
+// Adds, replaces or repaints the tile layer of a map once both its LayerGroup and hideout are known
+function syncTiles(geojsonId) {
+    var set = tileSets[geojsonId];
+    var url = set.hideout && set.hideout.tiles;
+    if (set.layer && (set.layer.url !== url || !set.group)) {
+        if (set.group) {
+            set.group.removeLayer(set.layer);
+        }
+        set.layer = null;
+    }
+    if (!set.group || !url) {
+        return;
+    }
+    if (set.layer) {
+        set.layer.repaint();
+        return;
+    }
+    var group = set.group;
+    loadTileJson(url).then(function (tileJson) {
+        if (set.group !== group || set.layer || set.hideout.tiles !== url) {
+            return;  // replaced meanwhile
+        }
+        var bounds = tileJson.bounds;
+        VectorTileLayer = VectorTileLayer || createLayerClass();
+        set.layer = new VectorTileLayer(tileJson, set, {
+            bounds: L.latLngBounds([[bounds[1], bounds[0]], [bounds[3], bounds[2]]]),
+            updateWhenZooming: false,
+            pane: "overlayPane",  // above the base map
+        });
+        group.addLayer(set.layer);
+    }, function (error) {
+        console.error("Failed to load map tiles: " + error);
+    });
+}
+
+window.vectorTiles = {
+    // "add" handler of the LayerGroup "<GeoJSON id>-tiles"
+    mount: function (group, context) {
+        var geojsonId = context.id.replace(/-tiles$/, "");
+        var set = tileSets[geojsonId] = tileSets[geojsonId] || {id: geojsonId};
+        set.group = group;
+        set.layer = null;  // a new group starts empty; its predecessor took its layer along
+        group.on("remove", function () {
+            if (set.group === group) {
+                set.group = null;
+                set.layer = null;
+            }
+        });
+        syncTiles(geojsonId);
+    },
+};
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    vectorTiles: {
+        restyle: function (hideout, hoverStyle, zoomToBoundsOnClick) {
+            var geojsonId = window.dash_clientside.callback_context.inputs_list[0].id;
+            var set = tileSets[geojsonId] = tileSets[geojsonId] || {id: geojsonId};
+            set.hideout = hideout;
+            set.hoverStyle = hoverStyle;
+            set.zoomToBoundsOnClick = zoomToBoundsOnClick;
+            syncTiles(geojsonId);
+            return window.dash_clientside.no_update;
+        },
+    },
+});
@@ -1,15 +1,12 @@
 import dash_mantine_components as dmc
 from dash import Input, Output, State, callback, html
-import sqlite3
-import pandas as pd
+from ..data.store import store
 
-conn = sqlite3.connect("./src/data/data.db")
-data = pd.read_sql_query(f"SELECT * FROM agriculture_data;", conn)
-
-agriculture_menu_items = [
-    dmc.MenuItem(name, href=f"/{name.lower().replace(' ', '-')}")
-    for name in data['Series Name'].unique()
-]
+def agriculture_menu_items():
+    return [
+        dmc.MenuItem(name, href=f"/{name.lower().replace(' ', '-')}")
+        for name in store.facets("agriculture_data").distinct['Series Name'].unique()
+    ]
 
 logo = "https://cdri.org.kh/storage/images/CDRI%20Logo_1704186788.png"
 buttons = [
@@ -0,0 +1,63 @@
+import os
+from dotenv import load_dotenv
+
+# Settings are read from the environment, with `.env` filling in anything unset
+load_dotenv()
+
+# Engine used by `filter_data`: "memory" filters the frames held by the dataset store,
+# "sql" pushes the filters down to SQLite as a single parameterised SELECT and leaves the
+# tables unloaded, so a worker only holds the rows of the reports it renders.
+FILTER_ENGINE = os.getenv("FILTER_ENGINE", "memory")
+
+# Read-only SQLite connections used by the dataset store (one per thread).
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", 64 * 1024))
+# Only for deployments where data.db never changes while the app runs; SQLite then
+# skips all locking and change detection.
+SQLITE_IMMUTABLE = os.getenv("SQLITE_IMMUTABLE", "false").lower() in ("1", "true", "yes")
+
+# Seconds between checks for a changed data.db; 0 disables hot reloading.
+DATA_RELOAD_INTERVAL = float(os.getenv("DATA_RELOAD_INTERVAL", 30))
+
+# Arrow snapshot of data.db, exported when the app starts (or by `python -m src.data.snapshot`);
+# used while it matches data.db.
+DATA_SNAPSHOT_DIR = os.getenv("DATA_SNAPSHOT_DIR", "./src/data/snapshot")
+
+# Vector tiles of the boundary maps, cut on startup when missing or stale (or by
+# `python -m src.data.tiles`); used while they match the boundary files.
+TILE_CACHE_DIR = os.getenv("TILE_CACHE_DIR", "./src/data/tiles")
+
+# Number of `filter_data` results kept per worker (least recently used are evicted); 0 disables.
+FILTER_CACHE_SIZE = int(os.getenv("FILTER_CACHE_SIZE", 256))
+
+# Storage of `Serverside` callback outputs (src/utils/serverside.py): values kept in memory
+# per worker, and an on-disk store shared by the workers, capped in size; values unused
+# for SERVERSIDE_TTL seconds are deleted by a background pass every SERVERSIDE_EVICT_INTERVAL.
+SERVERSIDE_CACHE_DIR = os.getenv("SERVERSIDE_CACHE_DIR", "file_system_backend")
+SERVERSIDE_MEMORY_SIZE = int(os.getenv("SERVERSIDE_MEMORY_SIZE", 64))
+SERVERSIDE_MAX_BYTES = int(os.getenv("SERVERSIDE_MAX_BYTES", 512 * 1024 * 1024))
+SERVERSIDE_TTL = float(os.getenv("SERVERSIDE_TTL", 24 * 3600))
+SERVERSIDE_EVICT_INTERVAL = float(os.getenv("SERVERSIDE_EVICT_INTERVAL", 300))
+
+# Rendered report panels shared by the workers of a host (src/utils/render_cache.py), keyed
+# on the filters, the data and the code version. 0 disables.
+RENDER_CACHE_PATH = os.getenv("RENDER_CACHE_PATH", "./render_cache.db")
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", 2000))
+# Code version of the cached panels, e.g. the git SHA of the deploy; by default a hash of the
+# Python sources under src/, so panels built by a previous deploy are never served.
+RENDER_CACHE_VERSION = os.getenv("RENDER_CACHE_VERSION")
+# Threads per worker building the report tabs that are not on screen into the render
+# cache after the visible one; 0 (the default) renders only the visible tab and starts no
+# thread. This prefetches the other tabs, it does not split one view's render. At most
+# RENDER_QUEUE_SIZE such renders wait per worker, and a newer filter state of a report
+# cancels the ones queued for the older state.
+RENDER_THREADS = int(os.getenv("RENDER_THREADS", 0))
+RENDER_QUEUE_SIZE = int(os.getenv("RENDER_QUEUE_SIZE", 4))
+# Longest a worker waits for an identical render already running in another worker before
+# rendering the view itself, and the age after which such a render is taken to have died.
+RENDER_WAIT_TIMEOUT = float(os.getenv("RENDER_WAIT_TIMEOUT", 2))
+RENDER_LEASE_TIMEOUT = float(os.getenv("RENDER_LEASE_TIMEOUT", 30))
+
+# Serves /api/cache-stats and /api/geometry/unmatched, which list the reports and filters
+# being viewed. Off by default; turn on for debugging or on hosts not reachable publicly.
+DIAGNOSTICS = os.getenv("DIAGNOSTICS", "false").lower() in ("1", "true", "yes")
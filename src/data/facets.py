@@ -0,0 +1,106 @@
+import json
+import pandas as pd
+
+# Wildcard key: the branch holding every value of a level, used when a dropdown is
+# unset or 'All'.
+ANY = "*"
+
+# Order in which each table's dropdowns narrow each other down
+FACET_LEVELS = {
+    "agriculture_data": ("Series Name", "Sub-Sector (2)", "Province", "Indicator", "Year"),
+    "education_data": ("Series Name", "Sub-Sector (1)", "Grade", "Province", "Indicator", "Year"),
+    "economic_data": ("Series Name", "Products", "Markets", "Indicator", "Year"),
+}
+
+
+class FacetTree:
+    """
+    Nested dictionary of the value combinations present in a table.
+
+    Each level maps a value of one column to the subtree of rows holding it, plus an
+    ANY branch covering all values, so the options of a dropdown under any selection
+    of the levels above it is a chain of dictionary lookups. Keys keep the order in
+    which values first appear in the table, like `Series.unique()`.
+    """
+
+    def __init__(self, frame, levels):
+        self.levels = tuple(col for col in levels if col in frame.columns)
+        self.root = {}
+        self._json = None
+        # Distinct level combinations in order of first appearance; also lists the sidebars' options
+        distinct = self.distinct = frame[list(self.levels)].drop_duplicates()
+        for row in zip(*(distinct[col].tolist() for col in self.levels)):
+            nodes = [self.root]
+            for value in row:
+                keys = (ANY,) if pd.isna(value) else (value, ANY)
+                nodes = [node.setdefault(key, {}) for node in nodes for key in keys]
+
+    def _node(self, column, selection):
+        node = self.root
+        for level in self.levels[:self.levels.index(column)]:
+            value = selection.get(level)
+            key = ANY if value is None or value == "All" else value
+            if key not in node and isinstance(key, str):
+                # Dropdowns send integer years as strings
+                key = next((k for k in node if str(k) == key), key)
+            node = node.get(key)
+            if node is None:
+                return {}
+        return node
+
+    def options(self, column, selection=None):
+        """
+        Returns the values of `column` present under a selection of the levels above it.
+
+        Parameters:
+            column (str): One of the tree's levels.
+            selection (dict): {column: value} for any levels above `column`; levels
+                that are missing, None or 'All' match every value.
+
+        Returns:
+            list: Distinct non-null values, in order of first appearance.
+        """
+        if column not in self.levels:
+            return []
+        return [key for key in self._node(column, selection or {}) if key is not ANY]
+
+    def cascade(self, selection):
+        """
+        Resolves every level at once: the options of each dropdown and the value it
+        should hold, keeping the selected value when it is still available.
+
+        Returns:
+            dict: {column: {'options': [...], 'value': ...}}; 'Year' defaults to the latest.
+        """
+        resolved, current = {}, {}
+        for level in self.levels:
+            options = self.options(level, current)
+            selected = selection.get(level)
+            if selected == "All":
+                value = selected
+            else:
+                value = next((option for option in options if str(option) == str(selected)), None)
+            if value is None and options:
+                value = max(options) if level == "Year" else options[0]
+            resolved[level] = {"options": options, "value": value}
+            current[level] = value
+        return resolved
+
+    def to_json(self):
+        """
+        Serialises the tree for the browser (assets/facets.js), once per tree and so
+        once per data version.
+
+        The distinct level combinations are sent in first-appearance order, each
+        column dictionary-encoded: `values[col]` lists its distinct values and
+        `codes[col][i]` indexes them for row i (-1 for missing). The browser derives
+        options the same way `options` does.
+        """
+        if self._json is None:
+            payload = {"levels": list(self.levels), "values": {}, "codes": {}}
+            for col in self.levels:
+                codes, uniques = pd.factorize(self.distinct[col])
+                payload["values"][col] = uniques.tolist()
+                payload["codes"][col] = codes.tolist()
+            self._json = json.dumps(payload, separators=(",", ":"))
+        return self._json
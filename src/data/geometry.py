@@ -0,0 +1,279 @@
+import hashlib
+import json
+import os
+import threading
+import pandas as pd
+from . import tiles as vector_tiles
+from . import topology
+from .. import config
+
+# Boundary files drawn by the report maps, by name
+BOUNDARY_FILES = {
+    "adm0": "./assets/geoBoundaries-KHM-ADM0_simplified.json",  # Cambodia
+    "adm1": "./assets/geoBoundaries-KHM-ADM1_simplified.json",  # Provinces, 'shapeName'
+    "countries": "./assets/countries.json",  # Export markets, 'name'
+}
+
+# Feature property holding the name that data rows are joined on
+NAME_PROPERTIES = {"adm0": "shapeName", "adm1": "shapeName", "countries": "name"}
+
+# Spellings used by the data for features named differently in the boundary files,
+# both sides normalised with `normalise_names`
+NAME_ALIASES = {
+    "usa": "unitedstatesofamerica",
+    "unitedstates": "unitedstatesofamerica",
+    "england": "unitedkingdom",
+    "netherland": "netherlands",
+    "korearepublicof": "southkorea",
+    "laopeoplesdemocraticrepublic": "laos",
+    "russianfederation": "russia",
+    "taiwanprovinceofchina": "taiwan",
+    "syriarepublic": "syria",
+}
+
+
+def normalise_names(names):
+    """
+    Reduces names to a comparable form: accents removed, case folded, and everything
+    but letters and digits dropped ('Siem Reap' and 'Siemreap', 'Viet Nam' and 'Vietnam'
+    compare equal), then known aliases resolved.
+
+    Parameters:
+        names (pd.Series): Names to normalise.
+
+    Returns:
+        pd.Series: The normalised names, with the same index.
+    """
+    normalised = (
+        names.astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", errors="ignore")
+        .str.decode("ascii")
+        .str.casefold()
+        .str.replace(r"[^0-9a-z]+", "", regex=True)
+    )
+    return normalised.replace(NAME_ALIASES)
+
+
+def _freeze(value):
+    """Turns the nested coordinate lists of a geometry into tuples, so they cannot be changed in place."""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _freeze(item) for key, item in value.items()}
+    return value
+
+
+class GeometryRegistry:
+    """
+    The boundary files drawn by the report maps, each parsed once per process.
+
+    The browser loads the files themselves from long-cached static URLs, so a map
+    update only sends the values to draw: `join` matches the rows of a filtered frame
+    to the features by name, and the resulting {feature name: value} mapping goes to
+    the GeoJSON component's hideout (see `style_handle`). The parsed files are
+    templates used for the matching; coordinates are stored as tuples and the
+    templates must not be modified.
+
+    `levels` lists the URLs the map picks its boundaries from as it zooms: the
+    simplified TopoJSON levels built by `python -m src.data.topology`, or the GeoJSON
+    file itself while those are missing or older than the file. `tiles` points the
+    province and world-market maps at the vector tiles cut by `ensure_tiles` at startup
+    (or `python -m src.data.tiles`) instead, while those match the file.
+    """
+
+    def __init__(self, files=BOUNDARY_FILES, name_properties=NAME_PROPERTIES, tile_dir=None):
+        self.files = dict(files)
+        self.name_properties = dict(name_properties)
+        self.tile_dir = config.TILE_CACHE_DIR if tile_dir is None else tile_dir
+        self.unmatched = {}  # boundary file -> data names seen by `join` that match no feature
+        self._templates = {}
+        self._name_indexes = {}
+        self._digests = {}
+        self._levels = {}
+        self._level_files = {}  # TopoJSON file name -> path, for the levels in use
+        self._bounds = {}
+        self._tile_sets = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Returns the parsed template of a boundary file (read-only), loading it on first use."""
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    with open(self.files[name]) as f:
+                        template = json.load(f)
+                    for feature in template["features"]:
+                        feature["geometry"] = _freeze(feature["geometry"])
+                    self._templates[name] = template
+        return template
+
+    def features(self, name):
+        """Returns the template features of a boundary file, in file order."""
+        return self.get(name)["features"]
+
+    def url(self, name):
+        """
+        Returns the URL the browser loads a boundary file from (see /api/geometry in app.py).
+
+        The URL carries a hash of the file, so it can be cached forever: it changes
+        whenever the file does.
+        """
+        return f"/api/geometry/{name}.json?v={self._digest(name)[:16]}"
+
+    def _digest(self, name):
+        digest = self._digests.get(name)
+        if digest is None:
+            digest = topology.file_hash(self.files[name])
+            self._digests[name] = digest
+        return digest
+
+    def levels(self, name, topology_dir=topology.TOPOLOGY_DIR):
+        """
+        Returns the boundary levels the map chooses from by zoom (assets/topology.js).
+
+        Returns:
+            list: {'url', 'tolerance'} dicts, coarsest first. 'tolerance' is the largest
+            simplification error of the level in degrees; the map loads the first level
+            whose error is below a screen pixel. Without a current TopoJSON build this is
+            the GeoJSON file alone, with tolerance 0.
+        """
+        levels = self._levels.get(name)
+        if levels is None:
+            manifest = (topology.read_manifest(topology_dir) or {}).get(name)
+            if manifest is not None and manifest["source"] == self._digest(name):
+                levels = []
+                for level in manifest["levels"]:
+                    with open(os.path.join(topology_dir, level["file"]), "rb") as f:
+                        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+                    levels.append({
+                        "url": f"/api/geometry/{level['file']}?v={digest}",
+                        "tolerance": level["tolerance"],
+                    })
+                    self._level_files[level["file"]] = os.path.join(topology_dir, level["file"])
+            else:
+                if manifest is not None:
+                    print(f"Error: TopoJSON of '{name}' is out of date, run python -m src.data.topology")
+                levels = [{"url": self.url(name), "tolerance": 0}]
+            self._levels[name] = levels
+        return levels
+
+    def level_path(self, file_name):
+        """Returns the path of a TopoJSON level listed by `levels`, or None."""
+        return self._level_files.get(file_name)
+
+    def tile_set(self, name):
+        """Returns the tile manifest entry of a boundary file, or None while it has no current tiles."""
+        if self._tile_sets is None:
+            self._tile_sets = vector_tiles.read_manifest(self.tile_dir) or {}
+        entry = self._tile_sets.get(name)
+        if entry is None or name not in self.files:
+            return None
+        if entry["source"] != self._digest(name):
+            print(f"Error: vector tiles of '{name}' are out of date, see GeometryRegistry.ensure_tiles")
+            self._tile_sets.pop(name)
+            return None
+        return entry
+
+    def ensure_tiles(self):
+        """
+        Cuts the vector tiles of every tile set (`tiles.TILE_SETS`) that is missing or older
+        than its boundary file, so no build step has to. Call it before `load_all` in the
+        gunicorn --preload master; cutting every set takes a few seconds.
+
+        Returns:
+            bool: Whether current tiles of every tile set are in place.
+        """
+        manifest = vector_tiles.read_manifest(self.tile_dir) or {}
+        stale = {
+            name: max_zoom for name, max_zoom in vector_tiles.TILE_SETS.items()
+            if name in self.files
+            and (manifest.get(name, {}).get("source"), manifest.get(name, {}).get("max_zoom")) != (self._digest(name), max_zoom)
+        }
+        if not stale:
+            return True
+        try:
+            vector_tiles.export_tiles(stale, self.tile_dir)
+        except OSError as e:
+            print(f"Error: could not write the vector tiles to {self.tile_dir}: {e}")
+            return False
+        self._tile_sets = None  # read again by the next `tile_set`
+        return True
+
+    def tiles(self, name):
+        """
+        Returns the TileJSON URL of a boundary file's vector tiles (/api/tiles in app.py,
+        drawn by assets/vectortiles.js), or None to load its `levels` instead.
+        """
+        entry = self.tile_set(name)
+        return None if entry is None else f"/api/tiles/{name}.json?v={entry['version']}"
+
+    def bounds(self, name):
+        """Returns [[south, west], [north, east]] of a boundary file, the initial view of its map."""
+        bounds = self._bounds.get(name)
+        if bounds is None:
+            xs, ys = [], []
+            for feature in self.features(name):
+                polygons = topology.geometry_polygons(feature["geometry"]) or []
+                for ring in (ring for polygon in polygons for ring in polygon):
+                    xs.extend(x for x, _ in ring)
+                    ys.extend(y for _, y in ring)
+            bounds = [[min(ys), min(xs)], [max(ys), max(xs)]]
+            self._bounds[name] = bounds
+        return bounds
+
+    def _name_index(self, name):
+        """Normalised feature name -> feature name, built once per boundary file."""
+        index = self._name_indexes.get(name)
+        if index is None:
+            names = pd.Series([feature["properties"][self.name_properties[name]] for feature in self.features(name)])
+            index = dict(zip(normalise_names(names), names))
+            self._name_indexes[name] = index
+        return index
+
+    def join(self, name, frame, column, value_column="Indicator Value"):
+        """
+        Maps the rows of a frame to the features of a boundary file in one pass.
+
+        Parameters:
+            name (str): A key of `files`.
+            frame (pd.DataFrame): The filtered data.
+            column (str): The column naming the feature of each row, e.g. 'Province' or 'Markets'.
+            value_column (str): The column holding the value to draw.
+
+        Returns:
+            tuple: ({feature name: value} taken from the first row of each feature, sorted
+            list of the column's names that match no feature). The unmatched names are
+            also collected in `unmatched`.
+        """
+        rows = frame[[column, value_column]].dropna(subset=[column])
+        names = rows[column].astype(str)
+        # Normalise each distinct name once, then look every row up
+        distinct = pd.Series(names.unique())
+        feature_of = dict(zip(distinct, normalise_names(distinct).map(self._name_index(name))))
+        features = names.map(feature_of)
+        matched = features.notna()
+
+        # First row per feature, as a filter on the feature name would find it
+        first = pd.DataFrame({"feature": features[matched], "value": rows.loc[matched, value_column]})
+        first = first.drop_duplicates("feature", keep="first")
+        values = dict(zip(first["feature"], first["value"].tolist()))
+
+        unmatched = sorted(set(names[~matched]))
+        if unmatched:
+            with self._lock:
+                self.unmatched.setdefault(name, set()).update(unmatched)
+        return values, unmatched
+
+    def load_all(self):
+        """Parses every boundary file up front, e.g. before gunicorn forks its workers."""
+        for name in self.files:
+            self.get(name)
+            self.levels(name)
+            self.tiles(name)
+            self.bounds(name)
+
+
+geometry = GeometryRegistry()
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from .. import config
+
+
+class ReadOnlyConnectionPool:
+    """
+    Hands each thread its own read-only SQLite connection to the database.
+
+    Connections are opened with `mode=ro` (plus `immutable=1` when configured) and tuned
+    for read-heavy work, so concurrent callbacks under `threaded=True` or gunicorn
+    threads never share a connection. Connections opened before a fork are discarded
+    in the child process.
+    """
+
+    def __init__(self, db_path, immutable=None, mmap_size=None, cache_size_kb=None):
+        self.db_path = db_path
+        self.immutable = config.SQLITE_IMMUTABLE if immutable is None else immutable
+        self.mmap_size = config.SQLITE_MMAP_SIZE if mmap_size is None else mmap_size
+        self.cache_size_kb = config.SQLITE_CACHE_SIZE_KB if cache_size_kb is None else cache_size_kb
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._generation = 0
+
+    def _connect(self):
+        uri = f"{Path(self.db_path).resolve().as_uri()}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only = 1;")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)};")
+        # Negative cache_size is in KiB rather than pages
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)};")
+        return conn
+
+    def connection(self):
+        """Returns the calling thread's connection, opening it on first use."""
+        if os.getpid() != self._pid:
+            # Forked worker: never reuse the parent's sockets/file handles
+            self._local = threading.local()
+            self._connections = []
+            self._lock = threading.Lock()
+            self._pid = os.getpid()
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.generation != self._generation:
+            # The database was replaced; this thread owns the stale connection, so close it here
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.generation = self._generation
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def refresh(self):
+        """Makes every thread open a fresh connection on its next use, e.g. after data.db is replaced."""
+        self._generation += 1
+
+    def close_all(self):
+        """Closes every connection handed out so far; threads reconnect on next use."""
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
@@ -0,0 +1,115 @@
+"""
+Columnar snapshot of data.db for fast, shared worker startup.
+
+The app exports it on startup when it is missing or stale (DatasetStore.ensure_snapshot),
+before gunicorn forks its workers. To export it by hand after publishing a new data.db:
+
+    python -m src.data.snapshot
+
+Each table is written as an uncompressed Arrow IPC file, already encoded the way
+the dataset store keeps it (categoricals as dictionaries, typed Year). Loading
+memory-maps the file, so every gunicorn worker on the host reads the same page
+cache instead of decoding SQLite rows into its own objects. The store only uses a
+snapshot whose manifest matches the current data.db; otherwise it reads SQLite.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: without pyarrow the store reads SQLite directly
+    pa = None
+
+SNAPSHOT_DIR = "./src/data/snapshot"
+MANIFEST = "manifest.json"
+
+
+def available():
+    return pa is not None
+
+
+def fingerprint(db_path):
+    """Content hash of the database file, recorded in the manifest to detect stale snapshots."""
+    digest = hashlib.sha256()
+    with open(db_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(snapshot_dir=SNAPSHOT_DIR):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_current(db_path, snapshot_dir=SNAPSHOT_DIR):
+    """True when a snapshot exists for exactly this version of the database."""
+    if not available():
+        return False
+    manifest = read_manifest(snapshot_dir)
+    return manifest is not None and manifest.get("fingerprint") == fingerprint(db_path)
+
+
+def export_snapshot(db_path, snapshot_dir=SNAPSHOT_DIR, tables=None):
+    """
+    Writes every table of the database to `<snapshot_dir>/<table>.arrow`.
+
+    Parameters:
+        db_path (str): The SQLite database to export.
+        snapshot_dir (str): Output directory, created if missing.
+        tables (iterable): Tables to export. Default is every table the store knows.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    from .store import TABLES, encode_columns
+
+    if not available():
+        raise RuntimeError("pyarrow is required to export a snapshot")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    source = fingerprint(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        written = {}
+        for table in tables or TABLES:
+            frame = encode_columns(pd.read_sql_query(f'SELECT * FROM "{table}";', conn))
+            arrow_table = pa.Table.from_pandas(frame, preserve_index=False)
+            # Write to a temporary file and rename, so a mapped snapshot is never rewritten in place
+            path = os.path.join(snapshot_dir, f"{table}.arrow")
+            with pa.OSFile(path + ".tmp", "wb") as sink:
+                with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                    writer.write_table(arrow_table)
+            os.replace(path + ".tmp", path)
+            written[table] = len(frame)
+    finally:
+        conn.close()
+
+    manifest = {"fingerprint": source, "tables": written}
+    with open(os.path.join(snapshot_dir, MANIFEST + ".tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(snapshot_dir, MANIFEST + ".tmp"), os.path.join(snapshot_dir, MANIFEST))
+    return manifest
+
+
+def load_table(table, snapshot_dir=SNAPSHOT_DIR):
+    """Memory-maps a snapshot table and returns it as a DataFrame without copying numeric columns."""
+    source = pa.memory_map(os.path.join(snapshot_dir, f"{table}.arrow"), "r")
+    arrow_table = pa.ipc.open_file(source).read_all()
+    return arrow_table.to_pandas(split_blocks=True)
+
+
+if __name__ == "__main__":
+    from .. import config
+    from .store import DB_PATH
+
+    manifest = export_snapshot(DB_PATH, config.DATA_SNAPSHOT_DIR)
+    for name, rows in manifest["tables"].items():
+        print(f"{name}: {rows} rows")
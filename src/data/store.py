@@ -0,0 +1,493 @@
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+import pandas as pd
+from .pool import ReadOnlyConnectionPool
+from . import snapshot as columnar
+from .facets import FACET_LEVELS, FacetTree
+from .. import config
+
+DB_PATH = "./src/data/data.db"
+TABLES = ("agriculture_data", "education_data", "economic_data")
+
+# Columns compared by `filter_data`; a few hundred distinct strings repeated across
+# every row, so they are stored as categoricals and compared by integer code.
+DIMENSION_COLUMNS = (
+    "Sector", "Series Name", "Sub-Sector (1)", "Sub-Sector (2)", "Indicator", "Products",
+    "Markets", "Grade", "Occupation", "Province", "Tag",
+)
+
+
+# Composite index used by the "sql" filter engine; columns missing from a table are skipped.
+INDEX_COLUMNS = ("Series Name", "Indicator", "Province", "Year")
+
+# Dtypes pandas reads each declared SQLite column type as, for query results without a value
+DECLARED_DTYPES = {"TEXT": "str", "REAL": "float64"}
+
+# Name of the row label column selected alongside the table's own columns
+ROW_LABEL = "__row"
+
+
+def ensure_indexes(db_path=DB_PATH):
+    """Creates the composite filter index on every table that does not have it yet."""
+    conn = sqlite3.connect(db_path)
+    try:
+        for table in TABLES:
+            columns = {row[1] for row in conn.execute(f'PRAGMA table_info("{table}");')}
+            indexed = [col for col in INDEX_COLUMNS if col in columns]
+            if indexed:
+                column_list = ", ".join(f'"{col}"' for col in indexed)
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{table}_filters" ON "{table}" ({column_list});')
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def encode_year(series):
+    """
+    Stores 'Year' as a real integer when every value is numeric.
+
+    Academic years such as '2012-2013' (education_data) cannot be integers, so those
+    columns fall back to a categorical like the other dimension columns.
+    """
+    years = pd.to_numeric(series, errors="coerce")
+    if years.notna().sum() != series.notna().sum():
+        return series.astype("category")
+    if years.notna().all():
+        return years.astype("int64")
+    return years.astype("Int64")
+
+
+def encode_columns(frame):
+    """Converts the dimension columns of a freshly loaded table to compact dtypes."""
+    frame = frame.copy()
+    for col in DIMENSION_COLUMNS:
+        if col in frame.columns and frame[col].dtype != "category":
+            frame[col] = frame[col].astype("category")
+    if "Year" in frame.columns:
+        frame["Year"] = encode_year(frame["Year"])
+    return frame
+
+
+class FacetIndex:
+    """
+    Maps each (column, value) pair of a table to the sorted row positions holding it.
+
+    Built once per loaded table so `filter_data` can intersect small position arrays
+    instead of scanning every row with a boolean mask.
+    """
+
+    def __init__(self, frame, columns=DIMENSION_COLUMNS + ("Year",)):
+        self._positions = {}
+        self._integer_columns = set()
+        for col in columns:
+            if col not in frame.columns:
+                continue
+            self._positions[col] = frame.groupby(col, observed=True, sort=False).indices
+            if pd.api.types.is_integer_dtype(frame[col]):
+                self._integer_columns.add(col)
+
+    def __contains__(self, column):
+        return column in self._positions
+
+    def positions(self, column, value):
+        """Returns the row positions where `column == value` (empty if the value never occurs)."""
+        if column not in self._positions:
+            raise KeyError(column)
+        if column in self._integer_columns and isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                return np.empty(0, dtype=np.intp)  # no integer equals a non-numeric string
+        return self._positions[column].get(value, np.empty(0, dtype=np.intp))
+
+
+class Snapshot:
+    """An immutable generation of loaded tables, swapped in whole when the database changes."""
+
+    def __init__(self, version, token=None):
+        self.version = version
+        self.token = token  # size and mtime of data.db when this generation was read
+        self.frames = {}
+        self.combined = {}
+        self.columnar = None  # whether the Arrow snapshot matches this generation of data.db
+        self.entries = {}  # id(frame) -> (frame, table, FacetIndex)
+        self.facets = {}  # table -> FacetTree driving the page dropdowns
+        self.schemas = {}  # table (or tuple of tables) -> dtypes of the encoded columns, for the "sql" engine
+
+    def add(self, table, frame):
+        self.entries[id(frame)] = (frame, table, FacetIndex(frame))
+        if table in FACET_LEVELS:
+            self.facets[table] = FacetTree(frame, FACET_LEVELS[table])
+        self.frames[table] = frame
+
+
+class DatasetStore:
+    """
+    Process-wide store that loads each table of the database once and shares it.
+
+    Every page, component and `filter_data` call reads from the same frames, so a
+    worker holds a single copy of each table instead of one copy per module. A
+    background watcher can rebuild the tables when the database changes and swap
+    them in without restarting the worker; `version` changes with every swap so
+    caches can key on it.
+    """
+
+    def __init__(self, db_path=DB_PATH, snapshot_dir=None):
+        self.db_path = db_path
+        self.snapshot_dir = config.DATA_SNAPSHOT_DIR if snapshot_dir is None else snapshot_dir
+        self.pool = ReadOnlyConnectionPool(db_path)
+        self._snapshot = Snapshot(version=1, token=self._source_token())
+        self._lock = threading.Lock()
+        self._watch_interval = None
+        self._watcher_pid = None
+        self._fingerprint = None
+
+    @property
+    def version(self):
+        """Token identifying the data currently served; bumped on every reload."""
+        return self._snapshot.version
+
+    @property
+    def data_token(self):
+        """
+        Identifies the data currently served the same way in every process, unlike
+        `version`, which counts reloads per worker. Use it for keys shared between
+        workers or kept across restarts.
+        """
+        return self._snapshot.token
+
+    def _source_token(self):
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return "missing"
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def _load(self, table, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        if snapshot.columnar is None:
+            snapshot.columnar = columnar.is_current(self.db_path, self.snapshot_dir)
+        if snapshot.columnar:
+            # Memory-mapped Arrow file, already encoded; shared page cache across workers
+            return columnar.load_table(table, self.snapshot_dir)
+        return encode_columns(pd.read_sql_query(f'SELECT * FROM "{table}";', self.pool.connection()))
+
+    def get(self, table):
+        """
+        Returns the shared frame for a table, loading it on first access.
+
+        The same frame is handed to every caller, so it must be treated as
+        read-only; derive new frames (filter, copy, rename) instead of mutating it.
+        Callbacks should call `get` each time rather than keep the frame, so they
+        pick up reloaded data.
+        """
+        snapshot = self._snapshot
+        frame = snapshot.frames.get(table)
+        if frame is None:
+            with self._lock:
+                snapshot = self._snapshot
+                frame = snapshot.frames.get(table)
+                if frame is None:
+                    frame = self._load(table)
+                    snapshot.add(table, frame)
+        return frame
+
+    def facets(self, table):
+        """
+        Returns the FacetTree of a table (see `facets.FACET_LEVELS`). A table that is not
+        loaded is not loaded for it: the tree is built from `distinct` level combinations.
+        """
+        snapshot = self._snapshot
+        tree = snapshot.facets.get(table)
+        if tree is None:
+            levels = FACET_LEVELS[table]
+            tree = FacetTree(self.distinct(table, levels), levels)
+            with self._lock:
+                tree = snapshot.facets.setdefault(table, tree)
+        return tree
+
+    def _entry(self, frame):
+        entry = self._snapshot.entries.get(id(frame))
+        if entry is not None and entry[0] is frame:
+            return entry
+        return None
+
+    def index_for(self, frame):
+        """Returns the FacetIndex of a frame handed out by `get`, or None for any other frame."""
+        entry = self._entry(frame)
+        return entry[2] if entry is not None else None
+
+    def table_of(self, frame):
+        """Returns the table name of a frame handed out by `get`, or None for any other frame."""
+        entry = self._entry(frame)
+        return entry[1] if entry is not None else None
+
+    def _columns(self, table, types=False):
+        rows = self.pool.connection().execute(f'PRAGMA table_info("{table}");').fetchall()
+        return {row[1]: row[2] for row in rows} if types else [row[1] for row in rows]
+
+    def _encode(self, table, frame):
+        """
+        Casts the columns of a query result to the dtypes of `schema`, in place. Other
+        columns that came back without any value (object dtype) get the dtype of their
+        declared type, as they have when the whole table is read.
+        """
+        schema = self.schema(table)
+        for col, declared in self._columns(table, types=True).items():
+            if col not in frame.columns:
+                continue
+            dtype = schema.get(col)
+            if dtype is None:
+                if frame[col].dtype == object and declared in DECLARED_DTYPES:
+                    frame[col] = frame[col].astype(DECLARED_DTYPES[declared])
+            elif col == "Year" and pd.api.types.is_integer_dtype(dtype):
+                frame[col] = pd.to_numeric(frame[col]).astype(dtype)
+            else:
+                frame[col] = frame[col].astype(dtype)
+        return frame
+
+    def schema(self, table):
+        """
+        Returns the dtypes `encode_columns` gives the dimension columns and Year of a table,
+        read from their distinct values in the database rather than by loading the table.
+
+        Returns:
+            dict: Column -> dtype, for the encoded columns the table has.
+        """
+        snapshot = self._snapshot
+        schema = snapshot.schemas.get(table)
+        if schema is None:
+            conn = self.pool.connection()
+            columns = self._columns(table)
+            schema = {}
+            for col in DIMENSION_COLUMNS + ("Year",):
+                if col not in columns:
+                    continue
+                # Categories are the sorted distinct values, as `astype("category")` builds them
+                distinct = pd.read_sql_query(f'SELECT DISTINCT "{col}" FROM "{table}";', conn)[col]
+                schema[col] = encode_year(distinct).dtype if col == "Year" else distinct.astype("category").dtype
+            snapshot.schemas[table] = schema
+        return schema
+
+    def query(self, table, criteria):
+        """
+        Runs equality filters as one parameterised SELECT against the database, served
+        by the composite index `ensure_indexes` builds when data.db is normalised.
+
+        Parameters:
+            table (str): The table to query.
+            criteria (list): (column, value) pairs that must all match.
+
+        Returns:
+            pd.DataFrame: The matching rows in table order, with the same columns, dimension
+            dtypes and row labels (rowid - 1, the position in the table) as filtering the
+            frame returned by `get`.
+        """
+        where = " AND ".join(f'"{column}" = ?' for column, _ in criteria)
+        params = [value.item() if isinstance(value, np.generic) else value for _, value in criteria]
+        sql = f'SELECT rowid - 1 AS "{ROW_LABEL}", * FROM "{table}"'
+        if where:
+            sql += f" WHERE {where}"
+        sql += " ORDER BY rowid;"
+
+        frame = pd.read_sql_query(sql, self.pool.connection(), params=params, index_col=ROW_LABEL)
+        frame.index.name = None
+        return self._encode(table, frame)
+
+    def filled_columns(self, table, criteria):
+        """
+        Returns the columns of a table holding at least one value among the rows matching
+        `criteria`, counted by SQLite without reading the rows.
+        """
+        columns = self._columns(table)
+        where = " AND ".join(f'"{column}" = ?' for column, _ in criteria) or "1"
+        params = [value.item() if isinstance(value, np.generic) else value for _, value in criteria]
+        count_list = ", ".join(f'COUNT("{col}")' for col in columns)
+        counts = self.pool.connection().execute(f'SELECT {count_list} FROM "{table}" WHERE {where};', params).fetchone()
+        return [col for col, count in zip(columns, counts) if count]
+
+    def distinct(self, table, columns):
+        """
+        Returns the distinct combinations of `columns` (those the table has) in order of
+        first appearance, labelled by that first row, with the dtypes of `get`.
+
+        Read from the loaded frame when the table is loaded, and otherwise with one
+        GROUP BY query, so dropdowns can be listed without loading the table.
+        """
+        frame = self._snapshot.frames.get(table)
+        if frame is not None:
+            return frame[[col for col in columns if col in frame.columns]].drop_duplicates()
+        present = self._columns(table)
+        columns = [col for col in columns if col in present]
+        if not columns:
+            return pd.DataFrame()
+        column_list = ", ".join(f'"{col}"' for col in columns)
+        frame = pd.read_sql_query(
+            f'SELECT MIN(rowid) - 1 AS "{ROW_LABEL}", {column_list} FROM "{table}" '
+            f"GROUP BY {column_list} ORDER BY 1;",
+            self.pool.connection(), index_col=ROW_LABEL,
+        )
+        frame.index.name = None
+        return self._encode(table, frame)
+
+    def select(self, tables, criteria):
+        """
+        Returns the rows of `combined(*tables)` matching equality `criteria`.
+
+        When any of the tables is not loaded, each table is queried instead (`query`) and
+        the results concatenated, labelled as in the combined frame, so nothing is loaded.
+        """
+        if all(table in self._snapshot.frames for table in tables):
+            frame = self.combined(*tables)
+            mask = np.ones(len(frame), dtype=bool)
+            for column, value in criteria:
+                mask &= (frame[column] == value).to_numpy()
+            return frame[mask]
+        frames, offset = [], 0
+        conn = self.pool.connection()
+        schema = self._combined_schema(tables)
+        for table in tables:
+            columns = self._columns(table)
+            if all(column in columns for column, _ in criteria):
+                rows = self.query(table, criteria)
+                rows.index += offset
+            else:
+                rows = pd.DataFrame(columns=columns)  # a filtered column the table lacks matches nothing
+            frames.append(rows)
+            offset += conn.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0]
+        # Categories differ between tables: give every encoded column the dtype it has in `combined`
+        frame = pd.concat(frames)
+        for col, dtype in schema.items():
+            frame[col] = frame[col].astype(object).astype(dtype)
+        return frame
+
+    def _combined_schema(self, tables):
+        """Dtypes of the encoded columns of `combined(*tables)`, from each table's distinct values."""
+        snapshot = self._snapshot
+        schema = snapshot.schemas.get(tables)
+        if schema is None:
+            schema = {}
+            for col in DIMENSION_COLUMNS + ("Year",):
+                parts = [self.distinct(table, [col]) for table in tables]
+                parts = [part[col] for part in parts if col in part.columns]
+                if parts:
+                    schema[col] = encode_columns(pd.concat(parts, ignore_index=True).to_frame())[col].dtype
+            snapshot.schemas[tables] = schema
+        return schema
+
+    def combined(self, *tables):
+        """Returns the tables concatenated row-wise, built once and shared like `get`."""
+        snapshot = self._snapshot
+        frame = snapshot.combined.get(tables)
+        if frame is None:
+            frames = [self.get(table) for table in tables]
+            with self._lock:
+                frame = snapshot.combined.get(tables)
+                if frame is None:
+                    # Categories differ between tables, so re-encode after concatenating
+                    frame = encode_columns(pd.concat(frames, ignore_index=True))
+                    snapshot.combined[tables] = frame
+        return frame
+
+    def ensure_snapshot(self):
+        """
+        Exports the Arrow snapshot when it is missing or older than the database, so the
+        tables are then memory-mapped instead of decoded from SQLite. Call it before
+        `load_all` in the gunicorn --preload master; no release step has to build it.
+
+        Returns:
+            bool: Whether a snapshot matching the database is in place.
+        """
+        if not columnar.available():
+            return False
+        if columnar.is_current(self.db_path, self.snapshot_dir):
+            return True
+        try:
+            columnar.export_snapshot(self.db_path, self.snapshot_dir)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error: could not write the data snapshot to {self.snapshot_dir}: {e}")
+            return False
+        self._snapshot.columnar = None  # checked again by the next load
+        return True
+
+    def load_all(self):
+        """Loads every known table up front, e.g. before gunicorn forks its workers."""
+        for table in TABLES:
+            self.get(table)
+
+    def reload(self):
+        """
+        Rebuilds every loaded table from the database and swaps the new generation in.
+
+        Requests keep using the old frames until the swap, which is a single
+        attribute assignment, so they never see a half-loaded snapshot.
+        """
+        self.pool.refresh()
+        old = self._snapshot
+        new = Snapshot(version=old.version + 1, token=self._source_token())
+        for table in list(old.frames):
+            new.add(table, self._load(table, new))
+        for tables in list(old.combined):
+            new.combined[tables] = encode_columns(pd.concat([new.frames[t] for t in tables], ignore_index=True))
+        with self._lock:
+            self._snapshot = new
+        return new.version
+
+    def _read_fingerprint(self):
+        stat = os.stat(self.db_path)
+        data_version = self.pool.connection().execute("PRAGMA data_version;").fetchone()[0]
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns, data_version)
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                fingerprint = self._read_fingerprint()
+                if fingerprint != self._fingerprint:
+                    self.reload()
+                    # Re-read: the pool reconnected, so data_version restarts
+                    self._fingerprint = self._read_fingerprint()
+            except Exception as e:
+                print(f"Error: failed to reload {self.db_path}: {e}")
+
+    def watch(self, interval):
+        """
+        Enables a daemon thread that polls the database every `interval` seconds and
+        reloads when its file (mtime/size/inode) or `PRAGMA data_version` changes.
+
+        Nothing starts here: `ensure_watcher` starts the thread in the process that calls
+        it, e.g. on each worker's first request, so a gunicorn --preload master that only
+        imports the app never polls.
+        """
+        self._watch_interval = interval
+
+    def ensure_watcher(self):
+        """Starts the watcher in this process if it is enabled and not yet running here."""
+        if not self._watch_interval or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        self._fingerprint = self._read_fingerprint()
+        threading.Thread(target=self._watch, args=(self._watch_interval,), daemon=True, name="data-watcher").start()
+
+    def memory_usage(self):
+        """
+        Reports the memory held by the store.
+
+        Returns:
+            dict: Bytes used per loaded table (and per combined view), plus a 'total' key.
+        """
+        snapshot = self._snapshot
+        usage = {table: int(frame.memory_usage(deep=True).sum()) for table, frame in snapshot.frames.items()}
+        for tables, frame in snapshot.combined.items():
+            usage[" + ".join(tables)] = int(frame.memory_usage(deep=True).sum())
+        usage["total"] = sum(usage.values())
+        return usage
+
+
+store = DatasetStore()
@@ -0,0 +1,330 @@
+"""
+Vector tiles of the province and world-market boundaries, cut ahead of time.
+
+The app cuts the tiles on startup when they are missing or older than the boundary
+files (GeometryRegistry.ensure_tiles), before gunicorn forks its workers. To cut them
+by hand after changing a boundary file:
+
+    python -m src.data.tiles
+
+Each file of `TILE_SETS` is cut into Mapbox Vector Tiles (MVT 2.1) for zooms 0 to its
+maximum zoom and written to `<tile_dir>/<name>/<z>/<x>/<y>.mvt`, next to the TileJSON
+`<tile_dir>/<name>/tilejson.json` describing the set. At every zoom the boundaries are
+simplified to half a pixel on the shared arcs of src/data/topology.py, so neighbours
+stay seamless, and clipped to the tile plus a small buffer; tiles without any feature
+are not written.
+The encoder below is a small protobuf writer, so cutting needs no extra package and
+nothing leaves the host. The app serves the tiles (/api/tiles in app.py) only while
+the manifest matches the boundary files; otherwise the maps load the TopoJSON levels.
+"""
+import hashlib
+import json
+import math
+import os
+import shutil
+import struct
+from . import topology
+
+TILE_DIR = "./src/data/tiles"
+MANIFEST = "manifest.json"
+
+# Tiled boundary files and their deepest zoom; the map scales the deepest tiles beyond it
+TILE_SETS = {"adm1": 10, "countries": 6}
+
+EXTENT = 4096  # tile coordinate units per side
+BUFFER = 64  # units drawn past each edge, so borders clipped at the edge stay out of sight
+TILE_SIZE = 256  # pixels per tile side on screen
+MAX_LATITUDE = 85.0511287798  # limit of web mercator
+
+
+# --- Protobuf wire format (https://protobuf.dev/programming-guides/encoding/) ---
+
+def _varint(value):
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value):
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _tag(number, wire_type):
+    return _varint(number << 3 | wire_type)
+
+
+def _message(number, payload):
+    return _tag(number, 2) + _varint(len(payload)) + payload
+
+
+def _packed(number, values):
+    return _message(number, b"".join(_varint(value) for value in values))
+
+
+def _value(value):
+    """An MVT Value message: string, bool, sint or double."""
+    if isinstance(value, bool):
+        return _tag(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        return _tag(6, 0) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _tag(3, 1) + struct.pack("<d", value)
+    return _message(1, str(value).encode())
+
+
+def _polygon_commands(rings):
+    """Geometry commands of a polygon feature: MoveTo, LineTo and ClosePath per ring, zigzag deltas."""
+    commands = []
+    cx = cy = 0
+    for ring in rings:
+        for i, (x, y) in enumerate(ring):
+            if i == 0:
+                commands.append(1 | 1 << 3)  # MoveTo, 1 point
+            elif i == 1:
+                commands.append(2 | (len(ring) - 1) << 3)  # LineTo, the rest of the ring
+            commands.extend((_zigzag(x - cx), _zigzag(y - cy)))
+            cx, cy = x, y
+        commands.append(7 | 1 << 3)  # ClosePath
+    return commands
+
+
+def encode_tile(layer_name, features, extent=EXTENT):
+    """
+    Encodes one layer of polygon features as a vector tile.
+
+    Parameters:
+        layer_name (str): Name of the layer in the tile.
+        features (list): (id, properties dict, rings) per feature; rings are lists of integer
+            (x, y) tile coordinates without the closing point, exterior rings with a positive
+            and holes with a negative area, each exterior followed by its holes. Properties
+            that are None are left out.
+        extent (int): Tile coordinate units per side.
+
+    Returns:
+        bytes: The MVT tile.
+    """
+    keys, values = {}, {}
+    encoded = []
+    for feature_id, properties, rings in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue  # MVT has no null; a missing key reads as null in the browser
+            tags.append(keys.setdefault(key, len(keys)))
+            tags.append(values.setdefault(value, len(values)))
+        encoded.append(_message(2, (
+            _tag(1, 0) + _varint(feature_id)
+            + _packed(2, tags)
+            + _tag(3, 0) + _varint(3)  # POLYGON
+            + _packed(4, _polygon_commands(rings))
+        )))
+    layer = (
+        _tag(15, 0) + _varint(2)
+        + _message(1, layer_name.encode())
+        + b"".join(encoded)
+        + b"".join(_message(3, key.encode()) for key in keys)
+        + b"".join(_message(4, _value(value)) for value in values)
+        + _tag(5, 0) + _varint(extent)
+    )
+    return _message(3, layer)
+
+
+# --- Cutting ---
+
+def _project(lon, lat):
+    """Web mercator position of a point as fractions of the world, y growing southwards."""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    sin = math.sin(math.radians(lat))
+    return (lon + 180) / 360, 0.5 - math.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+
+
+def _clip_ring(ring, box):
+    """Clips a ring to the box (min x, min y, max x, max y) one edge at a time (Sutherland-Hodgman)."""
+    for axis, bound, sign in ((0, box[0], 1), (1, box[1], 1), (0, box[2], -1), (1, box[3], -1)):
+        clipped = []
+        for i, current in enumerate(ring):
+            previous = ring[i - 1]
+            current_in = (current[axis] - bound) * sign >= 0
+            if current_in != ((previous[axis] - bound) * sign >= 0):
+                t = (bound - previous[axis]) / (current[axis] - previous[axis])
+                other = previous[1 - axis] + t * (current[1 - axis] - previous[1 - axis])
+                clipped.append((bound, other) if axis == 0 else (other, bound))
+            if current_in:
+                clipped.append(current)
+        ring = clipped
+        if not ring:
+            break
+    return ring
+
+
+def _area(ring):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1])) / 2
+
+
+def _tile_rings(polygons, left, top):
+    """Clips projected polygons to one tile and snaps them to integer tile coordinates."""
+    box = (left - BUFFER, top - BUFFER, left + EXTENT + BUFFER, top + EXTENT + BUFFER)
+    rings = []
+    for polygon in polygons:
+        clipped = []
+        for ring in polygon:
+            points = []
+            for x, y in _clip_ring(ring, box):
+                point = (round(x - left), round(y - top))
+                if not points or points[-1] != point:
+                    points.append(point)
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            area = _area(points) if len(points) >= 3 else 0
+            if not area:
+                if not clipped:
+                    break  # exterior gone: skip the polygon with its holes
+                continue
+            # MVT winding: the exterior has a positive area in tile coordinates, holes negative
+            exterior = not clipped
+            clipped.append(points if (area > 0) == exterior else points[::-1])
+        rings.extend(clipped)
+    return rings
+
+
+def cut_tiles(geojson, name, max_zoom, name_property):
+    """
+    Cuts a boundary file into vector tiles.
+
+    Parameters:
+        geojson (dict): FeatureCollection of polygons.
+        name (str): Layer name.
+        max_zoom (int): Deepest zoom to cut.
+        name_property (str): The feature property kept in the tiles (the name the maps join on).
+
+    Yields:
+        tuple: (z, x, y, tile bytes) for every tile holding a feature.
+    """
+    topo, arcs = topology.build_topology(geojson, name)
+    transform = topo["transform"]
+    geometries = topo["objects"][name]["geometries"]
+    for z in range(max_zoom + 1):
+        size = EXTENT * 2 ** z
+        # Half a pixel at the equator; borders stay shared since whole arcs are simplified
+        simplified = topology.simplify(arcs, 180 / (TILE_SIZE * 2 ** z), transform)
+        tiles = {}
+        for feature_id, geometry in enumerate(geometries, start=1):
+            properties = {name_property: geometry["properties"].get(name_property)}
+            polygons = [
+                [[tuple(v * size for v in _project(lon, lat)) for lon, lat in ring[:-1]] for ring in polygon]
+                for polygon in topology.polygons_of(geometry, simplified, transform)
+            ]
+            points = [point for polygon in polygons for point in polygon[0]]
+            if not points:
+                continue
+            x0 = max(0, int((min(x for x, _ in points) - BUFFER) // EXTENT))
+            x1 = min(2 ** z - 1, int((max(x for x, _ in points) + BUFFER) // EXTENT))
+            y0 = max(0, int((min(y for _, y in points) - BUFFER) // EXTENT))
+            y1 = min(2 ** z - 1, int((max(y for _, y in points) + BUFFER) // EXTENT))
+            for x in range(x0, x1 + 1):
+                for y in range(y0, y1 + 1):
+                    rings = _tile_rings(polygons, x * EXTENT, y * EXTENT)
+                    if rings:
+                        tiles.setdefault((x, y), []).append((feature_id, properties, rings))
+        for (x, y), features in sorted(tiles.items()):
+            yield z, x, y, encode_tile(name, features)
+
+
+def export_tiles(tile_sets=None, tile_dir=TILE_DIR):
+    """
+    Cuts every tile set and writes it to `tile_dir`, replacing the previous tiles.
+
+    Parameters:
+        tile_sets (dict): Boundary name -> deepest zoom. Default is `TILE_SETS`.
+        tile_dir (str): Output directory, created if missing.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    from .geometry import BOUNDARY_FILES, NAME_PROPERTIES
+
+    os.makedirs(tile_dir, exist_ok=True)
+    manifest = read_manifest(tile_dir) or {}
+    for name, max_zoom in (tile_sets or TILE_SETS).items():
+        with open(BOUNDARY_FILES[name]) as f:
+            geojson = json.load(f)
+        name_property = NAME_PROPERTIES[name]
+
+        # Cut into a fresh directory and swap it in, so the server never mixes two cuts
+        staging = os.path.join(tile_dir, name + ".tmp")
+        shutil.rmtree(staging, ignore_errors=True)
+        digest = hashlib.sha256()
+        count = 0
+        for z, x, y, data in cut_tiles(geojson, name, max_zoom, name_property):
+            path = os.path.join(staging, str(z), str(x), f"{y}.mvt")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+            digest.update(f"{z}/{x}/{y}".encode() + data)
+            count += 1
+        version = digest.hexdigest()[:16]
+
+        # Bounds of each feature, for zooming to a clicked boundary
+        feature_bounds = {}
+        west = south = math.inf
+        east = north = -math.inf
+        for feature in geojson["features"]:
+            points = [
+                point
+                for polygon in (topology.geometry_polygons(feature.get("geometry")) or [])
+                for ring in polygon
+                for point in ring
+            ]
+            if not points:
+                continue
+            bounds = [min(x for x, _ in points), min(y for _, y in points), max(x for x, _ in points), max(y for _, y in points)]
+            feature_bounds[feature["properties"][name_property]] = bounds
+            west, south = min(west, bounds[0]), min(south, bounds[1])
+            east, north = max(east, bounds[2]), max(north, bounds[3])
+
+        tilejson = {
+            "tilejson": "3.0.0",
+            "name": name,
+            "tiles": [f"/api/tiles/{name}/{{z}}/{{x}}/{{y}}.mvt?v={version}"],
+            "minzoom": 0,
+            "maxzoom": max_zoom,
+            "bounds": [west, max(south, -MAX_LATITUDE), east, min(north, MAX_LATITUDE)],
+            "vector_layers": [{"id": name, "fields": {name_property: "String"}, "minzoom": 0, "maxzoom": max_zoom}],
+            "name_property": name_property,
+            "feature_bounds": feature_bounds,
+        }
+        with open(os.path.join(staging, "tilejson.json"), "w") as f:
+            json.dump(tilejson, f, separators=(",", ":"))
+
+        target = os.path.join(tile_dir, name)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        manifest[name] = {
+            "source": topology.file_hash(BOUNDARY_FILES[name]),
+            "max_zoom": max_zoom,
+            "tiles": count,
+            "version": version,
+        }
+
+    with open(os.path.join(tile_dir, MANIFEST + ".tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(tile_dir, MANIFEST + ".tmp"), os.path.join(tile_dir, MANIFEST))
+    return manifest
+
+
+def read_manifest(tile_dir=TILE_DIR):
+    try:
+        with open(os.path.join(tile_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    from .. import config
+
+    for name, entry in export_tiles(tile_dir=config.TILE_CACHE_DIR).items():
+        print(f"{name}: {entry['tiles']} tiles, zoom 0-{entry['max_zoom']}")
@@ -0,0 +1,292 @@
+"""
+Multi-resolution TopoJSON of the map boundary files.
+
+Build it after changing a boundary file:
+
+    python -m src.data.topology
+
+Each file of `geometry.BOUNDARY_FILES` is quantised to an integer grid and turned
+into a topology: borders shared by two provinces (or countries) are stored once as
+an arc and referenced by both. Every arc is then simplified with Douglas-Peucker at
+each tolerance of `LEVELS`, so neighbours stay seamless at every level, and written
+delta-encoded as `<name>-<level>.topo.json`. The browser decodes the levels
+(assets/topology.js) and loads the coarsest one whose error stays under a pixel at
+the current zoom. A level set is only used while its manifest matches the source
+file; otherwise the map falls back to the GeoJSON.
+"""
+import hashlib
+import json
+import os
+
+TOPOLOGY_DIR = "./src/data/topology"
+MANIFEST = "manifest.json"
+
+# Simplification tolerance of each level in degrees, coarsest first; 0 keeps every
+# quantised point. Level i is used while a screen pixel spans at least LEVELS[i] degrees.
+LEVELS = (0.05, 0.01, 0.0025, 0)
+
+# Grid steps per axis over the bounding box of a file
+QUANTIZATION = 100000
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def geometry_polygons(geometry):
+    """The polygons of a GeoJSON geometry as lists of rings, or None for other types."""
+    if geometry is None:
+        return None
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return geometry["coordinates"]
+    return None
+
+
+def _quantize_ring(ring, transform):
+    """Snaps a ring to the grid and returns its points without repeats or the closing point."""
+    (kx, ky), (x0, y0) = transform["scale"], transform["translate"]
+    points = []
+    for x, y in ring:
+        point = (round((x - x0) / kx), round((y - y0) / ky))
+        if not points or points[-1] != point:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def _junctions(rings):
+    """Points where rings meet or part ways; arcs are cut there so shared borders line up."""
+    neighbours = {}
+    junctions = set()
+    for ring in rings:
+        n = len(ring)
+        for i, point in enumerate(ring):
+            pair = (ring[i - 1], ring[(i + 1) % n])
+            seen = neighbours.setdefault(point, pair)
+            if seen != pair and seen != pair[::-1]:
+                junctions.add(point)
+    return junctions
+
+
+def _canonical_ring(ring):
+    """A closed ring rotated to start at its smallest point, in the direction that sorts first."""
+    start = ring.index(min(ring))
+    forward = ring[start:] + ring[:start]
+    backward = [forward[0]] + forward[:0:-1]
+    if backward < forward:
+        return backward + [backward[0]], True
+    return forward + [forward[0]], False
+
+
+class _ArcIndex:
+    def __init__(self):
+        self.arcs = []
+        self._index = {}
+
+    def add(self, points, reversed_=False):
+        """Returns the arc reference of `points` (~index when stored the other way round)."""
+        key = tuple(points)
+        if key in self._index:
+            ref = self._index[key]
+        elif key[::-1] in self._index:
+            ref = ~self._index[key[::-1]]
+        else:
+            ref = len(self.arcs)
+            self.arcs.append(list(points))
+            self._index[key] = ref
+        return ~ref if reversed_ else ref
+
+    def cut(self, ring, junctions):
+        """Splits a ring at its junctions and returns the arc references that rebuild it."""
+        cuts = [i for i, point in enumerate(ring) if point in junctions]
+        if not cuts:
+            closed, reversed_ = _canonical_ring(ring)
+            return [self.add(closed, reversed_)]
+        rotated = ring[cuts[0]:] + ring[:cuts[0]]
+        offsets = [i - cuts[0] for i in cuts] + [len(ring)]
+        rotated.append(rotated[0])
+        return [self.add(rotated[a:b + 1]) for a, b in zip(offsets, offsets[1:])]
+
+
+def _douglas_peucker(points, tolerance):
+    """Simplifies an open polyline, keeping both ends; `tolerance` is in grid units."""
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1), (x2, y2) = points[first], points[last]
+        dx, dy = x2 - x1, y2 - y1
+        length = (dx * dx + dy * dy) ** 0.5
+        worst, index = -1.0, None
+        for i in range(first + 1, last):
+            x, y = points[i]
+            if length:
+                distance = abs(dy * (x - x1) - dx * (y - y1)) / length
+            else:
+                distance = ((x - x1) ** 2 + (y - y1) ** 2) ** 0.5
+            if distance > worst:
+                worst, index = distance, i
+        if index is not None and worst > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def _simplify_arc(arc, tolerance):
+    if arc[0] != arc[-1]:
+        return _douglas_peucker(arc, tolerance)
+    # Closed ring: split at the point farthest from the start so the shape survives
+    x0, y0 = arc[0]
+    far = max(range(len(arc)), key=lambda i: (arc[i][0] - x0) ** 2 + (arc[i][1] - y0) ** 2)
+    simplified = _douglas_peucker(arc[:far + 1], tolerance)[:-1] + _douglas_peucker(arc[far:], tolerance)
+    return simplified if len(simplified) >= 4 else arc
+
+
+def simplify(arcs, tolerance, transform):
+    """Simplifies every arc of a topology to `tolerance` degrees, keeping their ends."""
+    scale = min(transform["scale"])
+    return [_simplify_arc(arc, tolerance / scale) for arc in arcs]
+
+
+def polygons_of(geometry, arcs, transform):
+    """
+    Rebuilds the polygons of a topology geometry from its arcs.
+
+    Returns:
+        list: Polygons as lists of closed rings of (lon, lat) points; empty for null geometries.
+    """
+    if geometry.get("type") is None:
+        return []
+    polygons = [geometry["arcs"]] if geometry["type"] == "Polygon" else geometry["arcs"]
+    (kx, ky), (x0, y0) = transform["scale"], transform["translate"]
+    result = []
+    for polygon in polygons:
+        rings = []
+        for refs in polygon:
+            ring = []
+            for i, ref in enumerate(refs):
+                arc = arcs[~ref][::-1] if ref < 0 else arcs[ref]
+                ring.extend(arc[1:] if i else arc)
+            rings.append([(x * kx + x0, y * ky + y0) for x, y in ring])
+        result.append(rings)
+    return result
+
+
+def _delta_encode(arc):
+    encoded = [list(arc[0])]
+    for (x0, y0), (x1, y1) in zip(arc, arc[1:]):
+        encoded.append([x1 - x0, y1 - y0])
+    return encoded
+
+
+def build_topology(geojson, object_name, quantization=QUANTIZATION):
+    """
+    Converts a GeoJSON FeatureCollection of polygons to a quantised topology.
+
+    Returns:
+        tuple: (topology dict without "arcs", list of arcs as grid point lists).
+    """
+    coordinates = [
+        point
+        for feature in geojson["features"]
+        for polygon in (geometry_polygons(feature.get("geometry")) or [])
+        for ring in polygon
+        for point in ring
+    ]
+    x0, x1 = min(x for x, _ in coordinates), max(x for x, _ in coordinates)
+    y0, y1 = min(y for _, y in coordinates), max(y for _, y in coordinates)
+    transform = {
+        "scale": [(x1 - x0) / (quantization - 1) or 1, (y1 - y0) / (quantization - 1) or 1],
+        "translate": [x0, y0],
+    }
+
+    shapes = []
+    for feature in geojson["features"]:
+        polygons = geometry_polygons(feature.get("geometry"))
+        if polygons is None:
+            shapes.append(None)
+            continue
+        quantized = [[_quantize_ring(ring, transform) for ring in polygon] for polygon in polygons]
+        # Rings that collapse on the grid (tiny islands) are dropped; a polygon needs its outer ring
+        quantized = [[ring for ring in polygon if len(ring) >= 3] for polygon in quantized]
+        shapes.append([polygon for polygon in quantized if polygon and len(polygon[0]) >= 3])
+
+    junctions = _junctions([ring for polygons in shapes if polygons for polygon in polygons for ring in polygon])
+    index = _ArcIndex()
+    geometries = []
+    for feature, polygons in zip(geojson["features"], shapes):
+        geometry = {"type": None}
+        if polygons:
+            arcs = [[index.cut(ring, junctions) for ring in polygon] for polygon in polygons]
+            geometry = {"type": "Polygon", "arcs": arcs[0]} if len(arcs) == 1 else {"type": "MultiPolygon", "arcs": arcs}
+        if "id" in feature:
+            geometry["id"] = feature["id"]
+        geometry["properties"] = feature.get("properties") or {}
+        geometries.append(geometry)
+
+    topology = {
+        "type": "Topology",
+        "bbox": [x0, y0, x1, y1],
+        "transform": transform,
+        "objects": {object_name: {"type": "GeometryCollection", "geometries": geometries}},
+    }
+    return topology, index.arcs
+
+
+def export_pyramid(files=None, topology_dir=TOPOLOGY_DIR, levels=LEVELS, quantization=QUANTIZATION):
+    """
+    Writes every level of every boundary file to `<topology_dir>/<name>-<level>.topo.json`.
+
+    Parameters:
+        files (dict): Boundary name -> GeoJSON path. Default is `geometry.BOUNDARY_FILES`.
+        topology_dir (str): Output directory, created if missing.
+        levels (tuple): Simplification tolerances in degrees, coarsest first.
+        quantization (int): Grid steps per axis.
+
+    Returns:
+        dict: The manifest that was written.
+    """
+    from .geometry import BOUNDARY_FILES
+
+    os.makedirs(topology_dir, exist_ok=True)
+    manifest = {}
+    for name, path in (files or BOUNDARY_FILES).items():
+        with open(path) as f:
+            topology, arcs = build_topology(json.load(f), name, quantization)
+        written = []
+        for level, tolerance in enumerate(levels):
+            topology["arcs"] = [_delta_encode(arc) for arc in simplify(arcs, tolerance, topology["transform"])]
+            file_name = f"{name}-{level}.topo.json"
+            with open(os.path.join(topology_dir, file_name + ".tmp"), "w") as f:
+                json.dump(topology, f, separators=(",", ":"))
+            os.replace(os.path.join(topology_dir, file_name + ".tmp"), os.path.join(topology_dir, file_name))
+            written.append({"file": file_name, "tolerance": tolerance})
+        manifest[name] = {"source": file_hash(path), "object": name, "levels": written}
+
+    with open(os.path.join(topology_dir, MANIFEST + ".tmp"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(os.path.join(topology_dir, MANIFEST + ".tmp"), os.path.join(topology_dir, MANIFEST))
+    return manifest
+
+
+def read_manifest(topology_dir=TOPOLOGY_DIR):
+    try:
+        with open(os.path.join(topology_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    manifest = export_pyramid()
+    for name, entry in manifest.items():
+        sizes = [os.path.getsize(os.path.join(TOPOLOGY_DIR, level["file"])) for level in entry["levels"]]
+        print(f"{name}: " + ", ".join(f"{level['tolerance']}° {size // 1024} KB" for level, size in zip(entry["levels"], sizes)))
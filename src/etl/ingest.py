@@ -0,0 +1,168 @@
+"""
+Streaming import of the source workbooks into the staging database.
+
+    python -m src.etl.ingest src/etl/Unpivoted_Datahub_Agriculture.xlsx --sheet Sheet1 --table agriculture_data
+
+The sheet is read with openpyxl in read-only mode, one row at a time, and written
+to SQLite in chunks, so the workbook is never held in memory as a whole. The
+content hash of every imported workbook is kept in the `_ingest_log` table; when
+the file has not changed since the last import the parse is skipped entirely.
+
+Imports go to `STAGING_DB_PATH`, never to the data.db the app serves, so an import
+does not reload the workers or invalidate their caches. `python -m src.etl.normalise`
+publishes the staged dashboard tables to data.db in one step.
+"""
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from itertools import islice
+import pandas as pd
+from openpyxl import load_workbook
+STAGING_DB_PATH = "./src/etl/staging.db"
+CHUNK_SIZE = 5000
+LOG_TABLE = "_ingest_log"
+
+
+def workbook_hash(file_path):
+    """sha256 of the workbook bytes; used to detect an unchanged source file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_table(file_path):
+    """Staging table name derived from the file name, e.g. 'raw_datahub_agri_latest'."""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return "raw_" + "".join(c if c.isalnum() else "_" for c in stem.lower())
+
+
+def _column_names(header):
+    """Names blank header cells and de-duplicates repeated ones the way pandas.read_excel does."""
+    names, seen = [], {}
+    for i, name in enumerate(header):
+        name = f"Unnamed: {i}" if name is None else str(name)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _ensure_log(conn):
+    conn.execute(
+        f'CREATE TABLE IF NOT EXISTS "{LOG_TABLE}" ('
+        '"table_name" TEXT PRIMARY KEY, "source" TEXT, "sheet" TEXT, '
+        '"sha256" TEXT, "rows" INTEGER, "imported_at" TEXT);'
+    )
+
+
+def last_import(table, db_path=STAGING_DB_PATH):
+    """Returns the `_ingest_log` row of a table as a dict, or None if it was never imported."""
+    conn = sqlite3.connect(db_path)
+    try:
+        _ensure_log(conn)
+        row = conn.execute(f'SELECT * FROM "{LOG_TABLE}" WHERE "table_name" = ?;', (table,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("table_name", "source", "sheet", "sha256", "rows", "imported_at"), row))
+    finally:
+        conn.close()
+
+
+def ingest_workbook(file_path, table=None, sheet_name="Database", db_path=STAGING_DB_PATH, chunk_size=CHUNK_SIZE, force=False):
+    """
+    Streams one sheet of a workbook into a table of the staging database.
+
+    Rows are written to a staging table first and swapped in at the end, so a failed
+    import leaves the previous table untouched and readers never see a partial one.
+
+    Parameters:
+        file_path (str): The path to the Excel file.
+        table (str): Destination table. Default is derived from the file name.
+        sheet_name (str): The name of the sheet to read. Default is 'Database'.
+        db_path (str): The SQLite database to write to.
+        chunk_size (int): Number of rows parsed and inserted per batch.
+        force (bool): Re-import even if the workbook is unchanged.
+
+    Returns:
+        bool: True if the sheet was imported, False if it was skipped as unchanged.
+    """
+    table = table or default_table(file_path)
+    digest = workbook_hash(file_path)
+    previous = last_import(table, db_path)
+    if not force and previous is not None and previous["sha256"] == digest and previous["sheet"] == sheet_name:
+        return False
+
+    staging = f"{table}__staging"
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        while header and header[-1] is None:
+            header.pop()  # formatting-only trailing columns that read-only mode still reports
+        columns = _column_names(header)
+        width = len(columns)
+        conn.execute(f'DROP TABLE IF EXISTS "{staging}";')
+        total = 0
+        while True:
+            chunk = [row[:width] for row in islice(rows, chunk_size)]
+            if not chunk:
+                break  # end of the sheet
+            chunk = [row for row in chunk if any(value is not None for value in row)]
+            if not chunk:
+                continue  # a run of blank rows; more data may follow it
+            frame = pd.DataFrame.from_records(chunk, columns=columns)
+            frame.to_sql(staging, conn, if_exists="append", index=False)
+            total += len(frame)
+        if not total:
+            # Header-only sheet: keep the empty table so the schema exists
+            pd.DataFrame(columns=columns).to_sql(staging, conn, index=False)
+
+        with conn:
+            _ensure_log(conn)
+            conn.execute(f'DROP TABLE IF EXISTS "{table}";')
+            conn.execute(f'ALTER TABLE "{staging}" RENAME TO "{table}";')
+            conn.execute(
+                f'INSERT OR REPLACE INTO "{LOG_TABLE}" VALUES (?, ?, ?, ?, ?, ?);',
+                (table, os.path.abspath(file_path), sheet_name, digest, total, time.strftime("%Y-%m-%d %H:%M:%S")),
+            )
+    finally:
+        conn.close()
+        workbook.close()
+    return True
+
+
+def read_table(table, db_path=STAGING_DB_PATH):
+    conn = sqlite3.connect(db_path)
+    try:
+        return pd.read_sql_query(f'SELECT * FROM "{table}";', conn)
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import a workbook sheet into the staging database")
+    parser.add_argument("workbook")
+    parser.add_argument("--sheet", default="Database")
+    parser.add_argument("--table", default=None)
+    parser.add_argument("--db", default=STAGING_DB_PATH)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    table = args.table or default_table(args.workbook)
+    if ingest_workbook(args.workbook, table, args.sheet, args.db, args.chunk_size, args.force):
+        print(f"{table}: imported {last_import(table, args.db)['rows']} rows from {args.workbook}")
+    else:
+        print(f"{table}: {args.workbook} unchanged since last import, skipped")
+
+
+if __name__ == "__main__":
+    main()
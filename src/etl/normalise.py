@@ -0,0 +1,133 @@
+"""
+One-off normalisation of the dashboard tables in data.db.
+
+    python -m src.etl.normalise [--source src/data/data.db] [--target src/data/data.db] [--staging src/etl/staging.db]
+
+Dashboard tables imported into the staging database (`python -m src.etl.ingest
+... --table agriculture_data`) replace the ones in data.db; the others are
+cleaned again as they are.
+
+Cleans the tables once so callbacks do not have to on every request: strips
+strings, fixes the misspelt coordinate columns, types `Year` and `Date`, and drops
+columns that are entirely empty. The cleaned database is written next to the
+target and moved into place in one step, so a running app (which watches
+data.db) only ever sees the old or the new file.
+"""
+import argparse
+import os
+import sqlite3
+import pandas as pd
+from ..data.store import DB_PATH, TABLES, ensure_indexes
+from .ingest import STAGING_DB_PATH
+
+# Misspellings carried over from the source workbooks
+COLUMN_FIXES = {"Latiude": "Latitude", "Longtitude": "Longitude"}
+COORDINATE_COLUMNS = ("Latitude", "Longitude")
+
+
+def normalise_frame(frame):
+    """
+    Returns a cleaned copy of one table.
+
+    Parameters:
+        frame (pd.DataFrame): A table as read from data.db.
+
+    Returns:
+        pd.DataFrame: The table with stripped strings, fixed column names, typed
+        'Year'/'Date'/coordinates and no all-empty columns.
+    """
+    frame = frame.copy()
+
+    # Fix misspelt columns; where both spellings exist, fill the gaps of the correct one
+    for wrong, right in COLUMN_FIXES.items():
+        if wrong not in frame.columns:
+            continue
+        if right in frame.columns:
+            frame[right] = frame[right].combine_first(frame[wrong])
+            frame = frame.drop(columns=wrong)
+        else:
+            frame = frame.rename(columns={wrong: right})
+
+    for col in frame.columns:
+        if pd.api.types.is_object_dtype(frame[col]) or pd.api.types.is_string_dtype(frame[col]):
+            stripped = frame[col].map(lambda v: v.strip() if isinstance(v, str) else v)
+            frame[col] = stripped.mask(stripped == "")
+
+    # Year: integer when every value is numeric; academic years ('2012-2013') stay text
+    if "Year" in frame.columns:
+        years = pd.to_numeric(frame["Year"], errors="coerce")
+        if years.notna().sum() == frame["Year"].notna().sum():
+            frame["Year"] = years.astype("Int64")
+
+    # Date: ISO 'YYYY-MM-DD' text, the form SQLite date functions understand
+    if "Date" in frame.columns:
+        dates = pd.to_datetime(frame["Date"], errors="coerce")
+        frame["Date"] = dates.dt.strftime("%Y-%m-%d").where(dates.notna())
+
+    for col in COORDINATE_COLUMNS:
+        if col in frame.columns:
+            frame[col] = pd.to_numeric(frame[col], errors="coerce")
+
+    return frame.dropna(axis=1, how="all")
+
+
+def normalise_database(source=DB_PATH, target=None, tables=TABLES, staging=None):
+    """
+    Writes a cleaned copy of `source` to `target` (default: overwrite `source`).
+
+    Parameters:
+        source (str): The database currently served.
+        target (str): Where to write the result. Default is `source`.
+        tables (iterable): The dashboard tables to normalise; other tables are copied unchanged.
+        staging (str): Database of imported sheets (src.etl.ingest). Tables of `tables`
+            found there are read from it instead of `source`. Default is none.
+
+    Returns:
+        dict: Row and column counts per normalised table.
+    """
+    target = target or source
+    tmp = target + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(tmp)
+    staged = sqlite3.connect(f"file:{staging}?mode=ro", uri=True) if staging and os.path.exists(staging) else None
+    try:
+        src.backup(dst)
+        staged_tables = set()
+        if staged is not None:
+            staged_tables = {row[0] for row in staged.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+        report = {}
+        for table in tables:
+            conn = staged if table in staged_tables else src
+            frame = normalise_frame(pd.read_sql_query(f'SELECT * FROM "{table}";', conn))
+            dst.execute(f'DROP TABLE IF EXISTS "{table}";')
+            frame.to_sql(table, dst, index=False)
+            report[table] = frame.shape
+        dst.commit()
+        dst.execute("VACUUM;")
+    finally:
+        src.close()
+        dst.close()
+        if staged is not None:
+            staged.close()
+
+    ensure_indexes(tmp)
+    os.replace(tmp, target)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalise the dashboard tables of data.db")
+    parser.add_argument("--source", default=DB_PATH)
+    parser.add_argument("--target", default=None)
+    parser.add_argument("--staging", default=STAGING_DB_PATH)
+    args = parser.parse_args(argv)
+
+    for table, (rows, columns) in normalise_database(args.source, args.target, staging=args.staging).items():
+        print(f"{table}: {rows} rows, {columns} columns")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,17 @@
-import json
 import math
-import sqlite3
 import string
-from dash import html, dcc, Input, Output, callback
+from dash import html, dcc, Input, Output, State, callback, clientside_callback, ClientsideFunction, no_update
 import dash_mantine_components as dmc
 import dash_ag_grid as dag
 import pandas as pd
-from ..utils.utils import get_info, filter_data, style_handle
+from ..utils.utils import get_info, info_context, filter_data, first_value, style_handle, tiles_handle, render_tabs
+from ..data.store import store
+from ..data.geometry import geometry
 from dash_iconify import DashIconify
 import plotly.graph_objects as go
 import dash_leaflet as dl
 import dash_leaflet.express as dlx
 
-# Load data
-conn = sqlite3.connect("./src/data/data.db")
-data = pd.read_sql_query(f"SELECT * FROM agriculture_data;", conn)
-
 # Sidebar components
 def sidebar(data):
     return dmc.Stack([
@@ -24,7 +20,7 @@ def sidebar(data):
                 label="Select Dataset", 
                 id="series-name-dropdown", 
                 value='Rice Production', 
-                data=[{'label': option, 'value': option} for option in ["Paddy Rice Price"] + [option for option in data["Series Name"].dropna().str.strip().unique() if option and option != "Paddy Rice Price"]],
+                data=[{'label': option, 'value': option} for option in ["Paddy Rice Price"] + [option for option in data["Series Name"].dropna().unique() if option and option != "Paddy Rice Price"]],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 checkIconPosition="right",
@@ -34,7 +30,7 @@ def sidebar(data):
                 label="Select Type", 
                 id="subsector-2-dropdown", 
                 value='Fragrant Rice', 
-                data=[{'label': option, 'value': option} for option in data["Sub-Sector (2)"].dropna().str.strip().unique() if option],
+                data=[{'label': option, 'value': option} for option in data["Sub-Sector (2)"].dropna().unique() if option],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -45,7 +41,7 @@ def sidebar(data):
                 label="Select Province", 
                 id="province-dropdown", 
                 value='All', 
-                data=[{'label': option, 'value': option} for option in ['All'] + list(sorted(data["Province"].dropna().str.strip().unique()))],
+                data=[{'label': option, 'value': option} for option in ['All'] + list(sorted(data["Province"].dropna().unique()))],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -56,7 +52,7 @@ def sidebar(data):
                 label="Select Variable", 
                 id="indicator-dropdown", 
                 value='Area Planted', 
-                data=[{'label': option, 'value': option} for option in list(sorted(data["Indicator"].dropna().str.strip().unique()))],
+                data=[{'label': option, 'value': option} for option in list(sorted(data["Indicator"].dropna().unique()))],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -87,55 +83,59 @@ def sidebar(data):
         ])
     ], gap="xs")
 
-# Page Layout
-agriculture_and_rural_development = dmc.Container([
-    dmc.Grid([
-        dmc.GridCol(sidebar(data), span={"base": 12, "sm": 3}),
-        dmc.GridCol([
-            dmc.Stack([
-                dmc.Paper([
-                    dmc.Tabs(
-                        children=[
-                            dmc.TabsList(
-                                [
-                                    dmc.TabsTab("Map View", leftSection=DashIconify(icon="tabler:map"), value="map", id="map-tab"),
-                                    dmc.TabsTab("Visualization", leftSection=DashIconify(icon="tabler:chart-bar"), value="graph", id="graph-tab"),
-                                    dmc.TabsTab("Data View", leftSection=DashIconify(icon="tabler:database"), value="dataview", id="dataview-tab"),
-                                ], 
-                                grow="True",
-                            ),
-                            dmc.TabsPanel(
-                                children=[
-                                    html.Div(id='map-id'),   
-                                ], 
-                                value="map"
-                            ),
-                            dmc.TabsPanel(                               
-                                children=[
-                                    html.Div(id='graph-id'),
-                                ], 
-                                value="graph"
-                            ),
-                            dmc.TabsPanel(html.Div(id='dataview-id'), value="dataview"),
-                        ], 
-                        id="active-tab", value="map", color="#336666"
-                    ),
+# Page Layout, built per visit so the sidebar lists the data currently loaded
+def agriculture_and_rural_development():
+    return dmc.Container([
+        dmc.Grid([
+            dmc.GridCol(sidebar(store.facets("agriculture_data").distinct), span={"base": 12, "sm": 3}),
+            dmc.GridCol([
+                dmc.Stack([
+                    dmc.Paper([
+                        dmc.Tabs(
+                            children=[
+                                dmc.TabsList(
+                                    [
+                                        dmc.TabsTab("Map View", leftSection=DashIconify(icon="tabler:map"), value="map", id="map-tab"),
+                                        dmc.TabsTab("Visualization", leftSection=DashIconify(icon="tabler:chart-bar"), value="graph", id="graph-tab"),
+                                        dmc.TabsTab("Data View", leftSection=DashIconify(icon="tabler:database"), value="dataview", id="dataview-tab"),
+                                    ], 
+                                    grow="True",
+                                ),
+                                dmc.TabsPanel(
+                                    children=[
+                                        html.Div(id='map-id'),   
+                                    ], 
+                                    value="map"
+                                ),
+                                dmc.TabsPanel(                               
+                                    children=[
+                                        html.Div(id='graph-id'),
+                                    ], 
+                                    value="graph"
+                                ),
+                                dmc.TabsPanel(html.Div(id='dataview-id'), value="dataview"),
+                            ], 
+                            id="active-tab", value="map", color="#336666"
+                        ),
                 
-                ], shadow="xs", p="md", radius="md", withBorder=True),
-            ], gap="xs"),
+                    ], shadow="xs", p="md", radius="md", withBorder=True),
+                ], gap="xs"),
             
-            dcc.Store(id="selected-point-data"),
-            dcc.Store(id="indicator-unit"),
-            dmc.Modal(
-                id="info-modal",
-                children=[
-                    dmc.Text(id="modal-body"),
-                ],
-                fullScreen=True
-            )
-        ], span={"base": 12, "sm": 9}),
-    ]),
-], fluid=True, style={'paddingTop': '1rem'})
+                dcc.Store(id="selected-point-data"),
+                dcc.Store(id="indicator-unit"),
+                dcc.Store(id="rendered-tabs"),
+                dcc.Store(id="report-filters"),  # filters once the dropdowns have settled (assets/settle.js)
+                dcc.Store(id="facets-resolved"),  # dropdown values the last step of the cascade ran for (assets/facets.js)
+                dmc.Modal(
+                    id="info-modal",
+                    children=[
+                        dmc.Text(id="modal-body"),
+                    ],
+                    fullScreen=True
+                )
+            ], span={"base": 12, "sm": 9}),
+        ]),
+    ], fluid=True, style={'paddingTop': '1rem'})
 
 
 def create_dataview(dff):
@@ -143,7 +143,8 @@ def create_dataview(dff):
         index=[col for col in dff.columns if col not in ['Indicator', 'Indicator Value']],
         columns='Indicator',
         values='Indicator Value',
-        aggfunc='first'
+        aggfunc='first',
+        observed=True
     ).reset_index()
     
     # Remove columns where all values are empty strings
@@ -212,7 +213,7 @@ def create_map(dff, year):
             )
         ], style={'position': 'relative', 'zIndex': 0})
     else:
-        dff = dff[dff["Year"] == year]
+        dff = dff[dff["Year"] == int(year)]
         # Calculate Choropleth Gradient Scale Range
         num_classes = 5
         min_value = dff['Indicator Value'].min()
@@ -245,33 +246,16 @@ def create_map(dff, year):
         colorbar = dlx.categorical_colorbar(categories=ctg, colorscale=colorscale, width=30, height=300, position="bottomright")
 
         if 'Province' in dff.columns:
-            with open('./assets/geoBoundaries-KHM-ADM1_simplified.json') as f:
-                geojson_data = json.load(f)
-            
-            # Map indicator values to geojson features
-            for feature in geojson_data['features']:
-                province_name = feature['properties']['shapeName']  # Ensure correct property for province name
-                
-                # Find matching row in the filtered data
-                province_data = dff[dff['Province'] == province_name]
-                
-                if not province_data.empty:
-                    # Assign the indicator value
-                    feature['properties'][indicator] = province_data['Indicator Value'].values[0]
-                    feature['properties']['Series Name'] = series_name
-                    feature['properties']['Indicator'] = indicator
-                    feature['properties']['Year'] = year
-                else:
-                    # Assign None for missing data
-                    feature['properties'][indicator] = None
+            # Values per boundary, matched by name in one pass. Only these travel with each
+            # update (hideout); the boundaries are cached static files (geometry.levels)
+            values, _ = geometry.join('adm1', dff, 'Province')
             
             # Create geojson.
-            geojson = dl.GeoJSON(data=geojson_data,
-                                style=style_handle,
-                                zoomToBounds=True,
+            geojson = dl.GeoJSON(style=style_handle,
+                                zoomToBounds=False,
                                 zoomToBoundsOnClick=True,
                                 hoverStyle=dict(color='black'),
-                                hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+                                hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='shapeName', levels=geometry.levels('adm1'), tiles=geometry.tiles('adm1'), info=info_context(series_name, indicator, indicator_unit, year)),
                                 id="geojson")
 
             # Return the map component along with the modal
@@ -279,11 +263,12 @@ def create_map(dff, year):
                 [
                     dl.Map(
                         style={'width': '100%', 'height': '450px'},
-                        center=[12.5657, 104.9910],
-                        zoom=7,
+                        id="map",
+                        bounds=geometry.bounds('adm1'),
                         children=[
                             dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
                             geojson,
+                            dl.LayerGroup(id="geojson-tiles", eventHandlers=dict(add=tiles_handle)),
                             colorbar,
                             html.Div(children=get_info(series_name=series_name, indicator=indicator, indicator_unit=indicator_unit, year=year), id="info", className="info", style={"position": "absolute", "top": "10px", "right": "10px", "zIndex": "1000"}),
                         
@@ -291,6 +276,8 @@ def create_map(dff, year):
                         attributionControl=False,
                     ),
                 ],
+                # Keyed on the boundary file: switching files mounts a new map at its bounds
+                id="map-view-adm1",
                 style={
                     'position': 'relative',
                     'zIndex': 0,
@@ -298,77 +285,56 @@ def create_map(dff, year):
             )
         
         elif 'Markets' in dff.columns:
-            with open('./assets/countries.json') as f:
-                geojson_data = json.load(f)
-                    
-            # Map indicator values to geojson features
-            for feature in geojson_data['features']:
-                province_name = feature['properties']['name']  # Ensure correct property for province name
-                
-                # Find matching row in the filtered data
-                province_data = dff[dff['Markets'] == province_name]
-                
-                if not province_data.empty:
-                    # Assign the indicator value
-                    feature['properties'][indicator] = province_data['Indicator Value'].values[0]
-                    feature['properties']['Series Name'] = series_name
-                    feature['properties']['Indicator'] = indicator
-                    feature['properties']['Year'] = year
-                else:
-                    # Assign None for missing data
-                    feature['properties'][indicator] = None
+            # Values per boundary, matched by name in one pass. Only these travel with each
+            # update (hideout); the boundaries are cached static files (geometry.levels)
+            values, _ = geometry.join('countries', dff, 'Markets')
                     
             # Create geojson.
-            geojson = dl.GeoJSON(data=geojson_data,
-                                style=style_handle,
-                                zoomToBounds=True,
+            geojson = dl.GeoJSON(style=style_handle,
+                                zoomToBounds=False,
                                 zoomToBoundsOnClick=True,
                                 hoverStyle=dict(color='black'),
-                                hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+                                hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='name', levels=geometry.levels('countries'), tiles=geometry.tiles('countries'), info=info_context(series_name, indicator, indicator_unit, year)),
                                 id="geojson")
             
             return html.Div([
                 dl.Map(
                         style={'width': '100%', 'height': '450px'},
-                        center=[20, 0],
-                        zoom=6,
+                        id="map",
+                        bounds=geometry.bounds('countries'),
                         children=[
                             dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
-                            geojson, 
+                            geojson,
+                            dl.LayerGroup(id="geojson-tiles", eventHandlers=dict(add=tiles_handle)),
                             colorbar,
                             html.Div(children=get_info(series_name=series_name, indicator=indicator, indicator_unit=indicator_unit, year=year), id="info", className="info", style={"position": "absolute", "top": "10px", "right": "10px", "zIndex": "1000"}),
                         ],
                         attributionControl=False,
                 )],
+                # Keyed on the boundary file: switching files mounts a new map at its bounds
+                id="map-view-countries",
                 style={
                     'position': 'relative',
                     'zIndex': 0,
                 }
             )
         else:
-            with open('./assets/geoBoundaries-KHM-ADM0_simplified.json') as f:
-                geojson_data = json.load(f)
-                
-            geojson_data['features'][0]['properties'][indicator] = dff['Indicator Value'].values[0]
-            geojson_data['features'][0]['properties']['Series Name'] = series_name
-            geojson_data['features'][0]['properties']['Indicator'] = indicator
-            geojson_data['features'][0]['properties']['Year'] = year
+            values = {'Cambodia': dff['Indicator Value'].values[0]}
             
             geojson = dl.GeoJSON(
-                data=geojson_data,
                 style=style_handle,
-                zoomToBounds=True,
+                zoomToBounds=False,
                 zoomToBoundsOnClick=True,
                 hoverStyle=dict(color='black'),
-                hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+                hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='shapeName', levels=geometry.levels('adm0'), info=info_context(series_name, indicator, indicator_unit, year)),
                 id="geojson"
             )
             
             return html.Div([
                 dl.Map(
                         style={'width': '100%', 'height': '450px'},
-                        center=[12.5657, 104.9910],
-                        zoom=7,
+                        id="map",
+                        bounds=geometry.bounds('adm0'),
                         children=[
                             dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
                             geojson,
@@ -376,6 +342,8 @@ def create_map(dff, year):
                         ],
                         attributionControl=False,
                 )],
+                # Keyed on the boundary file: switching files mounts a new map at its bounds
+                id="map-view-adm0",
                 style={
                     'position': 'relative',
                     'zIndex': 0,
@@ -424,7 +392,7 @@ def create_graph(dff):
             tickmode='auto',
             color='rgba(0, 0, 0, 0.6)',
             tickvals=dff_filtered['Year'].unique(),
-            title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {dff['Source'].unique()[0]}</span>",
+            title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {first_value(dff, 'Source')}</span>",
         ),
         margin=dict(t=100, b=80, l=50, r=50, pad=10),
     )
@@ -452,7 +420,7 @@ def create_graph(dff):
 
             fig.update_layout(
                 title=dict(
-                    text=f"{title_prefix} {dff_variety['Sub-Sector (1)'].unique()[0]} of {variety}<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff_variety['Indicator Unit'].unique()[0]}</span>"
+                    text=f"{title_prefix} {first_value(dff_variety, 'Sub-Sector (1)')} of {variety}<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff_variety['Indicator Unit'].unique()[0]}</span>"
                 ),
                 font=dict(size=10),
                 images=[dict(
@@ -466,11 +434,11 @@ def create_graph(dff):
                     tickmode='auto',
                     color='rgba(0, 0, 0, 0.6)',
                     tickvals=dff_filtered['Year'].unique(),
-                    title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {dff_variety['Source'].unique()[0]}</span>",
+                    title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {first_value(dff_variety, 'Source')}</span>",
                 ),
             )
             
-            if dff_variety['Sub-Sector (1)'].unique()[0] == "FOB Price":
+            if first_value(dff_variety, 'Sub-Sector (1)') == "FOB Price":
                 fig.update_layout(
                     title=dict(
                         text=f"{title_prefix} {variety} Price at the Port <br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff_variety['Indicator Unit'].unique()[0]}</span>"
@@ -631,21 +599,31 @@ def create_graph(dff):
         ])
         
 # Callbacks
-@callback([Output('graph-id', 'children'), Output('map-id', 'children'), Output('dataview-id', 'children'), Output('metadata-panel', 'children'), Output('indicator-unit', 'data')],
-          [Input("series-name-dropdown", "value"), Input("subsector-2-dropdown", "value"), 
-           Input("province-dropdown", "value"), Input("indicator-dropdown", "value"), Input("year-dropdown", "value")])
-def update_report(series_name, subsector_2, province, indicator, year):
+@callback([Output('graph-id', 'children'), Output('map-id', 'children'), Output('dataview-id', 'children'), Output('metadata-panel', 'children'), Output('indicator-unit', 'data'), Output('rendered-tabs', 'data')],
+          [Input("report-filters", "data"), Input("active-tab", "value")],
+          State("rendered-tabs", "data"))
+def update_report(filters, active_tab, rendered):
+    if filters is None:
+        return (no_update,) * 6
+    series_name, subsector_2, province, indicator, year = filters
     dff = filter_data(
-        data=data,
+        data="agriculture_data",
         series_name=series_name,
         subsector_2=subsector_2,
         province=province if province else None,
         indicator=indicator
     )
-    dff = dff.rename(columns={'Latiude': 'Latitude'})
-    indicator_unit = dff['Indicator Unit'].unique()
 
-    return create_graph(dff), create_map(dff, year), create_dataview(dff), create_metadata(dff), indicator_unit.tolist()
+    # Only the visible tab is built; the others follow when they are first opened
+    panels, rendered, changed = render_tabs(
+        {"graph": lambda: create_graph(dff), "map": lambda: create_map(dff, year), "dataview": lambda: create_dataview(dff)},
+        active_tab, [series_name, subsector_2, province, indicator, year], rendered,
+        cache_key="agriculture",
+    )
+    if not changed:
+        return *panels, no_update, no_update, rendered
+    indicator_unit = dff['Indicator Unit'].unique()
+    return *panels, create_metadata(dff), indicator_unit.tolist(), rendered
 
 
 # @callback(Output("download-data", "data"), Input("download-button", "n_clicks"),
@@ -657,102 +635,75 @@ def update_report(series_name, subsector_2, province, indicator, year):
 #     return dict(content=dff.to_csv(index=False), filename="data.csv", type="application/csv")
 
 
-# Calllback for info on map
-@callback(Output("info", "children"), Input('series-name-dropdown', 'value'), Input('year-dropdown', 'value'), Input('indicator-dropdown', 'value'), Input('indicator-unit', 'data'), Input("geojson", "hoverData"))
-def info_hover(series_name, year, indicator, indicator_unit, feature):
-    return get_info(series_name=series_name, indicator=indicator, feature=feature, indicator_unit=indicator_unit, year=year)
+# Calllback for info on map, built in the browser (assets/info.js)
+clientside_callback(
+    ClientsideFunction(namespace='mapInfo', function_name='hover'),
+    Output("info", "children"), Input("geojson", "hoverData"), State("geojson", "hideout"),
+    prevent_initial_call=True,
+)
+
+# Boundaries simplified to the current zoom, swapped in as the map zooms and reloaded
+# when a report update redraws the map (assets/topology.js)
+clientside_callback(
+    ClientsideFunction(namespace='topology', function_name='boundaries'),
+    Output("geojson", "data"), Input("map", "zoom"), Input("geojson", "hideout"), State("geojson", "data"),
+)
 
-@callback(
+# Or, when the hideout lists vector tiles, boundaries drawn from the tiles in view and
+# repainted on each report update (assets/vectortiles.js)
+clientside_callback(
+    ClientsideFunction(namespace='vectorTiles', function_name='restyle'),
+    Input("geojson", "hideout"), State("geojson", "hoverStyle"), State("geojson", "zoomToBoundsOnClick"),
+)
+
+# Settled filters: written once the last step of the dropdown cascade has run for the values
+# shown, so one change of the selection renders the report once (assets/settle.js)
+clientside_callback(
+    ClientsideFunction(namespace='reports', function_name='settle'),
+    Output('report-filters', 'data'),
+    Input("series-name-dropdown", "value"),
+    Input("subsector-2-dropdown", "value"),
+    Input("province-dropdown", "value"),
+    Input("indicator-dropdown", "value"),
+    Input("year-dropdown", "value"),
+    Input('facets-resolved', 'data'),
+    State('report-filters', 'data'),
+)
+
+# Cascading dropdowns, resolved in the browser from the facet tree (assets/facets.js)
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='agricultureSubsector2'),
     Output('subsector-2-dropdown', 'data'),
     Output('subsector-2-dropdown', 'value'),
     Output('subsector-2-dropdown', 'style'),
-    Input('series-name-dropdown', 'value')
+    Input('series-name-dropdown', 'value'),
 )
-def update_subsector_2(series_name):
-    if series_name.lower() != "paddy rice price":
-        return [], None, {'display': 'none'}
-    
-    province_options = data[(data["Series Name"] == series_name)]["Sub-Sector (2)"].dropna().str.strip().unique()
-
-    style = {'display': 'block'} if province_options.size > 0 else {'display': 'none'}
-    return [{'label': option, 'value': option} for option in list(sorted(province_options))], 'Fragrant Rice', style
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='agricultureProvince'),
     Output('province-dropdown', 'data'),
     Output('province-dropdown', 'value'),
     Output('province-dropdown', 'style'),
-    Input('series-name-dropdown', 'value')
+    Input('series-name-dropdown', 'value'),
 )
-def update_province(series_name):
-    if series_name.lower() == "paddy rice price":
-        return [], None, {'display': 'none'}
-    
-    province_options = data[(data["Series Name"] == series_name)]["Province"].dropna().str.strip().unique()
-
-    style = {'display': 'block'} if province_options.size > 0 else {'display': 'none'}
-    return [{'label': option, 'value': option} for option in ['All'] + list(sorted(province_options))], 'All', style
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='agricultureIndicators'),
     Output('indicator-dropdown', 'data'),
     Output('indicator-dropdown', 'value'),
     Input('series-name-dropdown', 'value'),
     Input('province-dropdown', 'value'),
-    prevent_initial_call=False
+    prevent_initial_call=False,
 )
-def update_indicators(series_name, province):
-    dff = filter_data(data=data, series_name=series_name, province=province)
-    
-    # Extract unique indicator values
-    indicator_values = dff['Indicator'].unique().tolist()
-    
-    # If no indicators are available, return empty options and value
-    if not indicator_values:
-        return [], None
-    
-    # Prepare dropdown options
-    indicator_options = [{'label': indicator, 'value': indicator} for indicator in sorted(indicator_values)]
-    
-    # Set default value to the first indicator
-    default_value = indicator_values[0] if indicator_values else None
-    
-    return indicator_options, default_value
-
 
-
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='agricultureYears'),
     Output('year-dropdown', 'data'),
     Output('year-dropdown', 'value'),
     Output('year-dropdown', 'style'),
+    Output('facets-resolved', 'data'),
     Input('series-name-dropdown', 'value'),
     Input('province-dropdown', 'value'),
     Input('indicator-dropdown', 'value'),
     Input('active-tab', 'value'),
 )
-def update_year_dropdown(series_name, province, indicator, active_tab):
-    if series_name.lower() == "paddy rice price":
-        return [], None, {'display': 'none'}
-    
-    dff = filter_data(
-        data=data,
-        series_name=series_name,
-        province=province,
-        indicator=indicator
-    )
-
-    # Extract unique year values
-    year_values = dff['Year'].dropna().unique().tolist()
-    
-    # If no year_values are available, return empty options and value
-    if not year_values:
-        return [], None, {'display': 'none' if active_tab != 'map' else 'block'}
-    
-    # Prepare dropdown options
-    year_options = [{'label': str(year), 'value': str(year)} for year in sorted(year_values)]
-    
-    # Set default value to the latest year
-    default_value = str(max(year_values))  # Convert to string to match dropdown data format
-    
-    # Conditionally set style based on active_tab
-    dropdown_style = {'display': 'block'} if active_tab == 'map' else {'display': 'none'}
-    
-    return year_options, default_value, dropdown_style
\ No newline at end of file
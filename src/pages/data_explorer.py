@@ -1,9 +1,9 @@
 
-import json
+import hashlib
 import math
-import sqlite3
 import string
-from dash import html, dcc, Input, Output, State, callback
+from dash import html, dcc, Input, Output, State, clientside_callback, ClientsideFunction
+from dash_extensions.enrich import callback, Serverside
 import dash
 import dash_mantine_components as dmc
 import dash_ag_grid as dag
@@ -13,96 +13,102 @@ import plotly.graph_objects as go
 from fuzzywuzzy import process
 import dash_leaflet as dl
 import dash_leaflet.express as dlx
-from ..utils.utils import get_info, filter_data, style_handle
+from ..utils.utils import get_info, info_context, filter_data, first_value, style_handle, tiles_handle
+from ..data.store import store
+from ..data.geometry import geometry
+from ..utils.render_cache import render_cache
 
 
 from src.utils.utils import get_info
-# Sample dataset
-conn = sqlite3.connect("./src/data/data.db")
 
-# Query economic_data table
-query1 = "SELECT * FROM education_data;"
-df1 = pd.read_sql_query(query1, conn)
-query2 = "SELECT * FROM agriculture_data;"
-df2 = pd.read_sql_query(query2, conn)
-data = pd.concat([df1, df2], ignore_index=True)
 
+# Tables searched by the explorer, in the order their tags are suggested
+EXPLORER_TABLES = ("education_data", "agriculture_data")
 
 top_7 = ["Paddy Rice Price (Fragrant Rice)", "Paddy Rice Price (White Rice)", "Rice Production: Area Planted in Battambang", "Rice Export Value to Vietnam", "Occupations of School Dropouts in 2023", "Student Flow Rates: Dropout by Grade in Cambodia", "Successful Student in Cambodia"]
-combined_options = [
-    {"label": f"{row}", "value": f"{row}"} for row in top_7
-] + [{"label": f"{row}", "value": f"{row}"} for row in data["Tag"].unique() if row not in top_7]
+
+def combined_options():
+    """Suggestions of the search box: the top datasets first, then every other tag of the loaded data."""
+    return [
+        {"label": f"{row}", "value": f"{row}"} for row in top_7
+    ] + [{"label": f"{row}", "value": f"{row}"} for row in explorer_tags() if row not in top_7]
+
+
+def explorer_tags():
+    """Distinct tags of `EXPLORER_TABLES`, in order of first appearance, read without loading the tables."""
+    return pd.concat([store.distinct(table, ["Tag"])["Tag"].astype(object) for table in EXPLORER_TABLES]).unique()
 
 # About page with suggestions autocomplete
-data_explorer_page = html.Main(
-    [
-        html.Div(
-            style={
-                "height": "300px",
-                "backgroundImage": "url('./assets/data-explorer-background.jpg')",
-                "backgroundSize": "cover",
-                "backgroundPosition": "center",
-                "display": "flex",
-                "flexDirection": "column",
-                "justifyContent": "center",
-                "alignItems": "flex-start",
-                "paddingLeft": "10px",
-                "paddingRight": "10px"
-            },
-            children=[
-                dmc.Stack(
-                    p="lg",
-                    children=[
-                        dmc.Title('CDRI Data Hub Explorer', order=1, style={'color': 'white', 'fontSize': '2rem'}),
-                        dmc.Text("Explore Data and Visualizations with Natural Language", size="xl", style={'color': 'white', 'fontSize': '1rem'}),
-                        # Suggestions dropdown
-                        dmc.Select(
-                            label="Select Dataset", 
-                            id="suggestions-autocomplete",
-                            data=combined_options,
-                            withScrollArea=False,
-                            placeholder="Ask anything...",
-                            styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
-                            checkIconPosition="right",
-                            searchable=True,
-                            clearable=True,
-                            leftSectionPointerEvents="none",
-                            leftSection=DashIconify(icon="mingcute:ai-fill"),
-                            nothingFoundMessage="Nothing found...",
-                            limit=25
-                        ),
-                        # dmc.Autocomplete(
-                        #     id="suggestions-autocomplete",
-                        #     placeholder="Ask anything...",
-                        #     data=combined_options,
-                        #     leftSection=DashIconify(icon="mingcute:ai-fill"),
-                        #     style={"width": "100%", "marginBottom": "20px"},
-                        #     limit=25
-                        # ),
-                        dmc.RadioGroup(
-                                id="indicator-radio-group",
-                                label="Select Variable:",
-                                size="sm",
-                                children=[],
-                                mt=10,
-                                mb=10,
+def data_explorer_page():
+    return html.Main(
+        [
+            html.Div(
+                style={
+                    "height": "300px",
+                    "backgroundImage": "url('./assets/data-explorer-background.jpg')",
+                    "backgroundSize": "cover",
+                    "backgroundPosition": "center",
+                    "display": "flex",
+                    "flexDirection": "column",
+                    "justifyContent": "center",
+                    "alignItems": "flex-start",
+                    "paddingLeft": "10px",
+                    "paddingRight": "10px"
+                },
+                children=[
+                    dmc.Stack(
+                        p="lg",
+                        children=[
+                            dmc.Title('CDRI Data Hub Explorer', order=1, style={'color': 'white', 'fontSize': '2rem'}),
+                            dmc.Text("Explore Data and Visualizations with Natural Language", size="xl", style={'color': 'white', 'fontSize': '1rem'}),
+                            # Suggestions dropdown
+                            dmc.Select(
+                                label="Select Dataset", 
+                                id="suggestions-autocomplete",
+                                data=combined_options(),
+                                withScrollArea=False,
+                                placeholder="Ask anything...",
+                                styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
+                                checkIconPosition="right",
+                                searchable=True,
+                                clearable=True,
+                                leftSectionPointerEvents="none",
+                                leftSection=DashIconify(icon="mingcute:ai-fill"),
+                                nothingFoundMessage="Nothing found...",
+                                limit=25
                             ),
-                    ],
-                    className="animate__animated animate__fadeInUp animate__fast"
-                )
-            ],
-        ),
+                            # dmc.Autocomplete(
+                            #     id="suggestions-autocomplete",
+                            #     placeholder="Ask anything...",
+                            #     data=combined_options,
+                            #     leftSection=DashIconify(icon="mingcute:ai-fill"),
+                            #     style={"width": "100%", "marginBottom": "20px"},
+                            #     limit=25
+                            # ),
+                            dmc.RadioGroup(
+                                    id="indicator-radio-group",
+                                    label="Select Variable:",
+                                    size="sm",
+                                    children=[],
+                                    mt=10,
+                                    mb=10,
+                                ),
+                        ],
+                        className="animate__animated animate__fadeInUp animate__fast"
+                    )
+                ],
+            ),
         
-        dmc.Container(children=[
-            dmc.Paper([
-                html.Div(id='data-explorer-map-id'),
-                html.Div(id='data-explorer-graph-id'),
-                html.Div(id='data-explorer-dataview-id', style={'marginTop': '20px'})
-                ], shadow="xs", p="md", radius="md", withBorder=True),
-        ], fluid=True),
-        dcc.Store(id='data-explorer-filter-state'),
-    ],
-)
+            dmc.Container(children=[
+                dmc.Paper([
+                    html.Div(id='data-explorer-map-id'),
+                    html.Div(id='data-explorer-graph-id'),
+                    html.Div(id='data-explorer-dataview-id', style={'marginTop': '20px'})
+                    ], shadow="xs", p="md", radius="md", withBorder=True),
+            ], fluid=True),
+            dcc.Store(id='data-explorer-filter-state'),
+        ],
+    )
 
 def create_dataview(dff, year):
     dff = dff[dff["Year"] == year]
@@ -112,7 +118,8 @@ def create_dataview(dff, year):
         index=[col for col in dff.columns if col not in ['Indicator', 'Indicator Value']],
         columns='Indicator',
         values='Indicator Value',
-        aggfunc='first'
+        aggfunc='first',
+        observed=True
     ).reset_index()
     
     # Remove columns where all values are empty strings
@@ -189,7 +196,7 @@ def create_graph(dff, filters):
             tickmode='auto',
             color='rgba(0, 0, 0, 0.6)',
             tickvals=dff_filtered['Year'].unique(),
-            title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {dff['Source'].unique()[0]}</span>",
+            title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {first_value(dff, 'Source')}</span>",
         ),
         margin=dict(t=100, b=80, l=50, r=50, pad=10),
     )
@@ -217,7 +224,7 @@ def create_graph(dff, filters):
 
             fig.update_layout(
                 title=dict(
-                    text=f"{title_prefix} {dff_variety['Sub-Sector (1)'].unique()[0]} of {variety}<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff_variety['Indicator Unit'].unique()[0]}</span>"
+                    text=f"{title_prefix} {first_value(dff_variety, 'Sub-Sector (1)')} of {variety}<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff_variety['Indicator Unit'].unique()[0]}</span>"
                 ),
                 font=dict(size=10),
                 images=[dict(
@@ -231,11 +238,11 @@ def create_graph(dff, filters):
                     tickmode='auto',
                     color='rgba(0, 0, 0, 0.6)',
                     tickvals=dff_filtered['Year'].unique(),
-                    title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {dff_variety['Source'].unique()[0]}</span>",
+                    title=f"<span style='display:block; margin-top:8px; font-size:85%; color:rgba(0, 0, 0, 0.7);'>Source: {first_value(dff_variety, 'Source')}</span>",
                 ),
             )
             
-            if dff_variety['Sub-Sector (1)'].unique()[0] == "FOB Price":
+            if first_value(dff_variety, 'Sub-Sector (1)') == "FOB Price":
                 fig.update_layout(
                     title=dict(
                         text=f"{title_prefix} {variety} Price at the Port <br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff_variety['Indicator Unit'].unique()[0]}</span>"
@@ -443,7 +450,7 @@ def create_graph(dff, filters):
                 x=0.5,  # Center horizontally (matches legend's x)
                 y=-0.30,  # Slightly below the legend
                 xref="paper",
-                yref="paper",text=f"Source: {dff['Source'].unique()[0]}",  # Customize this
+                yref="paper",text=f"Source: {first_value(dff, 'Source')}",  # Customize this
                 showarrow=False,
                 font=dict(
                     color='rgba(0, 0, 0, 0.6)',
@@ -601,7 +608,7 @@ In other words, despite having worked for up to 20 years, older dropouts are sti
                 y=-0.30,
                 xref="paper",
                 yref="paper",
-                text=f"Source: {dff['Source'].unique()[0]}",
+                text=f"Source: {first_value(dff, 'Source')}",
                 showarrow=False,
                 font=dict(
                     color='rgba(0, 0, 0, 0.6)',
@@ -617,14 +624,14 @@ In other words, despite having worked for up to 20 years, older dropouts are sti
         if 'successful student' in filters['Tag'].lower():
             fig.update_layout(
                 title=dict(
-                    text=f"{indicator} in {dff['Province'].unique()[0]}"
+                    text=f"{indicator} in {first_value(dff, 'Province')}"
                         + f"<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff['Indicator Unit'].unique()[0]}</span>"
                 ),
             )
         else:
             fig.update_layout(
                 title=dict(
-                    text=f"{series_name}: {indicator} in {dff['Province'].unique()[0]}"
+                    text=f"{series_name}: {indicator} in {first_value(dff, 'Province')}"
                         + f"<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff['Indicator Unit'].unique()[0]}</span>"
                 )
             )
@@ -837,33 +844,16 @@ def create_map(dff, year, indicator=None):
     colorbar = dlx.categorical_colorbar(categories=ctg, colorscale=colorscale, width=30, height=300, position="bottomright")
 
     if 'Province' in dff.columns:
-        with open('./assets/geoBoundaries-KHM-ADM1_simplified.json') as f:
-            geojson_data = json.load(f)
-        
-        # Map indicator values to geojson features
-        for feature in geojson_data['features']:
-            province_name = feature['properties']['shapeName']  # Ensure correct property for province name
-            
-            # Find matching row in the filtered data
-            province_data = dff[dff['Province'] == province_name]
-            
-            if not province_data.empty:
-                # Assign the indicator value
-                feature['properties'][indicator] = province_data['Indicator Value'].values[0]
-                feature['properties']['Series Name'] = series_name
-                feature['properties']['Indicator'] = indicator
-                feature['properties']['Year'] = year
-            else:
-                # Assign None for missing data
-                feature['properties'][indicator] = None
+        # Values per boundary, matched by name in one pass. Only these travel with each
+        # update (hideout); the boundaries are cached static files (geometry.levels)
+        values, _ = geometry.join('adm1', dff, 'Province')
         
         # Create geojson.
-        geojson = dl.GeoJSON(data=geojson_data,
-                            style=style_handle,
-                            zoomToBounds=True,
+        geojson = dl.GeoJSON(style=style_handle,
+                            zoomToBounds=False,
                             zoomToBoundsOnClick=True,
                             hoverStyle=dict(color='black'),
-                            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+                            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='shapeName', levels=geometry.levels('adm1'), tiles=geometry.tiles('adm1'), info=info_context(series_name, indicator, indicator_unit, year)),
                             id="geojson-data-explorer")
         
         # print(data[data["Indicator"] == "No. Farmers/province"]["Indicator Value"])
@@ -888,11 +878,12 @@ def create_map(dff, year, indicator=None):
                 
                 dl.Map(
                     style={'width': '100%', 'height': '450px', 'zIndex': 0},
-                    center=[12.5657, 104.9910],
-                    zoom=7,
+                    id="map-data-explorer",
+                    bounds=geometry.bounds('adm1'),
                     children=[
                         dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
                         geojson,
+                        dl.LayerGroup(id="geojson-data-explorer-tiles", eventHandlers=dict(add=tiles_handle)),
                         colorbar,
                         html.Div(children=get_info(series_name=series_name, indicator=indicator, indicator_unit=indicator_unit, year=year), id="info-data-explorer", className="info", style={"position": "absolute", "top": "10px", "right": "10px", "zIndex": "1000"}),
                     ],
@@ -920,7 +911,7 @@ def create_map(dff, year, indicator=None):
                             children=[
                                 dmc.Radio(label=option, value=option) 
                                 for option in sorted(
-                                    data[data["Tag"] == "Cashew Nut Crop Profile"]["Indicator"].dropna().str.strip().unique(),
+                                    store.select(EXPLORER_TABLES, [("Tag", "Cashew Nut Crop Profile")])["Indicator"].dropna().unique(),
                                 )
                             ],
                             # mt=10,
@@ -971,22 +962,15 @@ def update_data(selected_suggestion):
     # Extract filters from the selected suggestion
     filters = {}
     for col in ["Tag"]:
-        lower_mapping = {str(name).lower(): name for name in data[col].unique() if pd.notna(name)}
+        lower_mapping = {str(name).lower(): name for name in explorer_tags() if pd.notna(name)}
         match = process.extractOne(selected_suggestion.lower(), lower_mapping.keys(), score_cutoff=50)
         if match:
             best_match_lower, score = match
             filters[col] = lower_mapping[best_match_lower]
         
-    # Filter the dataset
-    filtered_df = data
-    for key, value in filters.items():
-        if key in filtered_df.columns:
-            # Apply the filter temporarily
-            temp_df = filtered_df[filtered_df[key] == value]
-            
-            if not temp_df.empty:
-                # If the filtered data is not empty, apply the filter
-                filtered_df = temp_df
+    # Filter the dataset; the matched tag always has rows. Tables that are not loaded
+    # are queried instead (FILTER_ENGINE=sql).
+    filtered_df = store.select(EXPLORER_TABLES, list(filters.items())) if filters else None
     
     
     if not filters or 'Tag' not in filters:
@@ -1000,10 +984,18 @@ def update_data(selected_suggestion):
         )
         return default_message, None, None, {}
 
+    # Keep the filtered frame on the server (ServersideOutputTransform); the browser only
+    # holds its key. The key depends on the match and the data, so every session that
+    # asks for the same dataset shares one stored frame.
+    tag_hash = hashlib.sha1(str(filters['Tag']).encode()).hexdigest()
+    filter_state = Serverside(filtered_df, key=f"data-explorer-{store.data_token}-{tag_hash}")
+
     if selected_suggestion == "Cashew Nut Crop Profile":
-        return create_map(filtered_df, "2023", None), create_dataview(filtered_df, "2023"), None, filtered_df.to_dict('records')
+        return create_map(filtered_df, 2023, None), create_dataview(filtered_df, 2023), None, filter_state
 
-    return None, None, create_graph(filtered_df, filters), filtered_df.to_dict('records')
+    # Rendered once per host and dataset (src/utils/render_cache.py)
+    graph = render_cache.get_or_render(["data-explorer", "graph", filters['Tag']], lambda: create_graph(filtered_df, filters))
+    return None, None, graph, filter_state
 
 @callback(
     Output("data-explorer-map-id", "children", allow_duplicate=True),
@@ -1012,21 +1004,30 @@ def update_data(selected_suggestion):
     prevent_initial_call=True
 )
 def update_map(indicator, filtered_df):
-    if indicator is None:
+    if indicator is None or not isinstance(filtered_df, pd.DataFrame):
         return dash.no_update
     
-    # Convert stored data to DataFrame and filter by selected indicator
-    filtered_df = pd.DataFrame(filtered_df)
-    
+    # The transform hands over the frame stored by `update_data`
     # Generate the map with the filtered data
-    return create_map(filtered_df, "2023", indicator)
+    return create_map(filtered_df, 2023, indicator)
 
-# Calllback for info on map
-@callback(Output("info-data-explorer", "children"), Input("data-explorer-filter-state", "data"), Input("indicator-radio-group", "value"), Input("geojson-data-explorer", "hoverData"))
-def info_hover(filtered_df, indicator, feature):
-    filtered_df = pd.DataFrame(filtered_df)
-    series_name = filtered_df["Series Name"].unique()[0]
-    indicator_unit = filtered_df[filtered_df["Indicator"] == indicator]["Indicator Unit"].unique()[0]
-    year = filtered_df["Year"].unique()[0]
+# Calllback for info on map, built in the browser (assets/info.js)
+clientside_callback(
+    ClientsideFunction(namespace='mapInfo', function_name='hover'),
+    Output("info-data-explorer", "children"), Input("geojson-data-explorer", "hoverData"), State("geojson-data-explorer", "hideout"),
+    prevent_initial_call=True,
+)
+
+# Boundaries simplified to the current zoom, swapped in as the map zooms and reloaded
+# when a report update redraws the map (assets/topology.js)
+clientside_callback(
+    ClientsideFunction(namespace='topology', function_name='boundaries'),
+    Output("geojson-data-explorer", "data"), Input("map-data-explorer", "zoom"), Input("geojson-data-explorer", "hideout"), State("geojson-data-explorer", "data"),
+)
 
-    return get_info(series_name=series_name, indicator=indicator, feature=feature, indicator_unit=[indicator_unit], year=year)
\ No newline at end of file
+# Or, when the hideout lists vector tiles, boundaries drawn from the tiles in view and
+# repainted on each report update (assets/vectortiles.js)
+clientside_callback(
+    ClientsideFunction(namespace='vectorTiles', function_name='restyle'),
+    Input("geojson-data-explorer", "hideout"), State("geojson-data-explorer", "hoverStyle"), State("geojson-data-explorer", "zoomToBoundsOnClick"),
+)
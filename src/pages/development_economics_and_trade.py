@@ -1,21 +1,17 @@
-import json
 import math
-import sqlite3
 import dash
-from dash import html, dcc, Input, Output, State, callback
+from dash import html, dcc, Input, Output, State, callback, clientside_callback, ClientsideFunction
 import dash_mantine_components as dmc
 import dash_ag_grid as dag
 import pandas as pd
-from ..utils.utils import get_info, filter_data, style_handle
+from ..utils.utils import get_info, info_context, filter_data, style_handle, tiles_handle, render_tabs
+from ..data.store import store
+from ..data.geometry import geometry
 from dash_iconify import DashIconify
 import plotly.graph_objects as go
 import dash_leaflet as dl
 import dash_leaflet.express as dlx
 
-# Load data
-conn = sqlite3.connect("./src/data/data.db")
-data = pd.read_sql_query(f"SELECT * FROM economic_data;", conn)
-
 # Sidebar components
 def sidebar(data):
     return dmc.Stack([
@@ -24,7 +20,7 @@ def sidebar(data):
                 label="Select Dataset", 
                 id="series-name-dropdown-economic", 
                 value='Export, by market', 
-                data=[{'label': option, 'value': option} for option in data["Series Name"].dropna().str.strip().unique() if option],
+                data=[{'label': option, 'value': option} for option in data["Series Name"].dropna().unique() if option],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 checkIconPosition="right",
@@ -34,7 +30,7 @@ def sidebar(data):
                 label="Select Product", 
                 id="product-dropdown-economic", 
                 value='Articles of apparel and clothing accessories, knitted or crocheted.', 
-                data=[{'label': option, 'value': option} for option in sorted(data["Products"].dropna().str.strip().unique())],
+                data=[{'label': option, 'value': option} for option in sorted(data["Products"].dropna().unique())],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -45,7 +41,7 @@ def sidebar(data):
                 label="Select Market", 
                 id="market-dropdown-economic", 
                 value='All', 
-                data=[{'label': option, 'value': option} for option in ['All'] + list(sorted(data["Markets"].dropna().str.strip().unique()))],
+                data=[{'label': option, 'value': option} for option in ['All'] + list(sorted(data["Markets"].dropna().unique()))],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -56,7 +52,7 @@ def sidebar(data):
                 label="Select Variable", 
                 id="indicator-dropdown-economic", 
                 value='Value', 
-                data=[{'label': option, 'value': option} for option in list(sorted(data["Indicator"].dropna().str.strip().unique()))],
+                data=[{'label': option, 'value': option} for option in list(sorted(data["Indicator"].dropna().unique()))],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -66,8 +62,8 @@ def sidebar(data):
             dmc.Select(
                 label="Select Year", 
                 id="year-dropdown-economic", 
-                value=str(int(data["Year"].dropna().unique()[-1])),
-        	    data=[{'label': str(int(option)), 'value': str(int(option))} for option in sorted(data["Year"].dropna().unique())],
+                value=str(data["Year"].dropna().unique()[-1]),
+        	    data=[{'label': str(option), 'value': str(option)} for option in sorted(data["Year"].dropna().unique())],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -87,67 +83,72 @@ def sidebar(data):
         ])
     ], gap="xs")
 
-# Page Layout
-development_economics_and_trade = dmc.Container([
-    dmc.Grid([
-        dmc.GridCol(sidebar(data), span={"base": 12, "sm": 3}),
-        dmc.GridCol([
-            dmc.Stack([
-                dmc.Paper([
-                    # dmc.Autocomplete(
-                    #     id="suggestions-autocomplete-economic",
-                    #     placeholder="Ask anything...",
-                    #     leftSection=DashIconify(icon="mingcute:ai-fill"),
-                    #     style={"width": "100%", "marginBottom": "20px"},
-                    # ),
-                    dmc.Tabs(
-                        children=[
-                            dmc.TabsList(
-                                [
-                                    dmc.TabsTab("Map View", leftSection=DashIconify(icon="tabler:map"), value="map"),
-                                    dmc.TabsTab("Visualization", leftSection=DashIconify(icon="tabler:chart-bar"), value="graph"),
-                                    dmc.TabsTab("Data View", leftSection=DashIconify(icon="tabler:database"), value="dataview"),
-                                ], 
-                                grow="True",
-                            ),
-                            dmc.TabsPanel(
-                                children=[
-                                    html.Div(id='map-id-economic'),        
-                                ], 
-                                value="map"
-                            ),
-                            dmc.TabsPanel(                               
-                                children=[
-                                    html.Div(id='graph-id-economic'),
-                                ], 
-                                value="graph"
-                            ),
-                            dmc.TabsPanel(html.Div(id='dataview-container-economic'), value="dataview"),
-                        ], 
-                        id="active-tab-economic", value="map", color="#336666"
-                    ),
-                ], shadow="xs", p="md", radius="md", withBorder=True),
-            ], gap="xs"),
+# Page Layout, built per visit so the sidebar lists the data currently loaded
+def development_economics_and_trade():
+    return dmc.Container([
+        dmc.Grid([
+            dmc.GridCol(sidebar(store.facets("economic_data").distinct), span={"base": 12, "sm": 3}),
+            dmc.GridCol([
+                dmc.Stack([
+                    dmc.Paper([
+                        # dmc.Autocomplete(
+                        #     id="suggestions-autocomplete-economic",
+                        #     placeholder="Ask anything...",
+                        #     leftSection=DashIconify(icon="mingcute:ai-fill"),
+                        #     style={"width": "100%", "marginBottom": "20px"},
+                        # ),
+                        dmc.Tabs(
+                            children=[
+                                dmc.TabsList(
+                                    [
+                                        dmc.TabsTab("Map View", leftSection=DashIconify(icon="tabler:map"), value="map"),
+                                        dmc.TabsTab("Visualization", leftSection=DashIconify(icon="tabler:chart-bar"), value="graph"),
+                                        dmc.TabsTab("Data View", leftSection=DashIconify(icon="tabler:database"), value="dataview"),
+                                    ], 
+                                    grow="True",
+                                ),
+                                dmc.TabsPanel(
+                                    children=[
+                                        html.Div(id='map-id-economic'),        
+                                    ], 
+                                    value="map"
+                                ),
+                                dmc.TabsPanel(                               
+                                    children=[
+                                        html.Div(id='graph-id-economic'),
+                                    ], 
+                                    value="graph"
+                                ),
+                                dmc.TabsPanel(html.Div(id='dataview-container-economic'), value="dataview"),
+                            ], 
+                            id="active-tab-economic", value="map", color="#336666"
+                        ),
+                    ], shadow="xs", p="md", radius="md", withBorder=True),
+                ], gap="xs"),
             
-            dcc.Store(id="selected-point-data-economic"),
-            dcc.Store(id="indicator-unit-economic"),
-            dmc.Modal(
-                id="info-modal-economic",
-                children=[
-                    dmc.Text(id="modal-body-economic"),
-                ],
-                fullScreen=True
-            )
-        ], span={"base": 12, "sm": 9}),
-    ]),
-], fluid=True, style={'paddingTop': '1rem'})
+                dcc.Store(id="selected-point-data-economic"),
+                dcc.Store(id="indicator-unit-economic"),
+                dcc.Store(id="rendered-tabs-economic"),
+                dcc.Store(id="report-filters-economic"),  # filters once the dropdowns have settled (assets/settle.js)
+                dcc.Store(id="facets-resolved-economic"),  # dropdown values the last step of the cascade ran for (assets/facets.js)
+                dmc.Modal(
+                    id="info-modal-economic",
+                    children=[
+                        dmc.Text(id="modal-body-economic"),
+                    ],
+                    fullScreen=True
+                )
+            ], span={"base": 12, "sm": 9}),
+        ]),
+    ], fluid=True, style={'paddingTop': '1rem'})
 
 def create_dataview(dff): 
     pivoted_data = dff.pivot_table(
         index=[col for col in dff.columns if col not in ['Indicator', 'Indicator Value']],
         columns='Indicator',
         values='Indicator Value',
-        aggfunc='first'
+        aggfunc='first',
+        observed=True
     ).reset_index()
     
     return html.Div([
@@ -203,43 +204,27 @@ def create_map(dff, year):
         ctg = [f"" for i in range(len(classes))]
         colorbar = dlx.categorical_colorbar(categories=ctg, colorscale=colorscale, width=30, height=300, position="bottomright")
     
-        with open('./assets/countries.json') as f:
-            geojson_data = json.load(f)
-                
-        # Map indicator values to geojson features
-        for feature in geojson_data['features']:
-            market_name = feature['properties']['name']  # Ensure correct property for market name
-            feature['properties']['Series Name'] = series_name
-            feature['properties']['Indicator'] = indicator
-            feature['properties']['Year'] = year
-            
-            # Find matching row in the filtered data
-            market_data = dff[dff['Markets'] == market_name]
-            
-            if not market_data.empty:
-                # Assign the indicator value
-                feature['properties'][indicator] = market_data['Indicator Value'].values[0]
-            else:
-                # Assign None for missing data
-                feature['properties'][indicator] = None
+        # Values per boundary, matched by name in one pass. Only these travel with each
+        # update (hideout); the boundaries are cached static files (geometry.levels)
+        values, _ = geometry.join('countries', dff, 'Markets')
                 
         # Create geojson.
-        geojson = dl.GeoJSON(data=geojson_data,
-                            style=style_handle,
-                            zoomToBounds=True,
+        geojson = dl.GeoJSON(style=style_handle,
+                            zoomToBounds=False,
                             zoomToBoundsOnClick=True,
                             hoverStyle = dict(weight=5, color='#666', dashArray=''),
-                            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+                            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='name', levels=geometry.levels('countries'), tiles=geometry.tiles('countries'), info=info_context(series_name, indicator, indicator_unit, year)),
                             id="geojson-economic")
         
         return html.Div([
             dl.Map(
                     style={'width': '100%', 'height': '450px'},
-                    center=[20, 0],  # Centered on the equator, near the Prime Meridian
-                    zoom=6,
+                    id="map-economic",
+                    bounds=geometry.bounds('countries'),
                     children=[
                         dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
-                        geojson, 
+                        geojson,
+                        dl.LayerGroup(id="geojson-economic-tiles", eventHandlers=dict(add=tiles_handle)),
                         colorbar,
                         html.Div(children=get_info(indicator=indicator, indicator_unit=indicator_unit, year=year), id="info-economic", className="info", style={"position": "absolute", "top": "10px", "right": "10px", "zIndex": "1000"}),
                     ],
@@ -357,20 +342,48 @@ def create_graph(dff):
     ])
 
 
-# Calllback for info on map
-@callback(Output("info-economic", "children"), Input('series-name-dropdown-economic', 'value'), Input('year-dropdown-economic', 'value'), Input('indicator-dropdown-economic', 'value'),  Input('indicator-unit-economic', 'data'), Input("geojson-economic", "hoverData"))
-def info_hover(series_name, year, indicator, indicator_unit, feature):
-    return get_info(series_name=series_name, indicator=indicator, feature=feature, indicator_unit=indicator_unit, year=year)
+# Calllback for info on map, built in the browser (assets/info.js)
+clientside_callback(
+    ClientsideFunction(namespace='mapInfo', function_name='hover'),
+    Output("info-economic", "children"), Input("geojson-economic", "hoverData"), State("geojson-economic", "hideout"),
+    prevent_initial_call=True,
+)
+
+# Boundaries simplified to the current zoom, swapped in as the map zooms and reloaded
+# when a report update redraws the map (assets/topology.js)
+clientside_callback(
+    ClientsideFunction(namespace='topology', function_name='boundaries'),
+    Output("geojson-economic", "data"), Input("map-economic", "zoom"), Input("geojson-economic", "hideout"), State("geojson-economic", "data"),
+)
+
+# Or, when the hideout lists vector tiles, boundaries drawn from the tiles in view and
+# repainted on each report update (assets/vectortiles.js)
+clientside_callback(
+    ClientsideFunction(namespace='vectorTiles', function_name='restyle'),
+    Input("geojson-economic", "hideout"), State("geojson-economic", "hoverStyle"), State("geojson-economic", "zoomToBoundsOnClick"),
+)
 
 
 # Callbacks
-@callback([Output('graph-id-economic', 'children'), Output('map-id-economic', 'children'), Output('dataview-container-economic', 'children'), Output('metadata-panel-economic', 'children'), Output('indicator-unit-economic', 'data')],
-          [Input('series-name-dropdown-economic', 'value'), Input("product-dropdown-economic", "value"),
-           Input("indicator-dropdown-economic", "value"), Input("market-dropdown-economic", "value"), Input("year-dropdown-economic", "value")])
-def update_report(series_name, product, indicator, market, year):
-    dff = filter_data(data=data, series_name=series_name, indicator=indicator, product=product, market=market)
+@callback([Output('graph-id-economic', 'children'), Output('map-id-economic', 'children'), Output('dataview-container-economic', 'children'), Output('metadata-panel-economic', 'children'), Output('indicator-unit-economic', 'data'), Output('rendered-tabs-economic', 'data')],
+          [Input('report-filters-economic', 'data'), Input('active-tab-economic', 'value')],
+          State('rendered-tabs-economic', 'data'))
+def update_report(filters, active_tab, rendered):
+    if filters is None:
+        return (dash.no_update,) * 6
+    series_name, product, indicator, market, year = filters
+    dff = filter_data(data="economic_data", series_name=series_name, indicator=indicator, product=product, market=market)
+
+    # Only the visible tab is built; the others follow when they are first opened
+    panels, rendered, changed = render_tabs(
+        {"graph": lambda: create_graph(dff), "map": lambda: create_map(dff, year), "dataview": lambda: create_dataview(dff)},
+        active_tab, [series_name, product, indicator, market, year], rendered,
+        cache_key="economic",
+    )
+    if not changed:
+        return *panels, dash.no_update, dash.no_update, rendered
     indicator_unit = dff['Indicator Unit'].unique()
-    return create_graph(dff), create_map(dff, year), create_dataview(dff), create_metadata(dff), indicator_unit.tolist()
+    return *panels, create_metadata(dff), indicator_unit.tolist(), rendered
 
 
 # @callback(Output("download-data-economic", "data"), Input("download-button-economic", "n_clicks"),
@@ -380,87 +393,55 @@ def update_report(series_name, product, indicator, market, year):
 #     dff = filter_data(data=data, series_name=series_name, indicator=indicator, market=market)
 #     return dict(content=dff.to_csv(index=False), filename="data.csv", type="application/csv")
 
-@callback(
+# Settled filters: written once the last step of the dropdown cascade has run for the values
+# shown, so one change of the selection renders the report once (assets/settle.js)
+clientside_callback(
+    ClientsideFunction(namespace='reports', function_name='settle'),
+    Output('report-filters-economic', 'data'),
+    Input('series-name-dropdown-economic', 'value'),
+    Input("product-dropdown-economic", "value"),
+    Input("indicator-dropdown-economic", "value"),
+    Input("market-dropdown-economic", "value"),
+    Input("year-dropdown-economic", "value"),
+    Input('facets-resolved-economic', 'data'),
+    State('report-filters-economic', 'data'),
+)
+
+# Cascading dropdowns, resolved in the browser from the facet tree (assets/facets.js)
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='economicProducts'),
     Output('product-dropdown-economic', 'data'),
     Output('product-dropdown-economic', 'value'),
     Output('product-dropdown-economic', 'style'),
     Input('series-name-dropdown-economic', 'value'),
 )
-def update_products(series_name):
-    products_options = data[(data["Series Name"] == series_name)]["Products"].dropna().str.strip().unique()
-    # Control visibility based on available options
-    style = {'display': 'block'} if products_options.size > 0 else {'display': 'none'}
-    return [{'label': option, 'value': option} for option in sorted(products_options)], products_options[0] if products_options.size > 0 else None, style
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='economicMarkets'),
     Output('market-dropdown-economic', 'data'),
     Output('market-dropdown-economic', 'value'),
     Output('market-dropdown-economic', 'style'),
     Input('series-name-dropdown-economic', 'value'),
 )
-def update_markets(series_name):
-    market_options = data[(data["Series Name"] == series_name)]["Markets"].dropna().str.strip().unique()
-    # Control visibility based on available options
-    style = {'display': 'block'} if market_options.size > 0 else {'display': 'none'}
-    return [{'label': option, 'value': option} for option in ['All'] + list(sorted(market_options))], 'All', style
 
-
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='economicIndicators'),
     Output('indicator-dropdown-economic', 'data'),
     Output('indicator-dropdown-economic', 'value'),
     Input('series-name-dropdown-economic', 'value'),
     Input('market-dropdown-economic', 'value'),
-    prevent_initial_call=False
+    prevent_initial_call=False,
 )
-def update_indicators(series_name, market):
-    # Filter data based on the selected filters
-    dff = filter_data(data=data, series_name=series_name, market=market)
-    
-    # Extract unique indicator values
-    indicator_values = dff['Indicator'].unique().tolist()
-    
-    # If no indicators are available, return empty options and value
-    if not indicator_values:
-        return [], None
-    
-    # Prepare dropdown options
-    indicator_options = [{'label': indicator, 'value': indicator} for indicator in sorted(indicator_values)]
-    
-    # Set default value to the first indicator
-    default_value = indicator_values[0] if indicator_values else None
-    
-    return indicator_options, default_value
 
-
-
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='economicYears'),
     Output('year-dropdown-economic', 'data'),
     Output('year-dropdown-economic', 'value'),
     Output('year-dropdown-economic', 'style'),
+    Output('facets-resolved-economic', 'data'),
     Input('series-name-dropdown-economic', 'value'),
     Input('indicator-dropdown-economic', 'value'),
     Input('market-dropdown-economic', 'value'),
     Input('product-dropdown-economic', 'value'),
     Input('active-tab-economic', 'value'),
 )
-def update_year_dropdown(series_name, indicator, market, product, active_tab):
-    # Filter the data based on the selected filters
-    dff = filter_data(data=data, series_name=series_name, indicator=indicator, market=market, product=product)
-    
-    # Extract unique year values
-    year_values = dff['Year'].dropna().unique().tolist()
-    
-    # If no year_values are available, return empty options and value
-    if not year_values:
-        return [], None, {'display': 'none' if active_tab != 'map' else 'block'}
-    
-    # Prepare dropdown options
-    year_options = [{'label': str(int(year)), 'value': str(int(year))} for year in sorted(year_values)]
-    
-    # Set default value to the latest year
-    default_value = str(max(year_values))  # Convert to string to match dropdown data format
-    
-    # Conditionally set style based on active_tab
-    dropdown_style = {'display': 'block'} if active_tab == 'map' else {'display': 'none'}
-    
-    return year_options, default_value, dropdown_style
\ No newline at end of file
@@ -1,22 +1,18 @@
-import json
 import math
-import sqlite3
 import string
 import dash
-from dash import html, dcc, Input, Output, State, callback
+from dash import html, dcc, Input, Output, State, callback, clientside_callback, ClientsideFunction
 import dash_mantine_components as dmc
 import dash_ag_grid as dag
 import pandas as pd
-from ..utils.utils import get_info, filter_data, style_handle
+from ..utils.utils import get_info, info_context, filter_data, first_value, style_handle, tiles_handle, render_tabs
+from ..data.store import store
+from ..data.geometry import geometry
 from dash_iconify import DashIconify
 import plotly.graph_objects as go
 import dash_leaflet as dl
 import dash_leaflet.express as dlx
 
-# Load data
-conn = sqlite3.connect("./src/data/data.db")
-data = pd.read_sql_query(f"SELECT * FROM education_data;", conn)
-
 # Sidebar components
 def sidebar(data):
     return dmc.Stack([
@@ -25,7 +21,7 @@ def sidebar(data):
                 label="Select Dataset", 
                 id="series-name-dropdown-education", 
                 value='Student Flow Rates', 
-                data=[{'label': option, 'value': option} for option in data["Series Name"].dropna().str.strip().unique() if option],
+                data=[{'label': option, 'value': option} for option in data["Series Name"].dropna().unique() if option],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 checkIconPosition="right",
@@ -35,7 +31,7 @@ def sidebar(data):
                 label="Select Variable", 
                 id="indicator-dropdown-education", 
                 value='Dropout', 
-                data=[{'label': option, 'value': option} for option in list(sorted(data["Indicator"].dropna().str.strip().unique()))],
+                data=[{'label': option, 'value': option} for option in list(sorted(data["Indicator"].dropna().unique()))],
                 withScrollArea=False,
                 styles={"marginBottom": "16px", "dropdown": {"maxHeight": 200, "overflowY": "auto"}},
                 mt="md",
@@ -98,54 +94,58 @@ def sidebar(data):
         ])
     ], gap="xs")
 
-# Page Layout
-education = dmc.Container([
-    dmc.Grid([
-        dmc.GridCol(sidebar(data), span={"base": 12, "sm": 3}),
-        dmc.GridCol([
-            dmc.Stack([
-                dmc.Paper([
-                    dmc.Tabs(
-                        children=[
-                            dmc.TabsList(
-                                [
-                                    dmc.TabsTab("Map View", leftSection=DashIconify(icon="tabler:map"), value="map"),
-                                    dmc.TabsTab("Visualization", leftSection=DashIconify(icon="tabler:chart-bar"), value="graph"),
-                                    dmc.TabsTab("Data View", leftSection=DashIconify(icon="tabler:database"), value="dataview"),
-                                ], 
-                                grow="True",
-                            ),
-                            dmc.TabsPanel(
-                                children=[
-                                    html.Div(id='map-id-education'),        
-                                ], 
-                                value="map"
-                            ),
-                            dmc.TabsPanel(                               
-                                children=[
-                                    html.Div(id='graph-id-education'),
-                                ], 
-                                value="graph"
-                            ),
-                            dmc.TabsPanel(html.Div(id='dataview-container-education'), value="dataview"),
-                        ], 
-                        id="active-tab-education", value="map", color="#336666"
-                    ),
-                ], shadow="xs", p="md", radius="md", withBorder=True),
-            ], gap="xs"),
+# Page Layout, built per visit so the sidebar lists the data currently loaded
+def education():
+    return dmc.Container([
+        dmc.Grid([
+            dmc.GridCol(sidebar(store.facets("education_data").distinct), span={"base": 12, "sm": 3}),
+            dmc.GridCol([
+                dmc.Stack([
+                    dmc.Paper([
+                        dmc.Tabs(
+                            children=[
+                                dmc.TabsList(
+                                    [
+                                        dmc.TabsTab("Map View", leftSection=DashIconify(icon="tabler:map"), value="map"),
+                                        dmc.TabsTab("Visualization", leftSection=DashIconify(icon="tabler:chart-bar"), value="graph"),
+                                        dmc.TabsTab("Data View", leftSection=DashIconify(icon="tabler:database"), value="dataview"),
+                                    ], 
+                                    grow="True",
+                                ),
+                                dmc.TabsPanel(
+                                    children=[
+                                        html.Div(id='map-id-education'),        
+                                    ], 
+                                    value="map"
+                                ),
+                                dmc.TabsPanel(                               
+                                    children=[
+                                        html.Div(id='graph-id-education'),
+                                    ], 
+                                    value="graph"
+                                ),
+                                dmc.TabsPanel(html.Div(id='dataview-container-education'), value="dataview"),
+                            ], 
+                            id="active-tab-education", value="map", color="#336666"
+                        ),
+                    ], shadow="xs", p="md", radius="md", withBorder=True),
+                ], gap="xs"),
             
-            dcc.Store(id="selected-point-data-education"),
-            dcc.Store(id="indicator-unit-education"),
-            dmc.Modal(
-                id="info-modal-education",
-                children=[
-                    dmc.Text(id="modal-body-education"),
-                ],
-                fullScreen=True
-            )
-        ], span={"base": 12, "sm": 9}),
-    ]),
-], fluid=True, style={'paddingTop': '1rem'})
+                dcc.Store(id="selected-point-data-education"),
+                dcc.Store(id="indicator-unit-education"),
+                dcc.Store(id="rendered-tabs-education"),
+                dcc.Store(id="report-filters-education"),  # filters once the dropdowns have settled (assets/settle.js)
+                dcc.Store(id="facets-resolved-education"),  # dropdown values the last step of the cascade ran for (assets/facets.js)
+                dmc.Modal(
+                    id="info-modal-education",
+                    children=[
+                        dmc.Text(id="modal-body-education"),
+                    ],
+                    fullScreen=True
+                )
+            ], span={"base": 12, "sm": 9}),
+        ]),
+    ], fluid=True, style={'paddingTop': '1rem'})
 
 
 def create_dataview(dff): 
@@ -153,7 +153,8 @@ def create_dataview(dff):
         index=[col for col in dff.columns if col not in ['Indicator', 'Indicator Value']],
         columns='Indicator',
         values='Indicator Value',
-        aggfunc='first'
+        aggfunc='first',
+        observed=True
     ).reset_index()
     
     # Remove columns where all values are empty strings
@@ -260,39 +261,22 @@ def create_map(dff, year):
 
     if 'Province' in dff.columns:
         if dff['Province'].unique() == 'Cambodia':
-            dff = filter_data(data=data, series_name=dff['Series Name'].unique()[0], indicator=dff['Indicator'].unique()[0], grade=dff['Grade'].unique()[0], year=year)
+            dff = filter_data(data="education_data", series_name=dff['Series Name'].unique()[0], indicator=dff['Indicator'].unique()[0], grade=dff['Grade'].unique()[0], year=year)
 
         # ctg = [f"{int(classes[i])}+" for i in range(len(classes))]
         ctg = [f"" for i in range(len(classes))]
         colorbar = dlx.categorical_colorbar(categories=ctg, colorscale=colorscale, width=30, height=300, position="bottomright")
     
-        with open('./assets/geoBoundaries-KHM-ADM1_simplified.json') as f:
-            geojson_data = json.load(f)
-        
-        # Map indicator values to geojson features
-        for feature in geojson_data['features']:
-            province_name = feature['properties']['shapeName']  # Ensure correct property for province name
-            
-            # Find matching row in the filtered data
-            province_data = dff[dff['Province'] == province_name]
-            
-            if not province_data.empty:
-                # Assign the indicator value
-                feature['properties'][indicator] = province_data['Indicator Value'].values[0]
-                feature['properties']['Series Name'] = series_name
-                feature['properties']['Indicator'] = indicator
-                feature['properties']['Year'] = year
-            else:
-                # Assign None for missing data
-                feature['properties'][indicator] = None
+        # Values per boundary, matched by name in one pass. Only these travel with each
+        # update (hideout); the boundaries are cached static files (geometry.levels)
+        values, _ = geometry.join('adm1', dff, 'Province')
         
         # Create geojson.
-        geojson = dl.GeoJSON(data=geojson_data,
-                            style=style_handle,
-                            zoomToBounds=True,
+        geojson = dl.GeoJSON(style=style_handle,
+                            zoomToBounds=False,
                             zoomToBoundsOnClick=True,
                             hoverStyle=dict(color='black'),
-                            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+                            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='shapeName', levels=geometry.levels('adm1'), tiles=geometry.tiles('adm1'), info=info_context(series_name, indicator, indicator_unit, year)),
                             id="geojson-education")
 
         # Return the map component along with the modal
@@ -300,11 +284,12 @@ def create_map(dff, year):
             [
                 dl.Map(
                     style={'width': '100%', 'height': '450px'},
-                    center=[12.5657, 104.9910],
-                    zoom=7,
+                    id="map-education",
+                    bounds=geometry.bounds('adm1'),
                     children=[
                         dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
                         geojson,
+                        dl.LayerGroup(id="geojson-education-tiles", eventHandlers=dict(add=tiles_handle)),
                         colorbar,
                         html.Div(children=get_info(series_name=series_name, indicator=indicator, indicator_unit=indicator_unit, year=year), id="info-education", className="info", style={"position": "absolute", "top": "10px", "right": "10px", "zIndex": "1000"}),
                     
@@ -312,6 +297,8 @@ def create_map(dff, year):
                     attributionControl=False,
                 ),
             ],
+            # Keyed on the boundary file: switching files mounts a new map at its bounds
+            id="map-view-education-adm1",
             style={
                 'position': 'relative',
                 'zIndex': 0,
@@ -319,29 +306,22 @@ def create_map(dff, year):
         )
     
     else:
-        with open('./assets/geoBoundaries-KHM-ADM0_simplified.json') as f:
-            geojson_data = json.load(f)
-            
-        geojson_data['features'][0]['properties'][indicator] = dff['Indicator Value'].values[0]
-        geojson_data['features'][0]['properties']['Series Name'] = series_name
-        geojson_data['features'][0]['properties']['Indicator'] = indicator
-        geojson_data['features'][0]['properties']['Year'] = year
+        values = {'Cambodia': dff['Indicator Value'].values[0]}
         
         geojson = dl.GeoJSON(
-            data=geojson_data,
             style=style_handle,
-            zoomToBounds=True,
+            zoomToBounds=False,
             zoomToBoundsOnClick=True,
             hoverStyle=dict(color='black'),
-            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator),
+            hideout=dict(colorscale=colorscale, classes=classes, style=style, colorProp=indicator, values=values, nameProp='shapeName', levels=geometry.levels('adm0'), info=info_context(series_name, indicator, indicator_unit, year)),
             id="geojson-education"
         )
         
         return html.Div([
             dl.Map(
                     style={'width': '100%', 'height': '450px'},
-                    center=[12.5657, 104.9910],
-                    zoom=7,
+                    id="map-education",
+                    bounds=geometry.bounds('adm0'),
                     children=[
                         dl.TileLayer(url="http://{s}.basemaps.cartocdn.com/light_nolabels/{z}/{x}/{y}.png"),
                         geojson,
@@ -350,6 +330,8 @@ def create_map(dff, year):
                     ],
                     attributionControl=False,
             )],
+            # Keyed on the boundary file: switching files mounts a new map at its bounds
+            id="map-view-education-adm0",
             style={
                 'position': 'relative',
                 'zIndex': 0,
@@ -397,7 +379,7 @@ def create_graph(dff, year):
             y=-0.30,
             xref="paper",
             yref="paper",
-            text=f"Source: {dff['Source'].unique()[0]}",
+            text=f"Source: {first_value(dff, 'Source')}",
             showarrow=False,
             font=dict(
                 color='rgba(0, 0, 0, 0.6)',
@@ -496,7 +478,7 @@ def create_graph(dff, year):
                 x=0.5,  # Center horizontally (matches legend's x)
                 y=-0.30,
                 xref="paper",
-                yref="paper",text=f"Source: {dff['Source'].unique()[0]}",  # Customize this
+                yref="paper",text=f"Source: {first_value(dff, 'Source')}",  # Customize this
                 showarrow=False,
                 font=dict(
                     color='rgba(0, 0, 0, 0.6)',
@@ -550,7 +532,7 @@ def create_graph(dff, year):
             for idx, grade in enumerate(dff['Grade'].unique()):
                 grade_data = dff[dff['Grade'] == grade]
                 line_color = ["#156082", "#A80000", "#8EA4BC", "#FF5733", "#F4A261", "#E9C46A", "#2A9D8F", "#E76F51", "#457B9D", "#D4A373", "#6A0572", "#264653"]
-                sub_sector = dff["Sub-Sector (1)"].unique()[0]
+                sub_sector = first_value(dff, "Sub-Sector (1)")
                 
                 if sub_sector == "Level":
                     traces.append(go.Scatter(
@@ -592,14 +574,14 @@ def create_graph(dff, year):
         if series_name == "Successful Student":
             fig.update_layout(
                 title=dict(
-                    text=f"{indicator} in {dff['Province'].unique()[0]}"
+                    text=f"{indicator} in {first_value(dff, 'Province')}"
                         + f"<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff['Indicator Unit'].unique()[0]}</span>"
                 )
             )
         else:
             fig.update_layout(
                 title=dict(
-                    text=f"{series_name}: {indicator} in {dff['Province'].unique()[0]}"
+                    text=f"{series_name}: {indicator} in {first_value(dff, 'Province')}"
                         + f"<br><span style='display:block; margin-top:8px; font-size:70%; color:rgba(0, 0, 0, 0.6);'>{dff['Indicator Unit'].unique()[0]}</span>"
                 )
             )
@@ -631,21 +613,48 @@ def create_graph(dff, year):
         )
     ]) 
 
-# Calllback for info on map
-@callback(Output("info-education", "children"), Input('series-name-dropdown-education', 'value'), Input('year-dropdown-education', 'value'), Input('indicator-dropdown-education', 'value'),  Input('indicator-unit-education', 'data'), Input("geojson-education", "hoverData"))
-def info_hover(series_name, year, indicator, indicator_unit, feature):
-    return get_info(series_name=series_name, indicator=indicator, feature=feature, indicator_unit=indicator_unit, year=year)
+# Calllback for info on map, built in the browser (assets/info.js)
+clientside_callback(
+    ClientsideFunction(namespace='mapInfo', function_name='hover'),
+    Output("info-education", "children"), Input("geojson-education", "hoverData"), State("geojson-education", "hideout"),
+    prevent_initial_call=True,
+)
 
+# Boundaries simplified to the current zoom, swapped in as the map zooms and reloaded
+# when a report update redraws the map (assets/topology.js)
+clientside_callback(
+    ClientsideFunction(namespace='topology', function_name='boundaries'),
+    Output("geojson-education", "data"), Input("map-education", "zoom"), Input("geojson-education", "hideout"), State("geojson-education", "data"),
+)
 
-# Callbacks
-@callback([Output('graph-id-education', 'children'), Output('map-id-education', 'children'), Output('dataview-container-education', 'children'), Output('metadata-panel-education', 'children'), Output('indicator-unit-education', 'data')],
-          [Input('series-name-dropdown-education', 'value'), Input('segmented-grade-level', 'value'),
-           Input("indicator-dropdown-education", "value"), Input("year-dropdown-education", "value"), Input('grade-dropdown-education', 'value'), Input('province-dropdown-education', 'value'),])
-def update_report(series_name, grade_or_level, indicator, year, grade, province):
-    dff = filter_data(data=data, series_name=series_name, subsector_1=grade_or_level, indicator=indicator, grade=grade, province=province)
+# Or, when the hideout lists vector tiles, boundaries drawn from the tiles in view and
+# repainted on each report update (assets/vectortiles.js)
+clientside_callback(
+    ClientsideFunction(namespace='vectorTiles', function_name='restyle'),
+    Input("geojson-education", "hideout"), State("geojson-education", "hoverStyle"), State("geojson-education", "zoomToBoundsOnClick"),
+)
 
+
+# Callbacks
+@callback([Output('graph-id-education', 'children'), Output('map-id-education', 'children'), Output('dataview-container-education', 'children'), Output('metadata-panel-education', 'children'), Output('indicator-unit-education', 'data'), Output('rendered-tabs-education', 'data')],
+          [Input('report-filters-education', 'data'), Input('active-tab-education', 'value')],
+          State('rendered-tabs-education', 'data'))
+def update_report(filters, active_tab, rendered):
+    if filters is None:
+        return (dash.no_update,) * 6
+    series_name, grade_or_level, indicator, year, grade, province = filters
+    dff = filter_data(data="education_data", series_name=series_name, subsector_1=grade_or_level, indicator=indicator, grade=grade, province=province)
+
+    # Only the visible tab is built; the others follow when they are first opened
+    panels, rendered, changed = render_tabs(
+        {"graph": lambda: create_graph(dff, year), "map": lambda: create_map(dff, year), "dataview": lambda: create_dataview(dff)},
+        active_tab, [series_name, grade_or_level, indicator, year, grade, province], rendered,
+        cache_key="education",
+    )
+    if not changed:
+        return *panels, dash.no_update, dash.no_update, rendered
     indicator_unit = dff['Indicator Unit'].unique()
-    return create_graph(dff, year), create_map(dff, year), create_dataview(dff), create_metadata(dff), indicator_unit.tolist()
+    return *panels, create_metadata(dff), indicator_unit.tolist(), rendered
 
 
 # @callback(Output("download-data-education", "data"), Input("download-button-education", "n_clicks"),
@@ -657,112 +666,67 @@ def update_report(series_name, grade_or_level, indicator, year, grade, province)
 #     return dict(content=dff.to_csv(index=False), filename="data.csv", type="application/csv")
 
 
-@callback(
+# Settled filters: written once the last step of the dropdown cascade has run for the values
+# shown, so one change of the selection renders the report once (assets/settle.js)
+clientside_callback(
+    ClientsideFunction(namespace='reports', function_name='settle'),
+    Output('report-filters-education', 'data'),
+    Input('series-name-dropdown-education', 'value'),
+    Input('segmented-grade-level', 'value'),
+    Input("indicator-dropdown-education", "value"),
+    Input("year-dropdown-education", "value"),
+    Input('grade-dropdown-education', 'value'),
+    Input('province-dropdown-education', 'value'),
+    Input('facets-resolved-education', 'data'),
+    State('report-filters-education', 'data'),
+)
+
+# Cascading dropdowns, resolved in the browser from the facet tree (assets/facets.js)
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='educationGradeLevel'),
     [Output('segmented-grade-level', 'style'),
      Output('segmented-grade-level', 'value')],
-    Input('series-name-dropdown-education', 'value')
+    Input('series-name-dropdown-education', 'value'),
 )
-def update_segmented_control_visibility(series_name):
-    # If the series name is "Student Flow Rates", show the segmented control
-    if series_name == "Student Flow Rates":
-        return {'visibility': 'visible', 'position': 'relative'}, "Level"  # Keep value None when visible
-    else:
-        return {'visibility': 'hidden', 'position': 'absolute'}, None  # Clear value when hidden
-    
-@callback(
+
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='educationGrade'),
     Output('grade-dropdown-education', 'data'),
     Output('grade-dropdown-education', 'value'),
     Output('grade-dropdown-education', 'style'),
     Output('grade-dropdown-education', 'label'),
     Input('series-name-dropdown-education', 'value'),
-    Input('segmented-grade-level', 'value')
+    Input('segmented-grade-level', 'value'),
 )
-def update_grade(series_name, grade_or_level):
-    # Filtering data based on Series Name
-    if series_name == "Student Flow Rates":
-        # Filter based on the 'Sub-Sector (1)' column using grade_or_level
-        grade_options = data[(data["Series Name"] == series_name) & 
-                              (data["Sub-Sector (1)"] == grade_or_level)]["Grade"].dropna().str.strip().unique()
-    else:
-        # Default behavior (filtering just by Series Name)
-        grade_options = data[(data["Series Name"] == series_name)]["Grade"].dropna().str.strip().unique()
 
-    # Control visibility based on available options
-    style = {'display': 'block'} if grade_options.size > 0 else {'display': 'none'}
-
-    # Update the label based on the segmented control value
-    label = "Select Level" if grade_or_level == "Level" else "Select Grade"
-
-    return [{'label': option, 'value': option} for option in ['All'] + list(grade_options)], 'All' if grade_options.size > 0 else None, style, label
-
-
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='educationProvince'),
     Output('province-dropdown-education', 'data'),
     Output('province-dropdown-education', 'value'),
     Output('province-dropdown-education', 'style'),
     Input('series-name-dropdown-education', 'value'),
 )
-def update_province(series_name):
-    province_options = data[(data["Series Name"] == series_name)]["Province"].dropna().str.strip().unique()
-    # Control visibility based on available options
-    style = {'display': 'block'} if province_options.size > 0 else {'display': 'none'}
-    return [{'label': option, 'value': option} for option in sorted(province_options)], "Cambodia" if province_options.size > 0 else None, style
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='educationIndicators'),
     Output('indicator-dropdown-education', 'data'),
     Output('indicator-dropdown-education', 'value'),
     Input('series-name-dropdown-education', 'value'),
     Input('grade-dropdown-education', 'value'),
     Input('province-dropdown-education', 'value'),
-    prevent_initial_call=False
+    prevent_initial_call=False,
 )
-def update_indicators(series_name, grade, province):
-    # Filter data based on the selected filters
-    dff = filter_data(data=data, series_name=series_name, grade=grade, province=province)
-    
-    # Extract unique indicator values
-    indicator_values = dff['Indicator'].unique().tolist()
-    
-    # If no indicators are available, return empty options and value
-    if not indicator_values:
-        return [], None
-    
-    # Prepare dropdown options
-    indicator_options = [{'label': indicator, 'value': indicator} for indicator in sorted(indicator_values)]
-    
-    # Set default value to the first indicator
-    default_value = sorted(indicator_values)[0] if indicator_values else None
-    
-    return indicator_options, default_value
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='facets', function_name='educationYears'),
     Output('year-dropdown-education', 'data'),
     Output('year-dropdown-education', 'value'),
     Output('year-dropdown-education', 'style'),
+    Output('facets-resolved-education', 'data'),
     Input('series-name-dropdown-education', 'value'),
     Input('indicator-dropdown-education', 'value'),
     Input('grade-dropdown-education', 'value'),
     Input('province-dropdown-education', 'value'),
     Input('active-tab-education', 'value'),
+    State('segmented-grade-level', 'value'),  # recorded in facets-resolved-education only
 )
-def update_year_dropdown(series_name, indicator, grade, province, active_tab):
-    # Filter the data based on the selected filters
-    dff = filter_data(data=data, series_name=series_name, indicator=indicator, province=province, grade=grade)
-    # Extract unique year values
-    year_values = dff['Year'].dropna().unique().tolist()
-    
-    # If no year_values are available, return empty options and value
-    if not year_values:
-        return [], None, {'display': 'none' if active_tab != 'map' else 'block'}
-    
-    # Prepare dropdown options
-    year_options = [{'label': str(year), 'value': str(year)} for year in sorted(year_values)]
-    
-    # Set default value to the latest year
-    default_value = str(max(year_values))  # Convert to string to match dropdown data format
-
-    # Conditionally set style based on active_tab
-    dropdown_style = {'display': 'block'} if (active_tab == 'map' or (active_tab == 'graph' and series_name == 'Occupations of School Dropouts')) else {'display': 'none'}
-
-
-    return year_options, default_value, dropdown_style
\ No newline at end of file
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import plotly.io.json
+from ..data.store import store
+from .cache import SingleFlight
+from .. import config
+
+
+def code_version(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))):
+    """
+    Hash of the Python sources under `root` (src/ by default), which build every cached panel.
+
+    Returns:
+        str: 16 hex digits, changing whenever a page, component or helper changes.
+    """
+    digest = hashlib.sha256()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()  # walk in a stable order
+        for name in sorted(filenames):
+            if name.endswith(".py"):
+                path = os.path.join(dirpath, name)
+                digest.update(os.path.relpath(path, root).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class RenderCache:
+    """
+    Rendered callback outputs shared by every worker on the host.
+
+    Outputs are stored as their Dash JSON in a small SQLite database, keyed on the
+    render's inputs, `store.data_token` and the code `version`, so whichever worker
+    renders a view first serves it to all the others until data.db or the code changes. A hit is returned as the decoded
+    JSON (plain dicts), which Dash sends to the browser exactly like the original
+    components. Entries of older data are dropped by the first write of a worker serving
+    the newest data, and at most `max_entries` of the most recent ones are kept.
+
+    Identical renders that overlap run once: threads of a worker wait on a
+    `SingleFlight`, and other workers wait on a lease row in the database (up to
+    `wait_timeout` seconds, then they render the view themselves) and read the stored
+    output. Leases older than `lease_timeout` seconds are ignored.
+    """
+
+    def __init__(self, db_path, max_entries=2000, lease_timeout=30, wait_timeout=2, version=None):
+        self.db_path = db_path
+        self.version = version or code_version()
+        self.max_entries = max_entries
+        self.lease_timeout = lease_timeout
+        self.wait_timeout = wait_timeout
+        self.hits = 0
+        self.misses = 0
+        self.waited = 0  # misses answered by another worker's render
+        self._flights = SingleFlight()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connection(self):
+        if os.getpid() != self._pid:
+            # Forked worker: open new connections instead of sharing the parent's
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL;")  # readers never wait for a writing worker
+            conn.execute("PRAGMA synchronous = NORMAL;")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS renders "
+                "(key TEXT PRIMARY KEY, data_token TEXT NOT NULL, created REAL NOT NULL, value TEXT NOT NULL);"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, expires REAL NOT NULL);")
+            # When each data version was first stored; the newest one decides which entries are stale
+            conn.execute("CREATE TABLE IF NOT EXISTS tokens (data_token TEXT PRIMARY KEY, first_seen REAL NOT NULL);")
+            self._local.conn = conn
+        return conn
+
+    def _key(self, parts):
+        return hashlib.sha256(json.dumps([store.data_token, self.version, parts], default=str).encode()).hexdigest()
+
+    def get_or_render(self, parts, render):
+        """
+        Returns the cached output for `parts`, rendering and storing it on a miss.
+
+        Parameters:
+            parts: JSON-serialisable description of everything the output depends on
+                (view name and filter values); the data and code versions are added automatically.
+            render (callable): Zero-argument function building the output.
+
+        Returns:
+            The output, as components on a miss and as their JSON on a hit.
+        """
+        if self.max_entries <= 0:
+            return render()
+        key = self._key(parts)
+        try:
+            value = self._lookup(key)
+        except sqlite3.Error as e:
+            print(f"Error: render cache unavailable: {e}")
+            return render()
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            self.misses += 1
+        # Threads asking for the same render while it runs share its result
+        return self._flights.do(key, lambda: self._render_once(key, render))
+
+    def _lookup(self, key):
+        row = self._connection().execute("SELECT value FROM renders WHERE key = ?;", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _render_once(self, key, render):
+        """Renders and stores `key`, unless another worker holds its lease; then waits for that render."""
+        try:
+            conn = self._connection()
+            now = time.time()
+            conn.execute("DELETE FROM leases WHERE expires < ?;", (now,))
+            leased = conn.execute(
+                "INSERT OR IGNORE INTO leases (key, expires) VALUES (?, ?);", (key, now + self.lease_timeout)
+            ).rowcount == 1
+            if not leased:
+                value = self._wait_for(key)
+                if value is not None:
+                    with self._lock:
+                        self.waited += 1
+                    return value
+        except sqlite3.Error as e:
+            print(f"Error: render cache unavailable: {e}")
+            return render()
+
+        try:
+            value = render()
+            try:
+                self._store(key, plotly.io.json.to_json_plotly(value))
+            except sqlite3.Error as e:
+                print(f"Error: failed to cache render: {e}")
+            return value
+        finally:
+            if leased:
+                try:
+                    self._connection().execute("DELETE FROM leases WHERE key = ?;", (key,))
+                except sqlite3.Error:
+                    pass  # expires on its own
+
+    def _wait_for(self, key):
+        """
+        Polls, backing off from 10 ms to 250 ms, for the output of a render leased by another
+        worker; None if the lease ends without one or nothing is stored within `wait_timeout`.
+        """
+        conn = self._connection()
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.01
+        while True:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+            lease = conn.execute("SELECT expires FROM leases WHERE key = ?;", (key,)).fetchone()
+            if lease is None or lease[0] < time.time():
+                return self._lookup(key)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.25)
+
+    def _store(self, key, value):
+        conn = self._connection()
+        token = store.data_token
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO renders (key, data_token, created, value) VALUES (?, ?, ?, ?);",
+                (key, token, now, value),
+            )
+            # During a rolling reload workers on the old and the new data write side by side.
+            # Only those on the newest data prune the others, so old workers never delete the
+            # new entries; tokens are kept, or a late old worker would pass for the newest.
+            conn.execute("INSERT OR IGNORE INTO tokens (data_token, first_seen) VALUES (?, ?);", (token, now))
+            newest = conn.execute("SELECT data_token FROM tokens ORDER BY first_seen DESC LIMIT 1;").fetchone()[0]
+            if newest == token:
+                conn.execute("DELETE FROM renders WHERE data_token != ?;", (token,))
+            conn.execute(
+                "DELETE FROM renders WHERE key NOT IN (SELECT key FROM renders ORDER BY created DESC LIMIT ?);",
+                (self.max_entries,),
+            )
+            conn.execute("COMMIT;")
+        except BaseException:
+            conn.execute("ROLLBACK;")
+            raise
+
+    def clear(self):
+        self._connection().execute("DELETE FROM renders;")
+        with self._lock:
+            self.hits = self.misses = self.waited = 0
+
+    def stats(self):
+        """
+        Returns:
+            dict: This worker's 'hits', 'misses' and 'hit_rate', the misses served by a render
+            already in flight ('coalesced' in this worker, 'waited' on another worker), plus
+            the 'size' shared by all workers and the code 'version' of its entries.
+        """
+        try:
+            size = self._connection().execute("SELECT COUNT(*) FROM renders;").fetchone()[0]
+        except sqlite3.Error:
+            size = None
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": size,
+                "maxsize": self.max_entries,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "coalesced": self._flights.shared,
+                "waited": self.waited,
+                "version": self.version,
+            }
+
+
+render_cache = RenderCache(
+    config.RENDER_CACHE_PATH, config.RENDER_CACHE_SIZE, lease_timeout=config.RENDER_LEASE_TIMEOUT,
+    wait_timeout=config.RENDER_WAIT_TIMEOUT, version=config.RENDER_CACHE_VERSION,
+)
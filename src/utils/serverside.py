@@ -0,0 +1,230 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+import zlib
+from dash_extensions.enrich import ServersideBackend
+from .cache import LRUCache
+from .. import config
+
+
+class TieredBackend(ServersideBackend):
+    """
+    Storage for `Serverside` outputs: an in-process LRU in front of a bounded on-disk store.
+
+    Values are pickled, zlib-compressed and written to `cache_dir`, which every worker of
+    the host shares; the most recently used values are also kept in memory so a worker
+    does not unpickle the same value on every callback, and are served from there only
+    while their file exists, so a value evicted by any worker is gone for all. Files unused for `ttl` seconds
+    are deleted, and the least recently used ones go first whenever the directory grows
+    past `max_bytes`. Eviction runs on a background thread every `evict_interval` seconds
+    and right away when a write pushes the store over its cap.
+
+    Values handed out from memory are shared between callbacks, so treat them as read-only.
+    """
+
+    suffix = ".pkl.z"
+    tmp_ttl = 10 * 60  # temporary files of writes interrupted by a crash are deleted after this
+
+    def __init__(self, cache_dir="file_system_backend", memory_size=64, max_bytes=512 * 1024 * 1024,
+                 ttl=24 * 3600, evict_interval=300, compress_level=1):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evict_interval = evict_interval
+        self.compress_level = compress_level
+        self.memory = LRUCache(memory_size)
+        self.disk_hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._disk_bytes = None  # last scanned size of the store plus bytes written since
+        self._lock = threading.Lock()
+        self._evictor_pid = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @property
+    def uid(self):
+        return f"{self.__class__.__name__}:{self.cache_dir}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(str(key).encode()).hexdigest() + self.suffix)
+
+    def get(self, key, ignore_expired=False):
+        """
+        Returns the value stored under `key`, or None when it is unknown or was evicted.
+
+        Reading a value refreshes its age, so data of active sessions is not expired.
+        `ignore_expired` is accepted for the transform; expired values are deleted by the
+        evictor rather than hidden on read.
+        """
+        if key is None:
+            return None
+        self.ensure_evictor()
+        path = self._path(key)
+        if os.path.exists(path):
+            value = self.memory.get(key, LRUCache._missing)
+            if value is not LRUCache._missing:
+                self._touch(path)
+                return value
+        else:
+            # Evicted, possibly by another worker: forget the copy in memory as well
+            self.memory.discard(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, EOFError, zlib.error, pickle.UnpicklingError) as e:
+            print(f"Error: unreadable cache file {path}: {e}")
+            with self._lock:
+                self.misses += 1
+            return None
+        self._touch(path)
+        with self._lock:
+            self.disk_hits += 1
+        self.memory.put(key, value)
+        return value
+
+    def set(self, key, value):
+        """Stores `value` under `key` in memory and on disk, replacing any previous value."""
+        self.ensure_evictor()
+        data = zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level)
+        # Write to a temporary file and rename, so other workers never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.memory.put(key, value)
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            over_cap = self._disk_bytes is None or self._disk_bytes > self.max_bytes
+        if over_cap:
+            self.evict()
+        return True
+
+    def has(self, key):
+        return os.path.exists(self._path(key))
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _scan(self):
+        """Returns (mtime, size, path) of every stored value, oldest first."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another worker meanwhile
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        return entries
+
+    def _remove_stale_tmp(self):
+        """Deletes temporary files older than `tmp_ttl`, left behind by writers killed mid-write."""
+        expire_before = time.time() - self.tmp_ttl
+        deleted = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    if entry.stat().st_mtime < expire_before:
+                        os.unlink(entry.path)
+                        deleted += 1
+                except FileNotFoundError:
+                    pass  # renamed into place or removed by another worker meanwhile
+        return deleted
+
+    def evict(self):
+        """
+        Deletes values unused for longer than `ttl`, then the least recently used ones
+        until the store fits in `max_bytes`, along with stale temporary files of
+        interrupted writes. Safe to run from several workers at once.
+
+        Returns:
+            int: Number of files deleted.
+        """
+        deleted = self._remove_stale_tmp()
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        expire_before = time.time() - self.ttl
+        for mtime, size, path in entries:
+            if mtime >= expire_before and total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+            self.evicted += deleted
+        return deleted
+
+    def _evict_loop(self):
+        while True:
+            time.sleep(self.evict_interval)
+            try:
+                self.evict()
+            except Exception as e:
+                print(f"Error: failed to evict {self.cache_dir}: {e}")
+
+    def ensure_evictor(self):
+        """(Re)starts the eviction thread in this process; threads do not survive a gunicorn fork."""
+        if not self.evict_interval or self._evictor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._evictor_pid == os.getpid():
+                return
+            self._evictor_pid = os.getpid()
+        threading.Thread(target=self._evict_loop, daemon=True, name="serverside-evictor").start()
+
+    def stats(self):
+        """
+        Reports hit rate and disk use of this worker's view of the store.
+
+        Returns:
+            dict: 'memory' (LRU stats), 'disk_hits', 'misses', 'hit_rate' over both tiers,
+            'disk_bytes', 'disk_files', 'max_bytes' and 'evicted'.
+        """
+        entries = self._scan()
+        memory = self.memory.stats()
+        with self._lock:
+            hits = memory["hits"] + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory": memory,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "disk_bytes": sum(size for _, size, _ in entries),
+                "disk_files": len(entries),
+                "max_bytes": self.max_bytes,
+                "evicted": self.evicted,
+            }
+
+
+serverside_backend = TieredBackend(
+    cache_dir=config.SERVERSIDE_CACHE_DIR,
+    memory_size=config.SERVERSIDE_MEMORY_SIZE,
+    max_bytes=config.SERVERSIDE_MAX_BYTES,
+    ttl=config.SERVERSIDE_TTL,
+    evict_interval=config.SERVERSIDE_EVICT_INTERVAL,
+)
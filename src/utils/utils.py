@@ -1,11 +1,25 @@
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
 from dash_extensions.javascript import assign
-from dash import html
+from dash import html, no_update
+from ..data.store import store
+from .. import config
+from .cache import LRUCache
+from .render_cache import render_cache
+
+# Results of `filter_data`, keyed on the normalised filters and the data version
+filter_cache = LRUCache(config.FILTER_CACHE_SIZE)
 
 # Geojson rendering logic, must be JavaScript as it is executed in clientside.
 style_handle = assign("""function(feature, context) {
-    const {classes, colorscale, style, colorProp} = context.hideout;  // get props from hideout
-    const value = feature.properties[colorProp];  // get value that determines the color
+    const {classes, colorscale, style, colorProp, values, nameProp} = context.hideout;  // get props from hideout
+    // get value that determines the color: from the {name: value} map sent with each update,
+    // as the boundaries themselves are a static file (GeometryRegistry.url)
+    const value = values ? values[feature.properties[nameProp]] : feature.properties[colorProp];
     
     if (value === null || value === undefined) {
         // If the value is None (null or undefined), set no color (transparent)
@@ -24,6 +38,12 @@ style_handle = assign("""function(feature, context) {
     return style;
 }""")
 
+# "add" handler of the LayerGroup "<GeoJSON id>-tiles" on the tiled maps: hands the map to the
+# vector tile layer of assets/vectortiles.js, which paints the tiles like style_handle.
+tiles_handle = assign("""function(e, context) {
+    vectorTiles.mount(e.target, context);
+}""")
+
 def get_info(series_name=None, indicator=None, indicator_unit=None, feature=None, year=None, is_gis=None):
     year_text = f" in {year}" if year else ""
     if is_gis is not None:
@@ -54,62 +74,105 @@ def get_info(series_name=None, indicator=None, indicator_unit=None, feature=None
                          f"{indicator}: {feature['properties'][indicator]:,.0f} {indicator_unit[0]}", html.Br()]
 
 
-def load_data(file_path="src/data/Datahub_Agri_Latest.xlsx", sheet_name="Database"):
+def info_context(series_name=None, indicator=None, indicator_unit=None, year=None):
+    """
+    Header context of a map's hover panel, passed in the GeoJSON `hideout` under 'info'
+    so assets/info.js can build the same panel as `get_info` in the browser.
     """
-    Reads data from an Excel file into a Pandas DataFrame.
+    def plain(value):
+        return value.item() if isinstance(value, np.generic) else value
 
-    Parameters:
-        file_path (str): The path to the Excel file.
-        sheet_name (str): The name of the sheet to read. Default is 'database'.
+    return dict(series_name=plain(series_name), indicator=plain(indicator), indicator_unit=plain(indicator_unit), year=plain(year))
 
-    Returns:
-        pd.DataFrame: A DataFrame containing the data from the specified Excel sheet.
+
+def first_value(dff, column, default=""):
     """
-    try:
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-        return df
-    except FileNotFoundError:
-        print(f"Error: The file {file_path} was not found.")
-    except ValueError as e:
-        print(f"Error: {e}")
-    except Exception as e:
-        print(f"An unexpected error occurred: {e}")
+    First non-empty value of `column` in `dff`, for titles and captions. `filter_data` drops
+    the columns a selection leaves empty (blank cells are NULL in data.db), so a missing
+    column gives `default` instead of a KeyError.
+    """
+    if column not in dff:
+        return default
+    values = dff[column].dropna()
+    return values.iloc[0] if len(values) else default
 
 
 # Data filter function
-def filter_data(data, sector=None, subsector_1=None, subsector_2=None, province=None, indicator=None, product=None, market=None, series_name=None, grade=None, occupation=None, year=None):
-    # Filter by Sector, Sub-Sector (1), and Sub-Sector (2)
-    filtered_data = data
-    if sector is not None:
-        filtered_data = filtered_data[(filtered_data["Sector"] == sector)]
-    
-    # Filter by Indicator if provided
-    if series_name is not None:
-        filtered_data = filtered_data[filtered_data["Series Name"] == series_name] 
-    
-    if subsector_1 is not None:
-        filtered_data = filtered_data[filtered_data["Sub-Sector (1)"] == subsector_1]
-    
-    if indicator is not None:
-        filtered_data = filtered_data[filtered_data["Indicator"] == indicator]
-    
-    if subsector_2 is not None:
-        filtered_data = filtered_data[filtered_data["Sub-Sector (2)"] == subsector_2]
-    
-    if product is not None:
-        filtered_data = filtered_data[filtered_data["Products"] == product] 
-    
-    if market is not None and market != 'All':
-        filtered_data = filtered_data[filtered_data["Markets"] == market] 
-    
-    if grade is not None and grade != 'All':
-        filtered_data = filtered_data[filtered_data["Grade"] == grade] 
-        
-    if occupation is not None:
-        filtered_data = filtered_data[filtered_data["Occupation"] == occupation] 
-    
-    if year is not None:
-        filtered_data = filtered_data[filtered_data["Year"] == year] 
+def filter_data(data, sector=None, subsector_1=None, subsector_2=None, province=None, indicator=None, product=None, market=None, series_name=None, grade=None, occupation=None, year=None, engine=None):
+    """
+    Rows of a table matching the given filters, without the columns they leave empty.
+
+    `data` is a table name or a frame. A table name is read through the store: with the
+    "sql" engine (FILTER_ENGINE) the filters run in SQLite and the table is never
+    loaded; with "memory" the shared frame of `store.get` is filtered.
+    """
+    criteria = [
+        ("Sector", sector),
+        ("Series Name", series_name),
+        ("Sub-Sector (1)", subsector_1),
+        ("Indicator", indicator),
+        ("Sub-Sector (2)", subsector_2),
+        ("Products", product),
+        ("Markets", market if market != 'All' else None),
+        ("Grade", grade if grade != 'All' else None),
+        ("Occupation", occupation),
+        ("Year", year),
+    ]
+    criteria = [(column, value) for column, value in criteria if value is not None]
+    engine = engine or config.FILTER_ENGINE
+
+    # Only tables of the store can be cached: their name and the data version identify
+    # the contents. Any other frame is filtered directly.
+    table = data if isinstance(data, str) else store.table_of(data)
+    if table is None:
+        return _filter(data, criteria, province, engine)
+
+    # Dropdowns send years as strings while integer Year columns hold ints; key both alike
+    key = (
+        table, store.version, engine, province,
+        tuple((column, str(value) if column == "Year" else value) for column, value in criteria),
+    )
+    filtered_data = filter_cache.get(key)
+    if filtered_data is None:
+        filtered_data = _filter(data, criteria, province, engine, table)
+        filter_cache.put(key, filtered_data)
+    # Shallow copy: with copy-on-write, changes made by the caller never reach the cached frame
+    return filtered_data.copy(deep=False)
+
+
+def _filter(data, criteria, province, engine, table=None):
+    if engine == "sql" and table is not None:
+        # Push every filter, Province included, down to SQLite. Columns are kept when they
+        # hold a value before the Province filter, as in the in-memory path below.
+        filled = store.filled_columns(table, criteria)
+        if province is not None and province != 'All':
+            criteria = criteria + [("Province", province)]
+        filtered_data = store.query(table, criteria)
+        return filtered_data[[col for col in filtered_data.columns if col in filled]]
+
+    if isinstance(data, str):
+        data = store.get(data)
+    index = store.index_for(data)
+    if index is not None:
+        # Intersect the precomputed row positions, smallest first, and take the rows once
+        positions = sorted((index.positions(column, value) for column, value in criteria), key=len)
+        if positions:
+            rows = positions[0]
+            for other in positions[1:]:
+                rows = np.intersect1d(rows, other, assume_unique=True)
+            filtered_data = data.take(rows)
+        else:
+            filtered_data = data
+    else:
+        filtered_data = data
+        for column, value in criteria:
+            # Year is stored as an integer where possible, while dropdowns send strings
+            if column == "Year" and pd.api.types.is_integer_dtype(filtered_data["Year"]) and isinstance(value, str):
+                try:
+                    value = int(value)
+                except ValueError:
+                    pass  # matches no row, as in FacetIndex.positions
+            filtered_data = filtered_data[filtered_data[column] == value]
 
     # Drop columns that are entirely NaN
     filtered_data = filtered_data.dropna(axis=1, how='all')
@@ -121,4 +184,129 @@ def filter_data(data, sector=None, subsector_1=None, subsector_2=None, province=
         filtered_data = filtered_data[filtered_data["Province"] == province]
     
 
-    return filtered_data
\ No newline at end of file
+    return filtered_data
+
+
+# Per report: 'updates' (update_report calls) and 'panels' (panels built in this worker),
+# to compare against the filter changes counted in the browser (assets/settle.js)
+report_renders = defaultdict(Counter)
+
+# Per report and tab: 'count', 'total' and 'max' seconds spent building the panel
+render_timings = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+
+# Both are updated by the request threads and the render pool
+_counters_lock = threading.Lock()
+
+# Builds the tabs that are not on screen once the visible one has been sent; created on the
+# first such render, so with RENDER_THREADS = 0 (the default) no thread is started
+render_pool = None
+
+# Background renders of each report's latest filter state, cancelled when the filters change again
+_prerenders = defaultdict(list)
+_prerenders_lock = threading.Lock()
+
+
+def render_stats():
+    """Copies of `report_renders` and `render_timings`, for /api/cache-stats."""
+    with _counters_lock:
+        return dict(
+            reports={report: dict(counts) for report, counts in report_renders.items()},
+            render_timings={key: dict(timing) for key, timing in render_timings.items()},
+        )
+
+
+def _timed(cache_key, tab, render):
+    """Wraps a panel renderer so each build is counted in `report_renders` and `render_timings`."""
+    def run():
+        start = time.perf_counter()
+        try:
+            return render()
+        finally:
+            elapsed = time.perf_counter() - start
+            with _counters_lock:
+                report_renders[cache_key]["panels"] += 1
+                timing = render_timings[f"{cache_key}/{tab}"]
+                timing["count"] += 1
+                timing["total"] += elapsed
+                timing["max"] = max(timing["max"], elapsed)
+    return run
+
+
+def _log_failure(future):
+    if not future.cancelled() and future.exception() is not None:
+        print(f"Error: background render failed: {future.exception()}")
+
+
+def _prerender(cache_key, renderers, active_tab, filters):
+    """
+    Queues the tabs other than `active_tab` on `render_pool` (RENDER_THREADS threads, started
+    by the first call), after cancelling the renders still queued for an older filter state
+    of the report. Tabs are skipped once RENDER_QUEUE_SIZE renders are waiting in this worker.
+    """
+    global render_pool
+    with _prerenders_lock:
+        if render_pool is None:
+            render_pool = ThreadPoolExecutor(max_workers=config.RENDER_THREADS, thread_name_prefix="render")
+        for future in _prerenders[cache_key]:
+            future.cancel()  # no effect once the render has started
+        queued = sum(not future.done() for futures in _prerenders.values() for future in futures)
+        _prerenders[cache_key] = []
+        for tab, render in renderers.items():
+            if tab == active_tab or queued >= config.RENDER_QUEUE_SIZE:
+                continue
+            future = render_pool.submit(render_cache.get_or_render, [cache_key, tab, filters], render)
+            future.add_done_callback(_log_failure)
+            _prerenders[cache_key].append(future)
+            queued += 1
+
+# Tab-aware report rendering
+def render_tabs(renderers, active_tab, filters, rendered, cache_key=None):
+    """
+    Builds only the visible panel of a report's Tabs.
+
+    Panels rendered for the current filters stay on the client and are not sent
+    again; the others are built the first time their tab is opened. When the
+    filters change, panels of other tabs are cleared so stale content never shows.
+
+    Parameters:
+        renderers (dict): Tab value -> zero-argument function returning the panel, in output order.
+        active_tab (str): The value of the Tabs component.
+        filters (list): The filter values the panels were built from.
+        rendered (dict): Contents of the page's 'rendered tabs' Store, or None.
+        cache_key (str): Name of the report; when set, panels are shared between workers
+            through `render_cache`, keyed on this name, the tab and the filters, and
+            counted in `report_renders` and `render_timings`. With RENDER_THREADS set,
+            the other tabs are then built into the cache on `render_pool` when the
+            filters change, so opening them later does not wait for a render.
+
+    Returns:
+        tuple: (panels in the order of `renderers`, new Store contents, whether the filters changed).
+    """
+    filters = list(filters)
+    if cache_key is not None:
+        with _counters_lock:
+            report_renders[cache_key]["updates"] += 1
+    changed = not rendered or rendered.get("filters") != filters
+    done = [] if changed else list(rendered.get("tabs", []))
+
+    if cache_key is not None:
+        renderers = {tab: _timed(cache_key, tab, render) for tab, render in renderers.items()}
+
+    panels = []
+    for tab, render in renderers.items():
+        if tab == active_tab and tab not in done:
+            if cache_key is not None:
+                panels.append(render_cache.get_or_render([cache_key, tab, filters], render))
+            else:
+                panels.append(render())
+            done.append(tab)
+        elif changed:
+            panels.append(None)
+        else:
+            panels.append(no_update)
+
+    # Queued only now: the renders are CPU-bound, so running them next to the visible
+    # panel would only slow it down under the GIL
+    if cache_key is not None and changed and config.RENDER_THREADS > 0 and render_cache.max_entries > 0:
+        _prerender(cache_key, renderers, active_tab, filters)
+    return panels, {"filters": filters, "tabs": done}, changed
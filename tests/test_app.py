@@ -0,0 +1,17 @@
+import pytest
+from src import config
+from app import server
+
+
+@pytest.mark.parametrize("path", ["/api/cache-stats", "/api/geometry/unmatched"])
+def test_diagnostics_off_by_default(path, monkeypatch):
+    client = server.test_client()
+    assert client.get(path).status_code == 404
+    monkeypatch.setattr(config, "DIAGNOSTICS", True)
+    response = client.get(path)
+    assert response.status_code == 200 and isinstance(response.json, dict)
+
+
+def test_boundaries_still_served():
+    # /api/geometry/<name>.json sits next to the diagnostics route
+    assert server.test_client().get("/api/geometry/adm1.json").status_code == 200
@@ -0,0 +1,114 @@
+import threading
+import time
+import pytest
+from src.utils.cache import LRUCache, SingleFlight
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+    assert "b" not in cache and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.get("b", "gone") == "gone"
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2, "maxsize": 2, "hit_rate": 0.75}
+
+
+def test_lru_put_refreshes_and_discard():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 10)
+    cache.put("c", 3)
+    assert cache.get("a") == 10 and "b" not in cache
+    cache.discard("a")
+    cache.discard("missing")
+    assert len(cache) == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.stats()["hits"] == 0
+
+
+def test_lru_disabled():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None and len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_threads():
+    cache = LRUCache(50)
+
+    def work(offset):
+        for i in range(2000):
+            cache.put((offset + i) % 80, i)
+            cache.get(i % 80)
+
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.stats()
+    assert stats["size"] == 50 and stats["hits"] + stats["misses"] == 16000
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    calls, started, release = [], threading.Event(), threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return object()
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.shared < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1 and len(results) == 5 and all(result is results[0] for result in results)
+    # Nothing is kept once the call has returned
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_single_flight_shares_errors_and_keys_apart():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError("render failed")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    while flight.shared < 1:
+        time.sleep(0.001)
+    # Another key is not held up by the running call
+    assert flight.do("other", lambda: 1) == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(errors) == 2 and errors[0] is errors[1]
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
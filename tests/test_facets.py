@@ -0,0 +1,86 @@
+import itertools
+import numpy as np
+import pandas as pd
+import pytest
+from src.data.facets import FacetTree
+from src.data.store import FacetIndex, store
+
+FRAME = pd.DataFrame({
+    "Series Name": ["Rice", "Rice", "Rice", "Maize", "Maize", "Rice", "Cashew"],
+    "Province": ["Kandal", "Takeo", "Kandal", "Kandal", None, "Takeo", "Kratie"],
+    "Indicator": ["Yield", "Yield", "Area", "Yield", "Yield", "Area", None],
+    "Year": [2022, 2022, 2023, 2023, 2021, 2021, 2023],
+})
+LEVELS = ("Series Name", "Province", "Indicator", "Year")
+
+
+def mask_filter(frame, criteria):
+    for column, value in criteria:
+        frame = frame[frame[column] == value]
+    return frame
+
+
+def selections():
+    """Every combination of a value (or no filter) per level, plus values that never occur."""
+    choices = [[None, "Missing"] + FRAME[col].dropna().unique().tolist() for col in LEVELS]
+    for values in itertools.product(*choices):
+        yield [(col, value) for col, value in zip(LEVELS, values) if value is not None]
+
+
+def test_index_positions_match_masks():
+    index = FacetIndex(FRAME, columns=LEVELS)
+    for criteria in selections():
+        criteria = [(col, 0 if col == "Year" and value == "Missing" else value) for col, value in criteria]
+        rows = np.arange(len(FRAME))
+        for column, value in criteria:
+            rows = np.intersect1d(rows, index.positions(column, value), assume_unique=True)
+        assert rows.tolist() == mask_filter(FRAME, criteria).index.tolist()
+
+
+def test_index_year_strings():
+    index = FacetIndex(FRAME, columns=LEVELS)
+    assert index.positions("Year", "2023").tolist() == [2, 3, 6]
+    # Dropdowns can send anything; a non-numeric year matches no row instead of raising
+    for value in ("All", "2023-2024", ""):
+        assert index.positions("Year", value).tolist() == []
+    with pytest.raises(KeyError):
+        index.positions("Grade", "Grade 6")
+
+
+def test_tree_options_match_masks():
+    tree = FacetTree(FRAME, LEVELS)
+    for criteria in selections():
+        selection = dict(criteria)
+        for depth, column in enumerate(LEVELS):
+            above = [(col, value) for col, value in criteria if LEVELS.index(col) < depth]
+            expected = mask_filter(FRAME, above)[column].dropna().unique().tolist()
+            assert tree.options(column, selection) == expected, (column, selection)
+
+
+def test_tree_all_and_string_years():
+    tree = FacetTree(FRAME, LEVELS)
+    assert tree.options("Province", {"Series Name": "All"}) == ["Kandal", "Takeo", "Kratie"]
+    assert tree.options("Indicator", {"Year": "2023"}) == ["Yield", "Area"]  # Year is below Indicator
+    assert tree.options("Year", {"Series Name": "Rice", "Province": "Takeo"}) == [2022, 2021]
+    assert tree.options("Grade") == []
+
+
+def test_tree_cascade():
+    tree = FacetTree(FRAME, LEVELS)
+    resolved = tree.cascade({"Series Name": "Rice", "Province": "Takeo", "Indicator": "Missing"})
+    assert resolved["Province"] == {"options": ["Kandal", "Takeo"], "value": "Takeo"}
+    # An unavailable value falls back to the first option, the year to the latest
+    assert resolved["Indicator"] == {"options": ["Yield", "Area"], "value": "Yield"}
+    assert resolved["Year"] == {"options": [2022], "value": 2022}
+    assert tree.cascade({"Series Name": "Maize", "Province": "All"})["Year"]["value"] == 2023
+
+
+def test_tree_matches_table():
+    data = store.get("agriculture_data")
+    tree = store.facets("agriculture_data")
+    for series in tree.options("Series Name")[:10]:
+        rows = data[data["Series Name"] == series]
+        assert tree.options("Province", {"Series Name": series}) == rows["Province"].dropna().unique().tolist()
+        for province in tree.options("Province", {"Series Name": series})[:3]:
+            expected = rows[rows["Province"] == province]["Indicator"].dropna().unique().tolist()
+            assert tree.options("Indicator", {"Series Name": series, "Province": province}) == expected
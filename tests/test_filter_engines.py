@@ -0,0 +1,75 @@
+import random
+import pandas as pd
+import pytest
+from src.data.facets import FACET_LEVELS
+from src.data.store import DatasetStore
+from src.utils import utils
+from src.utils.cache import LRUCache
+from src.utils.utils import filter_data
+
+# filter_data keyword of each facet level below 'Series Name'
+ARGUMENTS = {
+    "Sub-Sector (1)": "subsector_1", "Sub-Sector (2)": "subsector_2", "Grade": "grade", "Province": "province",
+    "Products": "product", "Markets": "market", "Indicator": "indicator", "Year": "year",
+}
+
+
+@pytest.fixture
+def fresh_store(monkeypatch):
+    """A store of data.db with nothing loaded, behind filter_data and an empty filter cache."""
+    store = DatasetStore()
+    monkeypatch.setattr(utils, "store", store)
+    monkeypatch.setattr(utils, "filter_cache", LRUCache(256))
+    return store
+
+
+def selections(store, table, per_series=4, seed=1):
+    """filter_data arguments of random dropdown cascades, as the pages send them."""
+    rng = random.Random(seed)
+    tree = store.facets(table)
+    for series in tree.options("Series Name"):
+        for _ in range(per_series):
+            selection, arguments = {"Series Name": series}, {"series_name": series}
+            for level in tree.levels[1:]:
+                options = tree.cascade(selection)[level]["options"]
+                if options and rng.random() < 0.5:
+                    value = rng.choice(options + (["All"] if level in ("Province", "Markets", "Grade") else []))
+                    selection[level] = value
+                    # Dropdowns send years as strings
+                    arguments[ARGUMENTS[level]] = str(value) if level == "Year" else value
+            yield arguments
+
+
+@pytest.mark.parametrize("table", list(FACET_LEVELS))
+def test_sql_engine_matches_memory(fresh_store, table):
+    cases = list(selections(fresh_store, table))
+    sql = [filter_data(table, engine="sql", **arguments) for arguments in cases]
+    # The "sql" engine answers from SQLite without loading the table
+    assert fresh_store._snapshot.frames == {}
+
+    for arguments, result in zip(cases, sql):
+        memory = filter_data(table, engine="memory", **arguments)
+        pd.testing.assert_frame_equal(result, memory, obj=str(arguments))
+
+
+def test_no_match(fresh_store):
+    for engine in ("sql", "memory"):
+        assert filter_data("agriculture_data", series_name="Rice Production", year="abc", engine=engine).empty
+        assert filter_data("agriculture_data", series_name="Not a series", engine=engine).empty
+
+
+def test_select_and_distinct_match_memory(fresh_store):
+    tables = ("education_data", "agriculture_data")
+    tags = pd.concat([fresh_store.distinct(table, ["Tag"])["Tag"].astype(object) for table in tables]).unique()
+    distinct = {table: fresh_store.distinct(table, ["Series Name", "Indicator"]) for table in tables}
+    selected = {tag: fresh_store.select(tables, [("Tag", tag)]) for tag in tags[:20]}
+    assert fresh_store._snapshot.frames == {}
+
+    for table in tables:
+        frame = fresh_store.get(table)
+        expected = frame[["Series Name", "Indicator"]].drop_duplicates()
+        pd.testing.assert_frame_equal(distinct[table], expected, check_dtype=False, check_categorical=False)
+    combined = pd.concat([fresh_store.get(table) for table in tables], ignore_index=True)
+    for tag, result in selected.items():
+        assert len(result) == (combined["Tag"] == tag).sum() > 0
+        assert result["Tag"].astype(object).eq(tag).all()
@@ -0,0 +1,73 @@
+import json
+import pandas as pd
+import pytest
+from src.data.geometry import GeometryRegistry, normalise_names
+from src.data.store import store
+
+
+def square(x, y):
+    return {"type": "Polygon", "coordinates": [[[x, y], [x + 1, y], [x + 1, y + 1], [x, y + 1], [x, y]]]}
+
+
+NAMES = ["Siem Reap", "United States of America", "Viet Nam", "Côte d'Ivoire", "Republic of the Congo", "South Korea"]
+
+
+@pytest.fixture
+def registry(tmp_path):
+    path = tmp_path / "places.json"
+    features = [
+        {"type": "Feature", "properties": {"name": name}, "geometry": square(i, i)}
+        for i, name in enumerate(NAMES)
+    ]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    return GeometryRegistry(files={"places": str(path)}, name_properties={"places": "name"}, tile_dir=str(tmp_path))
+
+
+def test_normalise_names():
+    names = pd.Series(["Siem Reap", "Siemreap", "SIEM-REAP ", "Cote d'Ivoire", "Côte d’Ivoire", "USA", "Korea, Republic of"])
+    assert normalise_names(names).tolist() == [
+        "siemreap", "siemreap", "siemreap", "cotedivoire", "cotedivoire", "unitedstatesofamerica", "southkorea",
+    ]
+
+
+def test_join_spellings_and_aliases(registry):
+    frame = pd.DataFrame({
+        "Markets": ["Siemreap", "USA", "Vietnam", "Cote d'Ivoire", "Korea, Republic of", "United States"],
+        "Indicator Value": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+    values, unmatched = registry.join("places", frame, "Markets")
+    # One value per feature, from its first row ("USA" before "United States")
+    assert values == {
+        "Siem Reap": 1.0, "United States of America": 2.0, "Viet Nam": 3.0, "Côte d'Ivoire": 4.0, "South Korea": 5.0,
+    }
+    assert unmatched == [] and registry.unmatched == {}
+
+
+def test_join_unmatched(registry):
+    frame = pd.DataFrame({
+        "Markets": ["Congo", "Atlantis", None, "Viet Nam", "Atlantis"],
+        "Indicator Value": [1.0, 2.0, 3.0, None, 5.0],
+    })
+    values, unmatched = registry.join("places", frame, "Markets")
+    # "Congo" is ambiguous between two countries and has no alias; rows without a name are skipped
+    assert unmatched == ["Atlantis", "Congo"]
+    assert list(values) == ["Viet Nam"] and pd.isna(values["Viet Nam"])
+    registry.join("places", frame.assign(Markets=["Lemuria"] * 5), "Markets")
+    assert registry.unmatched == {"places": {"Atlantis", "Congo", "Lemuria"}}
+
+
+def test_join_other_value_column(registry):
+    frame = pd.DataFrame({"Markets": ["Siem Reap"], "Share": [0.5]})
+    assert registry.join("places", frame, "Markets", value_column="Share") == ({"Siem Reap": 0.5}, [])
+
+
+# Every province of the data is drawn; what is left are totals and areas that are no
+# province, and "Meanchey", which may be Banteay or Oddar Meanchey
+@pytest.mark.parametrize("table, unmatched", [
+    ("agriculture_data", ["Total"]),
+    ("education_data", ["Cambodia", "Meanchey", "Rural Area", "Urban Area"]),
+])
+def test_provinces_of_the_data(table, unmatched):
+    frame = store.get(table)
+    values, names = GeometryRegistry().join("adm1", frame[frame["Province"].notna()], "Province")
+    assert names == unmatched and len(values) >= 20
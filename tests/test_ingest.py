@@ -0,0 +1,53 @@
+import sqlite3
+import pytest
+from openpyxl import Workbook
+from src.etl.ingest import ingest_workbook, last_import, read_table
+
+
+def write_workbook(path, rows):
+    """Sheet 'Database' with a header and `rows` at their row numbers; unlisted rows stay blank."""
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Database"
+    sheet.append(["Series Name", "Year", "Indicator Value"])
+    for row_number, values in rows.items():
+        for column, value in enumerate(values, start=1):
+            sheet.cell(row=row_number, column=column, value=value)
+    workbook.save(path)
+
+
+@pytest.mark.parametrize("rows", [
+    # A blank gap longer than the chunk size between two blocks of data
+    {2: ("Rice", 2020, 1.0), 3: ("Rice", 2021, 2.0), 12: ("Maize", 2020, 3.0), 13: ("Maize", 2021, 4.0)},
+    # The whole first chunk blank
+    {9: ("Rice", 2020, 1.0), 10: ("Rice", 2021, 2.0)},
+])
+def test_blank_rows_do_not_end_the_import(tmp_path, rows):
+    path, db = tmp_path / "book.xlsx", str(tmp_path / "staging.db")
+    write_workbook(path, rows)
+
+    assert ingest_workbook(str(path), "data", db_path=db, chunk_size=3)
+    table = read_table("data", db)
+    assert table.values.tolist() == [list(values) for values in rows.values()]
+    assert last_import("data", db)["rows"] == len(rows)
+
+
+def test_header_only_sheet_keeps_the_schema(tmp_path):
+    path, db = tmp_path / "book.xlsx", str(tmp_path / "staging.db")
+    write_workbook(path, {})
+
+    assert ingest_workbook(str(path), "data", db_path=db, chunk_size=3)
+    assert read_table("data", db).columns.tolist() == ["Series Name", "Year", "Indicator Value"]
+    assert last_import("data", db)["rows"] == 0
+
+
+def test_unchanged_workbook_is_skipped(tmp_path):
+    path, db = tmp_path / "book.xlsx", str(tmp_path / "staging.db")
+    write_workbook(path, {2: ("Rice", 2020, 1.0)})
+
+    assert ingest_workbook(str(path), "data", db_path=db)
+    assert not ingest_workbook(str(path), "data", db_path=db)
+    assert ingest_workbook(str(path), "data", db_path=db, force=True)
+    conn = sqlite3.connect(db)
+    assert conn.execute('SELECT COUNT(*) FROM "data";').fetchone()[0] == 1
+    conn.close()
@@ -0,0 +1,85 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from src.etl.normalise import normalise_database, normalise_frame
+
+
+def test_strings_stripped_and_blanks_missing():
+    frame = normalise_frame(pd.DataFrame({
+        "Series Name": [" Rice Production ", "Rice Production", "  "],
+        "Province": ["Kandal\n", "", None],
+        "Indicator Value": [1.0, 2.0, 3.0],
+    }))
+    assert frame["Series Name"].tolist()[:2] == ["Rice Production", "Rice Production"]
+    assert pd.isna(frame["Series Name"].iloc[2])
+    assert frame["Province"].iloc[0] == "Kandal" and frame["Province"].iloc[1:].isna().all()
+
+
+def test_misspelt_coordinates():
+    frame = normalise_frame(pd.DataFrame({
+        "Latiude": ["11.5", "12.1"],
+        "Latitude": [None, "13.0"],
+        "Longtitude": ["104.9", "x"],
+    }))
+    assert frame.columns.tolist() == ["Latitude", "Longitude"]
+    # The correct spelling wins where both hold a value
+    assert frame["Latitude"].tolist() == [11.5, 13.0]
+    assert frame["Longitude"].iloc[0] == 104.9 and pd.isna(frame["Longitude"].iloc[1])
+
+
+def test_years_and_dates():
+    # Dates of the workbooks reach data.db as timestamps
+    frame = normalise_frame(pd.DataFrame({
+        "Year": ["2020", " 2021", None], "Date": ["2020-03-01 00:00:00", "2021-01-04 00:00:00", "soon"],
+    }))
+    assert str(frame["Year"].dtype) == "Int64" and frame["Year"].tolist()[:2] == [2020, 2021]
+    assert frame["Date"].tolist()[:2] == ["2020-03-01", "2021-01-04"] and pd.isna(frame["Date"].iloc[2])
+
+    # Academic years are no integers and stay text
+    academic = normalise_frame(pd.DataFrame({"Year": ["2012-2013", "2020"]}))
+    assert academic["Year"].tolist() == ["2012-2013", "2020"]
+
+
+def test_empty_columns_dropped():
+    frame = normalise_frame(pd.DataFrame({"Source": ["", None], "Indicator Value": [1.0, np.nan]}))
+    assert frame.columns.tolist() == ["Indicator Value"]
+
+
+def write_table(path, table, frame):
+    conn = sqlite3.connect(path)
+    frame.to_sql(table, conn, index=False, if_exists="replace")
+    conn.close()
+
+
+def read(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_database(tmp_path):
+    source, staging = str(tmp_path / "data.db"), str(tmp_path / "staging.db")
+    write_table(source, "agriculture_data", pd.DataFrame({"Series Name": [" Rice "], "Year": ["2020"], "Source": [""]}))
+    write_table(source, "economic_data", pd.DataFrame({"Series Name": ["Export"], "Markets": [" Japan"]}))
+    write_table(source, "notes", pd.DataFrame({"text": [" kept as is "]}))
+    write_table(staging, "agriculture_data", pd.DataFrame({"Series Name": ["Maize", "Rice"], "Year": [2021, 2022]}))
+
+    report = normalise_database(source, tables=("agriculture_data", "economic_data"), staging=staging)
+    assert report == {"agriculture_data": (2, 2), "economic_data": (1, 2)}
+    # The staged sheet replaces the table; the other one is cleaned where it is
+    assert read(source, 'SELECT "Series Name", "Year" FROM agriculture_data;') == [("Maize", 2021), ("Rice", 2022)]
+    assert read(source, 'SELECT "Markets" FROM economic_data;') == [("Japan",)]
+    assert read(source, "SELECT text FROM notes;") == [(" kept as is ",)]
+    indexes = {row[0] for row in read(source, "SELECT name FROM sqlite_master WHERE type = 'index';")}
+    assert {"idx_agriculture_data_filters", "idx_economic_data_filters"} <= indexes
+    assert not (tmp_path / "data.db.tmp").exists()
+
+
+def test_database_to_other_target(tmp_path):
+    source, target = str(tmp_path / "data.db"), str(tmp_path / "clean.db")
+    write_table(source, "economic_data", pd.DataFrame({"Series Name": [" Export "]}))
+    normalise_database(source, target, tables=("economic_data",))
+    assert read(source, 'SELECT "Series Name" FROM economic_data;') == [(" Export ",)]
+    assert read(target, 'SELECT "Series Name" FROM economic_data;') == [("Export",)]
@@ -0,0 +1,28 @@
+import pytest
+from src.data.store import store
+from src.utils.utils import filter_data
+from src.pages import agriculture_and_rural_development as agriculture
+from src.pages import education
+
+
+# Blank cells are NULL in data.db, so filter_data drops the columns these selections
+# leave empty ('Source' for Cashew nut, 'Sub-Sector (1)' for Successful Student)
+@pytest.mark.parametrize("indicator", ["Cultivated land", None])
+def test_agriculture_graph_without_source(indicator):
+    dff = filter_data(store.get("agriculture_data"), series_name="Cashew nut Production", indicator=indicator)
+    assert not dff.empty and "Source" not in dff
+    agriculture.create_graph(dff)
+    agriculture.create_dataview(dff)
+
+
+@pytest.mark.parametrize("grade", [None, "Grade 6"])
+def test_education_graph_without_subsector(grade):
+    dff = filter_data(
+        store.get("education_data"), series_name="Successful Student", indicator="Successful Candidates",
+        grade=grade, province="Banteay Meanchey",
+    )
+    assert not dff.empty and "Sub-Sector (1)" not in dff
+    year = dff["Year"].iloc[-1]
+    education.create_graph(dff, year)
+    education.create_map(dff, year)
+    education.create_dataview(dff)
@@ -0,0 +1,145 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from src.utils import render_cache as module
+from src.utils.render_cache import RenderCache, code_version
+
+
+@pytest.fixture
+def data(monkeypatch):
+    """The store as the render cache sees it: only its data token matters."""
+    current = SimpleNamespace(data_token="v1")
+    monkeypatch.setattr(module, "store", current)
+    return current
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "renders.db")
+
+
+def renderer(value, calls):
+    def render():
+        calls.append(value)
+        return {"panel": value}
+    return render
+
+
+def worker(db_path, **kwargs):
+    """A RenderCache as one worker of the host holds it; workers share `db_path`."""
+    kwargs.setdefault("version", "code-1")
+    return RenderCache(db_path, **kwargs)
+
+
+def test_miss_then_hit(data, db_path):
+    cache, calls = worker(db_path), []
+    assert cache.get_or_render(["report", "graph", [1]], renderer("a", calls)) == {"panel": "a"}
+    assert cache.get_or_render(["report", "graph", [1]], renderer("b", calls)) == {"panel": "a"}
+    # Another worker reads the same entry
+    assert worker(db_path).get_or_render(["report", "graph", [1]], renderer("c", calls)) == {"panel": "a"}
+    assert calls == ["a"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"], stats["version"]) == (1, 1, 1, "code-1")
+
+
+def test_key_includes_data_and_code(data, db_path):
+    calls = []
+    worker(db_path).get_or_render(["report"], renderer("a", calls))
+    worker(db_path, version="code-2").get_or_render(["report"], renderer("b", calls))
+    data.data_token = "v2"
+    worker(db_path).get_or_render(["report"], renderer("c", calls))
+    assert calls == ["a", "b", "c"]
+    assert len(code_version()) == 16 and code_version() == code_version()
+
+
+def test_disabled_and_bounded(data, db_path):
+    calls = []
+    disabled = worker(db_path, max_entries=0)
+    disabled.get_or_render(["report"], renderer("a", calls))
+    disabled.get_or_render(["report"], renderer("a", calls))
+    assert calls == ["a", "a"]
+
+    cache = worker(db_path, max_entries=2)
+    for tab in ("graph", "map", "dataview"):
+        cache.get_or_render(["report", tab], renderer(tab, calls))
+        time.sleep(0.01)  # distinct creation times
+    assert cache.stats()["size"] == 2
+    cache.get_or_render(["report", "graph"], renderer("graph again", calls))  # the oldest went first
+    assert calls[-1] == "graph again"
+
+
+def test_newest_data_prunes_older_entries(data, db_path):
+    old, new, calls = worker(db_path), worker(db_path), []
+    old.get_or_render(["report", "graph"], renderer("old", calls))
+    time.sleep(0.01)
+    data.data_token = "v2"
+    new.get_or_render(["report", "graph"], renderer("new", calls))
+    assert new.stats()["size"] == 1
+
+    # A worker still on the old data during a rolling reload does not prune the new entries
+    data.data_token = "v1"
+    old.get_or_render(["report", "map"], renderer("late", calls))
+    assert old.stats()["size"] == 2
+    data.data_token = "v2"
+    assert new.get_or_render(["report", "graph"], renderer("again", calls)) == {"panel": "new"}
+
+
+def test_threads_coalesce(data, db_path):
+    cache, calls, results = worker(db_path), [], []
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"panel": "slow"}
+
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render(["report"], slow))) for _ in range(3)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    while cache.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and results == [{"panel": "slow"}] * 3
+
+
+def hold_lease(cache, parts, expires_in):
+    cache._connection().execute(
+        "INSERT INTO leases (key, expires) VALUES (?, ?);", (cache._key(parts), time.time() + expires_in)
+    )
+
+
+def test_waits_for_another_workers_render(data, db_path):
+    leader, follower, calls = worker(db_path), worker(db_path, wait_timeout=5), []
+    hold_lease(leader, ["report"], 30)
+
+    def finish():
+        time.sleep(0.1)
+        leader._store(leader._key(["report"]), '{"panel": "leader"}')
+
+    thread = threading.Thread(target=finish)
+    thread.start()
+    assert follower.get_or_render(["report"], renderer("follower", calls)) == {"panel": "leader"}
+    thread.join()
+    assert calls == [] and follower.stats()["waited"] == 1
+
+
+def test_wait_gives_up_after_timeout(data, db_path):
+    leader, follower, calls = worker(db_path), worker(db_path, wait_timeout=0.2), []
+    hold_lease(leader, ["report"], 30)
+    start = time.monotonic()
+    assert follower.get_or_render(["report"], renderer("follower", calls)) == {"panel": "follower"}
+    assert 0.2 <= time.monotonic() - start < 2 and calls == ["follower"]
+
+
+def test_expired_lease_ignored(data, db_path):
+    leader, follower, calls = worker(db_path), worker(db_path, wait_timeout=5), []
+    hold_lease(leader, ["report"], -1)  # its worker died mid-render
+    start = time.monotonic()
+    assert follower.get_or_render(["report"], renderer("follower", calls)) == {"panel": "follower"}
+    assert time.monotonic() - start < 1 and follower.stats()["waited"] == 0
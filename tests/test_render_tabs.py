@@ -0,0 +1,55 @@
+import threading
+from types import SimpleNamespace
+import pytest
+from dash import no_update
+from src import config
+from src.utils import utils
+from src.utils.utils import render_tabs, render_stats
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """A render cache that builds every panel, and the tabs built, in order."""
+    built = []
+    monkeypatch.setattr(utils, "render_cache", SimpleNamespace(max_entries=10, get_or_render=lambda key, render: render()))
+    monkeypatch.setattr(utils, "render_pool", None)
+    yield built
+    if utils.render_pool is not None:
+        utils.render_pool.shutdown(wait=True)
+
+
+def renderers(built):
+    return {tab: (lambda tab=tab: built.append(tab) or tab) for tab in ("graph", "map", "dataview")}
+
+
+def test_visible_tab_only(renders, monkeypatch):
+    monkeypatch.setattr(config, "RENDER_THREADS", 0)
+    panels, rendered, changed = render_tabs(renderers(renders), "map", ["Rice"], None, cache_key="test-visible")
+    assert panels == [None, "map", None] and changed and rendered == {"filters": ["Rice"], "tabs": ["map"]}
+
+    panels, rendered, changed = render_tabs(renderers(renders), "graph", ["Rice"], rendered, cache_key="test-visible")
+    assert panels == ["graph", no_update, no_update] and not changed and rendered["tabs"] == ["map", "graph"]
+    # No background renders, and no thread started for them
+    assert renders == ["map", "graph"] and utils.render_pool is None
+    assert render_stats()["reports"]["test-visible"] == {"updates": 2, "panels": 2}
+
+
+def test_other_tabs_prefetched(renders, monkeypatch):
+    monkeypatch.setattr(config, "RENDER_THREADS", 2)
+    render_tabs(renderers(renders), "map", ["Rice"], None, cache_key="test-prefetch")
+    assert utils.render_pool is not None
+    utils.render_pool.shutdown(wait=True)
+    assert renders[0] == "map" and sorted(renders) == ["dataview", "graph", "map"]
+    assert render_stats()["render_timings"]["test-prefetch/graph"]["count"] == 1
+
+
+def test_counters_across_threads():
+    render = utils._timed("test-threads", "graph", lambda: None)
+    threads = [threading.Thread(target=lambda: [render() for _ in range(500)]) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = render_stats()
+    assert stats["reports"]["test-threads"]["panels"] == 4000
+    assert stats["render_timings"]["test-threads/graph"]["count"] == 4000
@@ -0,0 +1,83 @@
+import os
+import time
+from src.utils.serverside import TieredBackend
+
+
+def backend(path, **kwargs):
+    # evict_interval=0: no background thread, eviction runs when a test calls it
+    return TieredBackend(cache_dir=str(path), evict_interval=0, **kwargs)
+
+
+def age(store, key, seconds):
+    path = store._path(key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_round_trip_and_tiers(tmp_path):
+    store = backend(tmp_path, memory_size=2)
+    value = {"rows": list(range(100))}
+    store.set("a", value)
+    assert store.has("a") and store.get("a") is value  # from memory
+    assert store.get(None) is None and store.get("missing") is None
+
+    other = backend(tmp_path)  # another worker of the host
+    assert other.get("a") == value
+    stats = other.stats()
+    assert (stats["disk_hits"], stats["memory"]["hits"], stats["disk_files"]) == (1, 0, 1)
+    assert other.get("a") == value and other.stats()["memory"]["hits"] == 1
+
+
+def test_eviction_by_another_worker_is_seen(tmp_path):
+    writer, reader = backend(tmp_path), backend(tmp_path)
+    writer.set("a", [1, 2, 3])
+    assert reader.get("a") == [1, 2, 3]  # now in the reader's memory too
+
+    age(writer, "a", 2 * writer.ttl)
+    assert writer.evict() == 1
+    # The copy in the reader's memory is not served once the file is gone
+    assert reader.get("a") is None and "a" not in reader.memory
+    assert reader.stats()["misses"] == 1
+
+
+def test_expired_values_evicted(tmp_path):
+    store = backend(tmp_path, ttl=60)
+    store.set("old", 1)
+    store.set("new", 2)
+    age(store, "old", 120)
+    assert store.evict() == 1
+    assert not store.has("old") and store.has("new")
+    assert store.stats()["evicted"] == 1
+
+
+def test_least_recently_used_evicted_past_cap(tmp_path):
+    payload = os.urandom(2000)  # incompressible: about 2 KB a file
+    store = backend(tmp_path, max_bytes=5000)
+    for i, key in enumerate(["a", "b"]):
+        store.set(key, payload)
+        age(store, key, 100 - i)
+    store.get("a")  # reading refreshes "a", so "b" is the least recently used
+    store.set("c", payload)  # over the cap: evicts right away
+    assert store.has("a") and not store.has("b") and store.has("c")
+    assert store.stats()["disk_bytes"] <= 5000
+
+
+def test_stale_temporary_files_removed(tmp_path):
+    store = backend(tmp_path)
+    stale, fresh = tmp_path / "stale.tmp", tmp_path / "fresh.tmp"
+    stale.write_bytes(b"partial")
+    fresh.write_bytes(b"being written")
+    then = time.time() - 2 * store.tmp_ttl
+    os.utime(stale, (then, then))
+    store.evict()
+    assert not stale.exists() and fresh.exists()
+
+
+def test_unreadable_file_is_a_miss(tmp_path, capsys):
+    store = backend(tmp_path)
+    store.set("a", 1)
+    with open(store._path("a"), "wb") as f:
+        f.write(b"not zlib")
+    assert backend(tmp_path).get("a") is None
+    assert "Error: unreadable cache file" in capsys.readouterr().out
+
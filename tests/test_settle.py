@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import subprocess
+import pytest
+from dash import _callback, no_update
+from src.data.store import store
+from src.utils.utils import report_renders
+from src.pages import agriculture_and_rural_development as agriculture
+from src.pages import development_economics_and_trade as economic
+from src.pages import education
+
+ASSETS = os.path.join(os.path.dirname(__file__), "..", "assets")
+
+# Taken on import: the first request to the app moves the registered callbacks into it
+CALLBACKS = list(_callback.GLOBAL_CALLBACK_LIST)
+
+pytestmark = pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+
+# Runs the clientside callbacks of a page (assets/facets.js, assets/settle.js) in node. The
+# cascade runs in the order of the Dash renderer: a callback waits while one of its inputs
+# is the output of another requested callback. settle is not held back that way but
+# called after every step that changes one of its inputs, so only settle itself keeps
+# the report from following the intermediate values.
+NODE_CASCADE = """
+const fs = require("fs"), vm = require("vm");
+const {callbacks, facets, values, changes} = JSON.parse(fs.readFileSync(0, "utf8"));
+const noUpdate = {};
+const window = {dash_clientside: {no_update: noUpdate}};
+const fetch = (url) => Promise.resolve({ok: true, json: () => Promise.resolve(facets[url.split("/").pop().slice(0, -5)])});
+const context = vm.createContext({window, fetch, console});
+process.argv.slice(1).forEach((file) => vm.runInContext(fs.readFileSync(file, "utf8"), context));
+
+const key = (prop) => prop.id + "." + prop.property;
+const isSettle = (callback) => callback.namespace === "reports";
+const observers = (changed) => callbacks.filter((callback) => callback.inputs.some((prop) => changed.includes(key(prop))));
+
+async function call(callback) {
+    const withValues = (props) => props.map((prop) => Object.assign({value: values[key(prop)]}, prop));
+    const dc = window.dash_clientside;
+    dc.callback_context = {
+        inputs_list: withValues(callback.inputs), states_list: withValues(callback.state),
+        outputs_list: callback.outputs.length === 1 ? callback.outputs[0] : callback.outputs,
+    };
+    const args = dc.callback_context.inputs_list.concat(dc.callback_context.states_list).map((prop) => prop.value);
+    let result = dc[callback.namespace][callback.function_name].apply(null, args);
+    delete dc.callback_context;
+    result = await result;
+    if (callback.outputs.length === 1) {
+        result = [result];
+    }
+    const changed = [];
+    callback.outputs.forEach((prop, i) => {
+        if (result[i] !== noUpdate) {
+            values[key(prop)] = result[i];
+            changed.push(key(prop));
+        }
+    });
+    return changed;
+}
+
+async function propagate(changed) {
+    const writes = [];
+    const requested = [];
+    const step = async (changed) => {
+        for (const callback of observers(changed)) {
+            if (isSettle(callback)) {
+                if ((await call(callback)).length) {
+                    writes.push(values[key(callback.outputs[0])]);
+                }
+            } else if (!requested.includes(callback)) {
+                requested.push(callback);
+            }
+        }
+    };
+    await step(changed);
+    while (requested.length) {
+        const pending = (other) => requested.filter((callback) => callback !== other).flatMap((callback) => callback.outputs.map(key));
+        const ready = requested.find((callback) => !callback.inputs.some((prop) => pending(callback).includes(key(prop))));
+        requested.splice(requested.indexOf(ready), 1);
+        await step(await call(ready));
+    }
+    return writes;
+}
+
+(async () => {
+    const writes = [];
+    for (const change of changes) {
+        Object.assign(values, change);
+        writes.push(await propagate(Object.keys(change)));
+    }
+    process.stdout.write(JSON.stringify({writes, values, stats: window.reportSettleStats}));
+})();
+"""
+
+
+def page_callbacks(ids):
+    """The clientside callbacks that read or write the given components, as the renderer gets them."""
+    callbacks = []
+    for callback in CALLBACKS:
+        function = callback.get("clientside_function")
+        if not function or function["namespace"] not in ("facets", "reports"):
+            continue
+        outputs = [
+            dict(zip(("id", "property"), output.rsplit(".", 1)))
+            for output in callback["output"].strip(".").split("...")
+        ]
+        if {prop["id"] for prop in outputs + callback["inputs"]} & ids:
+            callbacks.append(dict(function, outputs=outputs, inputs=callback["inputs"], state=callback["state"]))
+    return callbacks
+
+
+def run_cascade(layout, table, change):
+    components = {component.id: component for component in layout._traverse() if getattr(component, "id", None)}
+    callbacks = page_callbacks(set(components))
+    values = {}
+    for callback in callbacks:
+        for prop in callback["inputs"] + callback["state"] + callback["outputs"]:
+            component = components.get(prop["id"])
+            value = getattr(component, prop["property"], None) if component is not None else None
+            if value is not None:
+                values[f"{prop['id']}.{prop['property']}"] = value
+    payload = dict(callbacks=callbacks, facets={table: json.loads(store.facets(table).to_json())}, values=values, changes=[dict(values), change])
+    result = subprocess.run(
+        ["node", "-e", NODE_CASCADE, os.path.join(ASSETS, "facets.js"), os.path.join(ASSETS, "settle.js")],
+        input=json.dumps(payload, default=str), capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+@pytest.mark.parametrize("page, table, suffix, cache_key, series", [
+    (agriculture, "agriculture_data", "", "agriculture", "Paddy Rice Price"),
+    (agriculture, "agriculture_data", "", "agriculture", "Cashew nut Production"),
+    (education, "education_data", "-education", "education", "Successful Student"),
+    (economic, "economic_data", "-economic", "economic", "Export, by exported products"),
+])
+def test_one_report_update_per_series_change(page, table, suffix, cache_key, series):
+    layout = getattr(page, page.__name__.rsplit(".", 1)[1])()
+    result = run_cascade(layout, table, {f"series-name-dropdown{suffix}.value": series})
+    load, change = result["writes"]
+
+    # The dropdowns the series feeds moved several times, settle wrote the filters once
+    stats = result["stats"][f"report-filters{suffix}"]
+    assert stats["changes"] > 3 and stats["settled"] == 2
+    assert len(load) == 1 and len(change) == 1
+    assert change[0][0] == series and change[0] == result["values"][f"report-filters{suffix}.data"]
+
+    # Each write of the Store is one update_report call
+    update_report = getattr(page.update_report, "__wrapped__", page.update_report)
+    rendered = None
+    for filters in load + change:
+        before = report_renders[cache_key]["updates"]
+        outputs = update_report(filters, "graph", rendered)
+        rendered = outputs[-1]
+        assert report_renders[cache_key]["updates"] == before + 1
+        assert outputs[0] is not no_update and rendered["filters"] == filters
+
+
+def test_year_change_renders_at_once():
+    # The year is no input of the cascade: the resolved values still match, nothing waits
+    result = run_cascade(agriculture.agriculture_and_rural_development(), "agriculture_data", {"year-dropdown.value": "2020"})
+    load, change = result["writes"]
+    assert len(change) == 1 and change[0][-1] == "2020"
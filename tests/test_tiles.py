@@ -0,0 +1,217 @@
+import base64
+import json
+import os
+import shutil
+import struct
+import subprocess
+import pytest
+from src.data import tiles
+from src.data.geometry import BOUNDARY_FILES, NAME_PROPERTIES
+
+VECTORTILES_JS = os.path.join(os.path.dirname(__file__), "..", "assets", "vectortiles.js")
+
+
+# --- A reader of the MVT protobuf written from the spec, independent of the encoder ---
+
+def read_varint(buf, pos):
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return result, pos
+
+
+def read_fields(buf):
+    """(field number, value) pairs of a message; length-delimited values as bytes."""
+    pos, fields = 0, []
+    while pos < len(buf):
+        key, pos = read_varint(buf, pos)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == 0:
+            value, pos = read_varint(buf, pos)
+        elif wire_type == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire_type == 2:
+            length, pos = read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"unexpected wire type {wire_type}")
+        fields.append((number, value))
+    return fields
+
+
+def read_packed(buf):
+    pos, values = 0, []
+    while pos < len(buf):
+        value, pos = read_varint(buf, pos)
+        values.append(value)
+    return values
+
+
+def unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def read_value(buf):
+    (number, value), = read_fields(buf)
+    if number == 1:
+        return value.decode()
+    if number == 3:
+        return struct.unpack("<d", value)[0]
+    if number == 6:
+        return unzigzag(value)
+    if number == 7:
+        return bool(value)
+    raise ValueError(f"unexpected value field {number}")
+
+
+def read_rings(commands):
+    rings, x, y, i = [], 0, 0, 0
+    while i < len(commands):
+        command, count = commands[i] & 7, commands[i] >> 3
+        i += 1
+        if command == 7:
+            continue  # ClosePath
+        for _ in range(count):
+            x, y = x + unzigzag(commands[i]), y + unzigzag(commands[i + 1])
+            i += 2
+            if command == 1:
+                rings.append([(x, y)])
+            else:
+                rings[-1].append((x, y))
+    return rings
+
+
+def read_tile(data):
+    """{layer name: {'version', 'extent', 'features': [(id, properties, type, rings)]}}"""
+    layers = {}
+    for number, layer_bytes in read_fields(data):
+        assert number == 3
+        fields = read_fields(layer_bytes)
+        keys = [value.decode() for number, value in fields if number == 3]
+        values = [read_value(value) for number, value in fields if number == 4]
+        features = []
+        for feature_bytes in (value for number, value in fields if number == 2):
+            feature = dict(read_fields(feature_bytes))
+            tags = read_packed(feature.get(2, b""))
+            properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+            features.append((feature[1], properties, feature[3], read_rings(read_packed(feature[4]))))
+        layer = dict((number, value) for number, value in fields if number in (1, 5, 15))
+        layers[layer[1].decode()] = {"version": layer[15], "extent": layer[5], "features": features}
+    return layers
+
+
+# --- Encoder ---
+
+SQUARE = [(0, 0), (100, 0), (100, 100), (0, 100)]  # positive area in tile coordinates (y down)
+HOLE = [(25, 25), (25, 75), (75, 75), (75, 25)]
+
+
+def test_encode_tile_round_trip():
+    features = [
+        (1, {"name": "Kandal", "code": -3, "share": 0.25, "capital": True}, [SQUARE, HOLE]),
+        (2, {"name": "Takeo", "code": None}, [[(200, 200), (300, 200), (250, 300)]]),
+    ]
+    layers = read_tile(tiles.encode_tile("adm1", features))
+
+    assert list(layers) == ["adm1"]
+    layer = layers["adm1"]
+    assert (layer["version"], layer["extent"]) == (2, tiles.EXTENT)
+    assert layer["features"] == [
+        (1, {"name": "Kandal", "code": -3, "share": 0.25, "capital": True}, 3, [SQUARE, HOLE]),
+        # None has no MVT value: the property is left out rather than written as "None"
+        (2, {"name": "Takeo"}, 3, [[(200, 200), (300, 200), (250, 300)]]),
+    ]
+
+
+def test_large_coordinates_and_ids():
+    ring = [(-64, -64), (tiles.EXTENT + 64, -64), (tiles.EXTENT + 64, tiles.EXTENT + 64)]
+    layer = read_tile(tiles.encode_tile("countries", [(300, {"name": "Cambodia"}, [ring])]))["countries"]
+    assert layer["features"] == [(300, {"name": "Cambodia"}, 3, [ring])]
+
+
+# --- Cut tile sets ---
+
+@pytest.fixture(scope="module")
+def tile_dir(tmp_path_factory):
+    # Shallower than TILE_SETS to keep the test quick; every zoom is cut the same way
+    path = str(tmp_path_factory.mktemp("tiles"))
+    tiles.export_tiles({"adm1": 4, "countries": 2}, path)
+    return path
+
+
+def tile_files(tile_dir, name):
+    root = os.path.join(tile_dir, name)
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".mvt"):
+                yield os.path.relpath(os.path.join(dirpath, filename), root)
+
+
+@pytest.mark.parametrize("name", ["adm1", "countries"])
+def test_every_cut_tile_decodes(tile_dir, name):
+    with open(BOUNDARY_FILES[name]) as f:
+        names = {feature["properties"][NAME_PROPERTIES[name]] for feature in json.load(f)["features"]}
+    manifest = tiles.read_manifest(tile_dir)[name]
+    files = list(tile_files(tile_dir, name))
+    assert len(files) == manifest["tiles"] > 0
+
+    seen = set()
+    for path in files:
+        with open(os.path.join(tile_dir, name, path), "rb") as f:
+            layers = read_tile(f.read())
+        assert list(layers) == [name]
+        for feature_id, properties, geometry_type, rings in layers[name]["features"]:
+            assert geometry_type == 3 and rings and all(len(ring) >= 3 for ring in rings)
+            assert set(properties) == {NAME_PROPERTIES[name]}
+            seen.add(properties[NAME_PROPERTIES[name]])
+    assert seen <= names and seen
+
+    with open(os.path.join(tile_dir, name, "tilejson.json")) as f:
+        tilejson = json.load(f)
+    assert tilejson["name_property"] == NAME_PROPERTIES[name]
+    assert tilejson["vector_layers"][0]["id"] == name
+    assert tilejson["maxzoom"] == manifest["max_zoom"]
+
+
+# The browser's decoder (decodeTile in assets/vectortiles.js), run by node on the same tiles
+NODE_DECODE = """
+const fs = require("fs"), vm = require("vm");
+const context = {window: {}, TextDecoder, Uint8Array, DataView, Map, console};
+vm.createContext(context);
+vm.runInContext(fs.readFileSync(process.argv[1], "utf8"), context);
+const tiles = JSON.parse(fs.readFileSync(0, "utf8"));
+const decoded = tiles.map(([name, data]) => {
+    const layer = context.decodeTile(Buffer.from(data, "base64"), name);
+    return layer && {name: layer.name, extent: layer.extent, features: layer.features};
+});
+process.stdout.write(JSON.stringify(decoded));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_browser_decoder_matches(tile_dir):
+    samples = [("adm1", tiles.encode_tile("adm1", [(1, {"name": "Kandal", "code": -3}, [SQUARE, HOLE])]))]
+    for name in ("adm1", "countries"):
+        for path in sorted(tile_files(tile_dir, name))[:25]:
+            with open(os.path.join(tile_dir, name, path), "rb") as f:
+                samples.append((name, f.read()))
+    samples.append(("other", samples[0][1]))  # a layer the tile does not hold
+
+    result = subprocess.run(
+        ["node", "-e", NODE_DECODE, VECTORTILES_JS],
+        input=json.dumps([(name, base64.b64encode(data).decode()) for name, data in samples]),
+        capture_output=True, text=True, check=True,
+    )
+    for (name, data), layer in zip(samples, json.loads(result.stdout)):
+        expected = read_tile(data).get(name)
+        if expected is None:
+            assert layer is None
+            continue
+        assert (layer["name"], layer["extent"]) == (name, expected["extent"])
+        assert [(f["id"], f["properties"], [[tuple(p) for p in ring] for ring in f["rings"]]) for f in layer["features"]] == [
+            (feature_id, properties, rings) for feature_id, properties, _, rings in expected["features"]
+        ]
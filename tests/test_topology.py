@@ -0,0 +1,160 @@
+import json
+import os
+import shutil
+import subprocess
+import pytest
+from src.data import topology
+from src.data.geometry import BOUNDARY_FILES
+
+TOPOLOGY_JS = os.path.join(os.path.dirname(__file__), "..", "assets", "topology.js")
+
+
+def feature(name, geometry):
+    return {"type": "Feature", "properties": {"name": name}, "geometry": geometry}
+
+
+def polygon(*rings):
+    return {"type": "Polygon", "coordinates": [list(ring) for ring in rings]}
+
+
+def area(ring):
+    return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:]))) / 2
+
+
+# Two squares sharing the edge x = 1; the left one has a hole, the right one is a MultiPolygon
+LEFT = [(0, 0), (1, 0), (1, 1), (0, 1), (0, 0)]
+HOLE = [(0.25, 0.25), (0.25, 0.75), (0.75, 0.75), (0.75, 0.25), (0.25, 0.25)]
+RIGHT = [(1, 0), (2, 0), (2, 1), (1, 1), (1, 0)]
+ISLAND = [(3, 3), (4, 3), (4, 4), (3, 3)]
+COLLECTION = {"type": "FeatureCollection", "features": [
+    feature("left", polygon(LEFT, HOLE)),
+    feature("right", {"type": "MultiPolygon", "coordinates": [[RIGHT], [ISLAND]]}),
+    feature("nowhere", None),
+]}
+
+
+def test_shared_border_stored_once():
+    topo, arcs = topology.build_topology(COLLECTION, "places", quantization=17)  # a 0.25 grid
+    left, right, nowhere = topo["objects"]["places"]["geometries"]
+    assert (left["type"], right["type"], nowhere["type"]) == ("Polygon", "MultiPolygon", None)
+    assert [g["properties"]["name"] for g in (left, right, nowhere)] == ["left", "right", "nowhere"]
+
+    left_refs = {ref if ref >= 0 else ~ref for ref in left["arcs"][0]}
+    right_refs = {ref if ref >= 0 else ~ref for ref in right["arcs"][0][0]}
+    shared = left_refs & right_refs
+    assert len(shared) == 1
+    # The border runs one way for one square and the other way for its neighbour
+    border = shared.pop()
+    assert {border, ~border} <= set(left["arcs"][0]) | set(right["arcs"][0][0])
+
+
+def test_polygons_rebuilt():
+    topo, arcs = topology.build_topology(COLLECTION, "places", quantization=17)  # a 0.25 grid
+    left, right, nowhere = topo["objects"]["places"]["geometries"]
+    [(outer, hole)] = topology.polygons_of(left, arcs, topo["transform"])
+    assert outer[0] == outer[-1] and set(outer) == set(LEFT)
+    assert set(hole) == set(HOLE) and area(outer) == pytest.approx(1) and area(hole) == pytest.approx(0.25)
+    assert [len(p) for p in topology.polygons_of(right, arcs, topo["transform"])] == [1, 1]
+    assert topology.polygons_of(nowhere, arcs, topo["transform"]) == []
+
+
+def test_douglas_peucker():
+    line = [(0, 0), (1, 0), (2, 0), (3, 5), (4, 0), (5, 0)]
+    assert topology._douglas_peucker(line, 1) == [(0, 0), (2, 0), (3, 5), (5, 0)]
+    assert topology._douglas_peucker(line, 10) == [(0, 0), (5, 0)]
+    assert topology._douglas_peucker(line, 0) == line
+
+
+@pytest.fixture(scope="module")
+def adm1():
+    with open(BOUNDARY_FILES["adm1"]) as f:
+        geojson = json.load(f)
+    return geojson, topology.build_topology(geojson, "adm1")
+
+
+def test_levels_keep_borders_seamless(adm1):
+    geojson, (topo, arcs) = adm1
+    sizes = []
+    for tolerance in topology.LEVELS:
+        simplified = topology.simplify(arcs, tolerance, topo["transform"])
+        # Arc ends are kept, so neighbours still meet wherever they did
+        assert [(arc[0], arc[-1]) for arc in simplified] == [(arc[0], arc[-1]) for arc in arcs]
+        sizes.append(sum(len(arc) for arc in simplified))
+    assert sizes == sorted(sizes) and sizes[-1] == sum(len(arc) for arc in arcs)
+
+
+def test_full_level_matches_source(adm1):
+    geojson, (topo, arcs) = adm1
+    geometries = topo["objects"]["adm1"]["geometries"]
+    assert len(geometries) == len(geojson["features"])
+    for source, geometry in zip(geojson["features"], geometries):
+        assert geometry["properties"] == source["properties"]
+        rebuilt = topology.polygons_of(geometry, arcs, topo["transform"])
+        expected = sum(area(p[0]) - sum(area(r) for r in p[1:]) for p in topology.geometry_polygons(source["geometry"]))
+        assert sum(area(p[0]) - sum(area(r) for r in p[1:]) for p in rebuilt) == pytest.approx(expected, rel=1e-3)
+
+
+def write_source(tmp_path, geojson):
+    path = tmp_path / "places.json"
+    path.write_text(json.dumps(geojson))
+    return str(path)
+
+
+def test_export_pyramid(tmp_path):
+    manifest = topology.export_pyramid({"places": write_source(tmp_path, COLLECTION)}, str(tmp_path), levels=(0.5, 0))
+    assert topology.read_manifest(str(tmp_path)) == manifest
+    entry = manifest["places"]
+    assert entry["source"] == topology.file_hash(str(tmp_path / "places.json"))
+    assert [level["file"] for level in entry["levels"]] == ["places-0.topo.json", "places-1.topo.json"]
+    assert topology.read_manifest(str(tmp_path / "missing")) is None
+
+
+def close(actual, expected):
+    """Same rings, point by point, up to float rounding."""
+    return len(actual) == len(expected) and all(
+        len(pa) == len(pe) and all(
+            len(ra) == len(re) and all(abs(a[0] - e[0]) < 1e-9 and abs(a[1] - e[1]) < 1e-9 for a, e in zip(ra, re))
+            for ra, re in zip(pa, pe)
+        )
+        for pa, pe in zip(actual, expected)
+    )
+
+
+# topologyFeatures of assets/topology.js, run by node on an exported level
+NODE_DECODE = """
+const fs = require("fs"), vm = require("vm");
+const context = {window: {}, console};
+vm.createContext(context);
+vm.runInContext(fs.readFileSync(process.argv[1], "utf8"), context);
+process.stdout.write(JSON.stringify(context.topologyFeatures(JSON.parse(fs.readFileSync(process.argv[2], "utf8")))));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node is not installed")
+def test_browser_decoder_matches(tmp_path):
+    with open(BOUNDARY_FILES["adm1"]) as f:
+        adm1 = json.load(f)
+    topology.export_pyramid({"adm1": BOUNDARY_FILES["adm1"]}, str(tmp_path), levels=(0.01,))
+    path = tmp_path / "adm1-0.topo.json"
+    decoded = json.loads(subprocess.run(
+        ["node", "-e", NODE_DECODE, TOPOLOGY_JS, str(path)], capture_output=True, text=True, check=True,
+    ).stdout)
+
+    topo = json.loads(path.read_text())
+    arcs = []
+    for arc in topo["arcs"]:
+        x = y = 0
+        arcs.append([(x := x + dx, y := y + dy) for dx, dy in arc])
+    identity = {"scale": [1, 1], "translate": [0, 0]}
+    (kx, ky), (x0, y0) = topo["transform"]["scale"], topo["transform"]["translate"]
+    assert len(decoded["features"]) == len(adm1["features"])
+    for feature, geometry in zip(decoded["features"], topo["objects"]["adm1"]["geometries"]):
+        assert feature["properties"] == geometry["properties"]
+        polygons = feature["geometry"]["coordinates"]
+        if feature["geometry"]["type"] == "Polygon":
+            polygons = [polygons]
+        expected = [
+            [[[x * kx + x0, y * ky + y0] for x, y in ring] for ring in p]
+            for p in topology.polygons_of(geometry, arcs, identity)
+        ]
+        assert close(polygons, expected)